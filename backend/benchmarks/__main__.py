@@ -0,0 +1,112 @@
+"""
+Run the benchmark suite and write the results as JSON, or compare two runs.
+
+Usage (from the backend directory):
+    python -m benchmarks run --suites parser,matcher --output before.json
+    python -m benchmarks run --output after.json
+    python -m benchmarks compare before.json after.json
+
+The ingest and routes suites need a MongoDB server (MONGODB_URI) and write
+to the DB_NAME database, which defaults to teleflix_bench.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Tuple
+
+from benchmarks import common  # noqa: F401  (selects the benchmark database)
+
+SUITES = ["parser", "matcher", "ingest", "routes"]
+
+def run_suite(name: str, args) -> Dict[str, Any]:
+    if name == "parser":
+        from benchmarks import bench_parser
+        mismatches = bench_parser.verify()
+        return {**bench_parser.run(args.filenames), "golden_mismatches": len(mismatches)}
+    if name == "matcher":
+        from benchmarks import bench_matcher
+        return bench_matcher.run(args.titles, args.queries, threshold=0.9)
+    if name == "ingest":
+        from benchmarks import bench_ingest
+        return bench_ingest.run(args.messages, args.imdb_latency)
+    if name == "routes":
+        from benchmarks import bench_routes
+        return bench_routes.run(args.catalog, args.requests)
+    raise ValueError(f"Unknown suite: {name}")
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+def run(args):
+    suites = args.suites.split(",") if args.suites else SUITES
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {}
+    }
+    for name in suites:
+        started = time.perf_counter()
+        print(f"Running {name}...", file=sys.stderr)
+        report["results"][name] = run_suite(name, args)
+        print(f"  done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+def _numbers(data: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _numbers(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, data
+
+def compare(args):
+    with open(args.before) as f:
+        before = dict(_numbers(json.load(f)["results"]))
+    with open(args.after) as f:
+        after = dict(_numbers(json.load(f)["results"]))
+
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key:60s} {old:>14,.3f} {new:>14,.3f} {change:>9s}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Teleflix benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks and emit JSON")
+    run_parser.add_argument("--suites", help=f"Comma-separated subset of: {', '.join(SUITES)}")
+    run_parser.add_argument("--output", help="Write results to this file instead of stdout")
+    run_parser.add_argument("--filenames", type=int, default=50000, help="parser: filenames to parse")
+    run_parser.add_argument("--titles", type=int, default=100000, help="matcher: catalog size")
+    run_parser.add_argument("--queries", type=int, default=2000, help="matcher: queries per scenario")
+    run_parser.add_argument("--messages", type=int, default=1000, help="ingest: messages to ingest")
+    run_parser.add_argument("--imdb-latency", type=float, default=0.2, help="ingest: seconds per fake IMDb lookup")
+    run_parser.add_argument("--catalog", type=int, default=20000, help="routes: media documents to load")
+    run_parser.add_argument("--requests", type=int, default=500, help="routes: requests per scenario")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Measure ingest throughput through TelegramSync, one message at a time and
+through the staged sync pipeline with inline and background IMDb lookups,
+with local stand-ins for Telegram and IMDb.
+Writes go to the benchmark MongoDB database (DB_NAME, default teleflix_bench).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ingest --messages 2000 --imdb-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import require_bench_database
+from benchmarks.synthetic import make_filenames
+
+def make_messages(count: int, seed: int = 1, first_id: int = 1) -> List[SimpleNamespace]:
+    """Objects with the Message attributes process_message reads"""
+    messages = []
+    for i, filename in enumerate(make_filenames(count, seed)):
+        document = SimpleNamespace(
+            file_id=f"bench-{seed}-{i}",
+            file_size=random.Random(i).randint(10 ** 8, 10 ** 10),
+            file_name=filename
+        )
+        messages.append(SimpleNamespace(id=first_id + i, media=True, document=document, video=None))
+    return messages
+
+def make_fake_imdb(latency: float, miss_ratio: float = 0.1):
+    """search_imdb stand-in: fixed latency, deterministic ids per title"""
+    from utils.parser import normalize_title, generate_slug
+
+    calls = {"count": 0}
+
+    async def fake_search_imdb(
+        title: str,
+        year: Optional[int] = None,
+        media_type: str = "movie",
+        raise_errors: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        calls["count"] += 1
+        await asyncio.sleep(latency)
+        key = zlib.crc32(f"{media_type}|{normalize_title(title)}".encode())
+        if key % 1000 < miss_ratio * 1000:
+            return None
+        return {
+            "imdb_id": f"{key % 10 ** 8:08d}",
+            "title": title,
+            "slug": f"{generate_slug(title)}-{key % 10 ** 6}",
+            "plot": "",
+            "rating": round(key % 100 / 10, 1),
+            "genres": ["Drama"],
+            "release_year": year,
+            "poster": None
+        }
+
+    return fake_search_imdb, calls
+
+class FakeChannel:
+    """Stand-in for the Pyrogram client's get_chat_history"""
+    def __init__(self, messages: List[SimpleNamespace], latency: float):
+        self.messages = sorted(messages, key=lambda m: m.id, reverse=True)
+        self.latency = latency
+
+    async def get_chat_history(self, chat_id, limit: int = 0, offset_id: int = 0, **kwargs):
+        served = 0
+        for message in self.messages:
+            if offset_id and message.id >= offset_id:
+                continue
+            if limit and served >= limit:
+                return
+            # Telegram returns history in pages of 100
+            if served % 100 == 0:
+                await asyncio.sleep(self.latency)
+            served += 1
+            yield message
+
+async def _reset():
+    from database import (
+        media_collection, files_collection, episodes_collection, enrichment_jobs_collection, create_indexes
+    )
+
+    await media_collection.delete_many({})
+    await files_collection.delete_many({})
+    await episodes_collection.delete_many({})
+    await enrichment_jobs_collection.delete_many({})
+    await create_indexes()
+
+async def _run(count: int, imdb_latency: float, history_latency: float) -> Dict[str, Any]:
+    import utils.sync as sync_module
+    from utils.matcher import TitleMatcher
+    from utils.enrichment import enrichment_queue
+
+    fake_search_imdb, calls = make_fake_imdb(imdb_latency)
+    sync_module.search_imdb = fake_search_imdb
+
+    # Look up IMDb inline first, as ingest originally did
+    sync_module.ENRICH_DEFERRED = False
+    results = {}
+
+    # One message at a time, as the sync originally worked
+    await _reset()
+    sync_module.title_matcher = TitleMatcher()
+    sync = sync_module.TelegramSync()
+    messages = make_messages(count, seed=1)
+    calls["count"] = 0
+    started = time.perf_counter()
+    for message in messages:
+        await sync.process_message(message)
+    await sync.flush_writes()
+    elapsed = time.perf_counter() - started
+    results["serial"] = {
+        "messages": count,
+        "seconds": round(elapsed, 3),
+        "per_second": round(count / elapsed, 1),
+        "imdb_calls": calls["count"]
+    }
+
+    # Staged pipeline over a fake channel history
+    await _reset()
+    sync_module.title_matcher = TitleMatcher()
+    sync = sync_module.TelegramSync()
+    sync.app = FakeChannel(make_messages(count, seed=1), history_latency)
+    calls["count"] = 0
+    started = time.perf_counter()
+    stages = await sync.sync_recent(limit=count)
+    elapsed = time.perf_counter() - started
+    results["pipeline"] = {
+        "messages": count,
+        "seconds": round(elapsed, 3),
+        "per_second": round(count / elapsed, 1),
+        "imdb_calls": calls["count"],
+        "stages": stages
+    }
+
+    # Provisional media stored at once, enriched by the background queue
+    await _reset()
+    sync_module.ENRICH_DEFERRED = True
+    sync_module.title_matcher = TitleMatcher()
+    sync = sync_module.TelegramSync()
+    sync.app = FakeChannel(make_messages(count, seed=1), history_latency)
+    calls["count"] = 0
+    started = time.perf_counter()
+    stages = await sync.sync_recent(limit=count)
+    elapsed = time.perf_counter() - started
+
+    enrichment_queue.start(sync.enrich_media)
+    enrich_started = time.perf_counter()
+    while True:
+        queue_stats = await enrichment_queue.get_stats()
+        if not queue_stats["pending"] and not queue_stats["running"]:
+            break
+        await asyncio.sleep(0.1)
+    enrich_elapsed = time.perf_counter() - enrich_started
+    await enrichment_queue.stop()
+
+    results["pipeline_deferred"] = {
+        "messages": count,
+        "seconds": round(elapsed, 3),
+        "per_second": round(count / elapsed, 1),
+        "enrich_seconds": round(enrich_elapsed, 3),
+        "imdb_calls": calls["count"],
+        "enrichment": queue_stats,
+        "stages": stages
+    }
+
+    await _reset()
+    return results
+
+def run(count: int = 1000, imdb_latency: float = 0.2, history_latency: float = 0.05) -> Dict[str, Any]:
+    require_bench_database()
+    return {
+        "benchmark": "ingest",
+        "imdb_latency": imdb_latency,
+        "history_latency": history_latency,
+        **asyncio.run(_run(count, imdb_latency, history_latency))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--imdb-latency", type=float, default=0.2, help="Seconds per fake IMDb lookup")
+    parser.add_argument("--history-latency", type=float, default=0.05, help="Seconds per fake history page")
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.imdb_latency, args.history_latency), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark the trigram title matcher on a synthetic catalog.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_matcher --titles 100000 --queries 2000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from utils.matcher import TitleMatcher
+from benchmarks.common import latency_summary
+from benchmarks.synthetic import make_titles
+
+def make_variant(title: str, rng: random.Random) -> str:
+    """Filename-style variant of a title: dots, casing, or one typo"""
+    choice = rng.random()
+    if choice < 0.4:
+        return title.replace(" ", ".")
+    if choice < 0.7:
+        return title.upper() + " "
+    i = rng.randrange(len(title))
+    return title[:i] + title[i + 1:]
+
+def time_queries(matcher, queries):
+    latencies = []
+    hits = 0
+    for title in queries:
+        started = time.perf_counter()
+        if matcher.match(title, "movie"):
+            hits += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {"hit_ratio": round(hits / len(queries), 3), **latency_summary(latencies)}
+
+def run(titles: int, queries: int, threshold: float, seed: int = 1):
+    rng = random.Random(seed)
+    catalog = make_titles(titles, seed)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    matcher = TitleMatcher(threshold=threshold)
+    for i, title in enumerate(catalog):
+        matcher.add(str(i), [title], "movie")
+    build_seconds = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    sample = rng.sample(catalog, min(queries, len(catalog)))
+    return {
+        "benchmark": "matcher",
+        "titles": titles,
+        "names": len(matcher),
+        "threshold": threshold,
+        "build_seconds": round(build_seconds, 3),
+        "memory_mb": round(memory / 1024 / 1024, 1),
+        "exact": time_queries(matcher, sample),
+        "variant": time_queries(matcher, [make_variant(t, rng) for t in sample]),
+        "miss": time_queries(matcher, [f"Unlisted Title {i}" for i in range(len(sample))])
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--titles", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+    print(json.dumps(run(args.titles, args.queries, args.threshold), indent=2))
+
+if __name__ == "__main__":
+    main()
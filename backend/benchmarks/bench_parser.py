@@ -0,0 +1,62 @@
+"""
+Check parse_filename against the golden corpus and measure its throughput.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_parser --count 50000
+    python -m benchmarks.bench_parser --verify-only
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from utils.parser import parse_filename
+from benchmarks.synthetic import make_filenames
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "parser_golden.jsonl")
+
+def verify(path: str = GOLDEN_PATH):
+    """Return the golden entries whose parse result differs from the expected one"""
+    mismatches = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            actual = parse_filename(entry["filename"])
+            if actual != entry["expected"]:
+                mismatches.append({"filename": entry["filename"], "expected": entry["expected"], "actual": actual})
+    return mismatches
+
+def run(count: int, seed: int = 1):
+    filenames = make_filenames(count, seed)
+    started = time.perf_counter()
+    for filename in filenames:
+        parse_filename(filename)
+    elapsed = time.perf_counter() - started
+    return {
+        "benchmark": "parser",
+        "filenames": count,
+        "seconds": round(elapsed, 3),
+        "per_second": round(count / elapsed),
+        "us_per_filename": round(elapsed / count * 1e6, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--verify-only", action="store_true")
+    args = parser.parse_args()
+
+    mismatches = verify()
+    if mismatches:
+        print(json.dumps(mismatches[:10], indent=2, ensure_ascii=False))
+        print(f"{len(mismatches)} golden corpus mismatches", file=sys.stderr)
+        sys.exit(1)
+    if args.verify_only:
+        print("Golden corpus OK")
+        return
+
+    print(json.dumps(run(args.count), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Measure p50/p99 latency of the read API routes against a synthetic catalog
+loaded into the benchmark MongoDB database (DB_NAME, default teleflix_bench).
+Requests go through the ASGI app in-process, so routing, validation and
+serialization are included but no network hop is.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_routes --catalog 20000 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlencode
+
+from benchmarks.common import require_bench_database, latency_summary
+from benchmarks.synthetic import make_catalog, COMMON_WORDS
+
+def build_app():
+    """The API routers without the startup hooks that connect to Telegram"""
+    from fastapi import FastAPI
+    from config import API_PREFIX
+    from routes import search, media, files
+
+    app = FastAPI()
+    app.include_router(search.router, prefix=API_PREFIX)
+    app.include_router(media.router, prefix=API_PREFIX)
+    app.include_router(files.router, prefix=API_PREFIX)
+    return app
+
+async def asgi_get(app, path: str, params: Dict[str, Any] = None) -> Tuple[int, bytes]:
+    """Issue a GET request directly against an ASGI app"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params or {}).encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    response = {"status": 0, "body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["body"]
+
+async def load_catalog(count: int, batch_size: int = 1000):
+    from database import media_collection, files_collection, create_indexes
+
+    await media_collection.delete_many({})
+    await files_collection.delete_many({})
+    batch, files = [], []
+    for media in make_catalog(count):
+        batch.append(media)
+        files.extend(media.get("files", []))
+        for season in media.get("seasons", {}).values():
+            for episode in season["episodes"].values():
+                files.extend(episode["files"])
+        if len(batch) >= batch_size:
+            await media_collection.insert_many(batch, ordered=False)
+            if files:
+                await files_collection.insert_many(files, ordered=False)
+            batch, files = [], []
+    if batch:
+        await media_collection.insert_many(batch, ordered=False)
+    if files:
+        await files_collection.insert_many(files, ordered=False)
+    await create_indexes()
+
+async def measure(app, requests: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    latencies = []
+    errors = 0
+    response_bytes = 0
+    for path, params in requests:
+        started = time.perf_counter()
+        status, body = await asgi_get(app, path, params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response_bytes += len(body)
+        if status >= 400 and status != 404:
+            errors += 1
+    return {
+        **latency_summary(latencies),
+        "errors": errors,
+        "mean_response_bytes": round(response_bytes / len(requests))
+    }
+
+async def _run(catalog: int, count: int, seed: int = 1) -> Dict[str, Any]:
+    from config import API_PREFIX
+    from database import media_collection, files_collection
+
+    from utils.suggest import suggest_index
+
+    await load_catalog(catalog)
+    await suggest_index.load(media_collection)
+    app = build_app()
+    rng = random.Random(seed)
+
+    slugs = [doc["slug"] async for doc in media_collection.find({}, {"slug": 1}).limit(5000)]
+    titles = [doc["title"] async for doc in media_collection.find({}, {"title": 1}).limit(5000)]
+    words = [word for title in titles for word in title.lower().split()]
+    series = [
+        doc["slug"] async for doc in media_collection.find({"media_type": {"$ne": "movie"}}, {"slug": 1}).limit(2000)
+    ]
+
+    scenarios = {
+        "search_word": [(f"{API_PREFIX}/search", {"q": rng.choice(words)}) for _ in range(count)],
+        "search_common": [(f"{API_PREFIX}/search", {"q": rng.choice(COMMON_WORDS)}) for _ in range(count)],
+        "recent": [(f"{API_PREFIX}/recent", {}) for _ in range(count)],
+        "recent_filtered": [(f"{API_PREFIX}/recent", {"media_type": "series"}) for _ in range(count)],
+        "media": [(f"{API_PREFIX}/media/{rng.choice(slugs)}", {}) for _ in range(count)],
+        "media_summary": [(f"{API_PREFIX}/media/{rng.choice(series)}", {"summary": "true"}) for _ in range(count)],
+        "seasons": [(f"{API_PREFIX}/media/{rng.choice(series)}/seasons", {}) for _ in range(count)],
+        "season": [(f"{API_PREFIX}/media/{rng.choice(series)}/season/1", {}) for _ in range(count)],
+        "episode": [(f"{API_PREFIX}/media/{rng.choice(series)}/season/1/episode/1", {}) for _ in range(count)],
+        "genres": [(f"{API_PREFIX}/genres", {}) for _ in range(count)],
+        "suggest": [
+            (f"{API_PREFIX}/suggest", {"q": word[:rng.randint(1, len(word))]})
+            for word in (rng.choice(words) for _ in range(count))
+        ],
+    }
+
+    results = {}
+    for name, requests in scenarios.items():
+        # Warm up caches and connections before measuring
+        await measure(app, requests[:10])
+        results[name] = await measure(app, requests)
+
+    await media_collection.delete_many({})
+    await files_collection.delete_many({})
+    return results
+
+def run(catalog: int = 20000, count: int = 500) -> Dict[str, Any]:
+    require_bench_database()
+    return {
+        "benchmark": "routes",
+        "catalog": catalog,
+        "requests": count,
+        "routes": asyncio.run(_run(catalog, count))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--catalog", type=int, default=20000, help="Media documents to load")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    args = parser.parse_args()
+    print(json.dumps(run(args.catalog, args.requests), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Helpers shared by the benchmark modules.
+"""
+import os
+import statistics
+from typing import Dict, List
+
+# Benchmarks that write to MongoDB use their own database. This must be set
+# before anything imports `database`.
+BENCH_DB_NAME = os.environ.setdefault("DB_NAME", "teleflix_bench")
+
+def require_bench_database():
+    """Refuse to run write benchmarks against a real database"""
+    from config import DB_NAME
+
+    if not DB_NAME.endswith("_bench"):
+        raise SystemExit(f"Refusing to run against database '{DB_NAME}': DB_NAME must end with _bench")
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """Summarize latencies given in milliseconds"""
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(statistics.mean(latencies_ms), 4),
+        "p50_ms": round(percentile(latencies_ms, 0.5), 4),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 4),
+        "max_ms": round(max(latencies_ms), 4)
+    }
@@ -0,0 +1,169 @@
+"""
+Synthetic titles, release filenames and media catalogs for benchmarks.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+COMMON_WORDS = ["the", "of", "a", "and", "in", "to", "man", "night", "last", "love"]
+CONSONANTS = "bcdfghjklmnprstvwyz"
+VOWELS = "aeiou"
+
+# Real titles that exercise tricky substrings (NF, Ep, AAC, DTS, years, x)
+REAL_TITLES = [
+    "The Matrix", "Breaking Bad", "Attack on Titan", "Jujutsu Kaisen", "Iron Man",
+    "Leviathan", "Infinity War", "Deep Space Nine", "Dune Part Two", "Blade Runner 2049",
+    "The Expanse", "Epic Movie", "Spider-Man No Way Home", "Mission Impossible",
+    "Dr. Stone", "One Piece", "Avatar: The Way of Water", "Lo Episodio", "Baccano!",
+    "Ghost in the Shell", "Inferno", "Pokémon", "Café Society", "10 Cloverfield Lane",
+    "1917", "2012", "Wall-E", "X-Men", "The 100", "Fantastic 4", "Se7en", "9-1-1"
+]
+
+QUALITIES = ["2160p", "1080p", "720p", "480p", "1080P", "4K", ""]
+SOURCES = ["BluRay", "WEB-DL", "WEBRip", "HDTV", "BRRip", "DVDRip", "NF.WEB-DL", "AMZN.WEB-DL", "HDRip", ""]
+CODECS = ["x264", "x265", "HEVC", "H.265", "H264", "AVC", "10bit.x265", ""]
+AUDIO = ["DDP5.1", "DDP2.0", "AAC", "DTS", "TrueHD.Atmos", "FLAC", "AC3", "EAC3", "AAC2.0", ""]
+LANGUAGES = ["Hindi", "English", "Hindi-English", "Multi.Audio", "Dual Audio", "Japanese", "Tamil", "Korean", ""]
+SUBTITLES = ["Subbed", "Dubbed", "English.Sub", "Dual.Subs", "Multi-Subs", "Soft.Sub", "HardSubs", ""]
+GROUPS = ["YIFY", "PSA", "EVO", "Telly", "Archie", "Tigole", "QxR", "NTb", "RARBG", "SPARKS", "FGT", "GECKOS", "SubsPlease", "Erai-raws", ""]
+EXTENSIONS = ["mkv", "mp4", "avi", "m4v", "webm"]
+
+def make_word(rng: random.Random) -> str:
+    """Pronounceable pseudo-word, e.g. toravel"""
+    return "".join(
+        rng.choice(CONSONANTS) + rng.choice(VOWELS) + (rng.choice(CONSONANTS) if rng.random() < 0.3 else "")
+        for _ in range(rng.randint(1, 3))
+    )
+
+def make_titles(count: int, seed: int = 1) -> List[str]:
+    """Unique titles mixing common English words with generated words"""
+    rng = random.Random(seed)
+    vocabulary = list({make_word(rng) for _ in range(30000)})
+    titles = set()
+    while len(titles) < count:
+        words = [
+            rng.choice(COMMON_WORDS) if rng.random() < 0.3 else rng.choice(vocabulary)
+            for _ in range(rng.randint(1, 4))
+        ]
+        if rng.random() < 0.1:
+            words.append(str(rng.randint(2, 9)))
+        titles.add(" ".join(words).title())
+    return sorted(titles)
+
+def _tags(rng: random.Random, sep: str) -> List[str]:
+    tags = [rng.choice(QUALITIES), rng.choice(SOURCES), rng.choice(CODECS)]
+    if rng.random() < 0.5:
+        tags.append(rng.choice(AUDIO))
+    if rng.random() < 0.4:
+        tags.append(rng.choice(LANGUAGES))
+    if rng.random() < 0.2:
+        tags.append(rng.choice(SUBTITLES))
+    rng.shuffle(tags)
+    return [tag.replace(".", sep) if sep != "." else tag for tag in tags if tag]
+
+def make_filename(rng: random.Random, title: str) -> str:
+    """One release-style filename for a title in a random naming scheme"""
+    sep = rng.choice([".", " ", "_", "."])
+    name = title.replace(" ", sep)
+    year = str(rng.randint(1950, 2025))
+    group = rng.choice(GROUPS)
+    ext = rng.choice(EXTENSIONS)
+    scheme = rng.random()
+
+    if scheme < 0.35:
+        # Movie: Title.Year.Tags-GROUP
+        year_part = rng.choice([f"{sep}{year}", f" ({year})", f"[{year}]", ""])
+        parts = [name + year_part] + _tags(rng, sep)
+        stem = sep.join(parts)
+    elif scheme < 0.65:
+        # Series: Title.S01E02.Tags
+        episode = rng.choice(["S{:02d}E{:02d}", "s{:d}e{:d}", "{:d}x{:02d}"]).format(
+            rng.randint(1, 12), rng.randint(1, 30)
+        )
+        stem = sep.join([name, episode] + _tags(rng, sep))
+    elif scheme < 0.85:
+        # Anime: [Group] Title - Episode 12 [1080p] / Title Ep05
+        episode = rng.choice(["Episode {:d}", "Ep{:02d}", "EP {:d}", "- {:02d}"]).format(rng.randint(1, 99))
+        tags = "".join(f" [{tag}]" for tag in _tags(rng, " "))
+        prefix = f"[{group}] " if group and rng.random() < 0.5 else ""
+        stem = f"{prefix}{title} {episode}{tags}"
+    else:
+        # Messy: stray brackets, unicode, dashes, no tags
+        stem = rng.choice([
+            f"{title} - {rng.choice(QUALITIES)}",
+            f"【{title}】{year}",
+            f"{title.upper()}",
+            f"{rng.choice(QUALITIES)} {title} {rng.choice(SOURCES)}",
+            f"{name}{sep}{year}{sep}{year}",
+            f"{title} (Director's Cut) [{year}]",
+        ])
+
+    if group and rng.random() < 0.6 and not stem.startswith("["):
+        opener = rng.choice(["-", ".", "["])
+        stem += opener + group + ("]" if opener == "[" else "")
+    return f"{stem}.{ext}"
+
+def make_filenames(count: int, seed: int = 1) -> List[str]:
+    """Filenames over a mix of synthetic and real titles"""
+    rng = random.Random(seed)
+    titles = make_titles(max(1, count // 4), seed) + REAL_TITLES
+    return [make_filename(rng, rng.choice(titles)) for _ in range(count)]
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Drama", "Fantasy", "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller"]
+
+def make_catalog(count: int, seed: int = 1) -> Iterator[Dict[str, Any]]:
+    """Media documents shaped like the ones the sync stores"""
+    from utils.parser import generate_slug
+
+    rng = random.Random(seed)
+    started = datetime(2020, 1, 1)
+    for i, title in enumerate(make_titles(count, seed)):
+        media_id = f"{i:024x}"
+        media_type = rng.choice(["movie", "movie", "series", "anime"])
+        created_at = started + timedelta(minutes=i)
+        media = {
+            "_id": media_id,
+            "title": title,
+            "slug": f"{generate_slug(title)}-{i}",
+            "media_type": media_type,
+            "imdb_id": f"{9000000 + i:07d}",
+            "poster": f"https://example.com/posters/{i}.jpg",
+            "plot": " ".join(rng.choice(COMMON_WORDS) if rng.random() < 0.5 else make_word(rng) for _ in range(30)),
+            "rating": round(rng.uniform(1, 10), 1),
+            "genres": rng.sample(GENRES, rng.randint(1, 3)),
+            "release_year": rng.randint(1950, 2025),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "original_filename": make_filename(rng, title),
+            "parsed_title": title
+        }
+
+        def file_info(file_id, **extra):
+            return {
+                "file_id": file_id,
+                "file_size": rng.randint(10 ** 8, 10 ** 10),
+                "quality": rng.choice(QUALITIES[:4]),
+                "source": None,
+                "format": None,
+                "bot_index": 0,
+                "media_id": media_id,
+                **extra
+            }
+
+        if media_type == "movie":
+            media["files"] = [file_info(f"{media_id}-{n}") for n in range(rng.randint(1, 3))]
+        else:
+            media["seasons"] = {
+                str(season): {
+                    "season_number": season,
+                    "episodes": {
+                        str(episode): {
+                            "episode_number": episode,
+                            "files": [file_info(f"{media_id}-{season}-{episode}", season=season, episode=episode)]
+                        }
+                        for episode in range(1, rng.randint(2, 25))
+                    }
+                }
+                for season in range(1, rng.randint(2, 5))
+            }
+        yield media
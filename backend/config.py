@@ -13,11 +13,83 @@ CHANNEL_ID = int(os.getenv("CHANNEL_ID", "0"))
 
 # MongoDB configuration
 MONGODB_URI = os.getenv("MONGODB_URI", "")
-DB_NAME = "teleflix"
+DB_NAME = os.getenv("DB_NAME", "teleflix")
 
 # Site configuration
 SITE_PASSWORD = os.getenv("SITE_PASSWORD", "")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:3000")
 
 # API configuration
-API_PREFIX = "/api"
\ No newline at end of file
+API_PREFIX = "/api"
+
+# Sync pipeline configuration
+SYNC_QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "100"))
+SYNC_PARSE_WORKERS = int(os.getenv("SYNC_PARSE_WORKERS", "2"))
+SYNC_ENRICH_WORKERS = int(os.getenv("SYNC_ENRICH_WORKERS", "8"))
+SYNC_PERSIST_WORKERS = int(os.getenv("SYNC_PERSIST_WORKERS", "32"))
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_BACKFILL = os.getenv("SYNC_BACKFILL", "true").lower() == "true"
+SYNC_WRITE_BATCH_SIZE = int(os.getenv("SYNC_WRITE_BATCH_SIZE", "500"))
+SYNC_WRITE_INTERVAL = float(os.getenv("SYNC_WRITE_INTERVAL", "0.2"))
+# Seconds between incremental syncs when no new post has woken one
+SYNC_POLL_INTERVAL = float(os.getenv("SYNC_POLL_INTERVAL", "30"))
+SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", "1000000"))
+SEEN_FILTER_ERROR_RATE = float(os.getenv("SEEN_FILTER_ERROR_RATE", "0.01"))
+
+# IMDb metadata cache configuration (TTLs in seconds)
+IMDB_CACHE_SIZE = int(os.getenv("IMDB_CACHE_SIZE", "2048"))
+IMDB_CACHE_TTL = int(os.getenv("IMDB_CACHE_TTL", str(7 * 24 * 3600)))
+IMDB_NEGATIVE_CACHE_TTL = int(os.getenv("IMDB_NEGATIVE_CACHE_TTL", str(6 * 3600)))
+
+# IMDb request limits
+IMDB_WORKERS = int(os.getenv("IMDB_WORKERS", "4"))
+IMDB_RATE_LIMIT = float(os.getenv("IMDB_RATE_LIMIT", "2"))
+IMDB_RATE_BURST = int(os.getenv("IMDB_RATE_BURST", "5"))
+IMDB_RETRIES = int(os.getenv("IMDB_RETRIES", "3"))
+IMDB_RETRY_DELAY = float(os.getenv("IMDB_RETRY_DELAY", "1"))
+
+# Offline IMDb title index built from the public dataset dumps (empty to disable)
+IMDB_OFFLINE_INDEX = os.getenv("IMDB_OFFLINE_INDEX", "")
+
+# Minimum trigram similarity (0-1) for reusing existing media for a parsed title
+TITLE_MATCH_THRESHOLD = float(os.getenv("TITLE_MATCH_THRESHOLD", "0.9"))
+
+# Streaming chunk cache on local disk (size in bytes, 0 to disable)
+CHUNK_CACHE_DIR = os.getenv("CHUNK_CACHE_DIR", "./cache/chunks")
+CHUNK_CACHE_SIZE = int(os.getenv("CHUNK_CACHE_SIZE", str(2 * 1024 ** 3)))
+
+# Chunks loaded ahead of the one being sent, spread over the download bots
+STREAM_READ_AHEAD = int(os.getenv("STREAM_READ_AHEAD", "8"))
+
+# Download bot health: failures in a row before a bot rests, and the first rest in seconds
+BOT_FAILURE_THRESHOLD = int(os.getenv("BOT_FAILURE_THRESHOLD", "3"))
+BOT_FAILURE_COOLDOWN = int(os.getenv("BOT_FAILURE_COOLDOWN", "30"))
+
+# In-process cache of read API responses (TTL in seconds, size 0 to disable)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+
+# Where new media keep their seasons and files: "embedded" in the media document,
+# or "normalized" in the episodes and files collections
+MEDIA_LAYOUT = os.getenv("MEDIA_LAYOUT", "embedded")
+
+# Background IMDb enrichment: ingest stores provisional media at once and
+# queues the lookup (false to look up inline before storing)
+ENRICH_DEFERRED = os.getenv("ENRICH_DEFERRED", "true").lower() == "true"
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "2"))
+ENRICH_MAX_ATTEMPTS = int(os.getenv("ENRICH_MAX_ATTEMPTS", "8"))
+ENRICH_RETRY_DELAY = float(os.getenv("ENRICH_RETRY_DELAY", "30"))
+ENRICH_LEASE = float(os.getenv("ENRICH_LEASE", "300"))
+ENRICH_POLL_INTERVAL = float(os.getenv("ENRICH_POLL_INTERVAL", "1"))
+
+
+# Prometheus metrics at /metrics and the timing hooks that feed them
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Sampling profiler: fraction of requests profiled at random, seconds between
+# samples, and the token that flags a request (X-Profile header or ?profile=)
+# and unlocks /profiles (empty disables both)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
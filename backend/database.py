@@ -1,13 +1,26 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGODB_URI, DB_NAME
+from pymongo.errors import OperationFailure
+import logging
+from config import MONGODB_URI, DB_NAME, METRICS_ENABLED
+from utils.metrics import MongoCommandListener
 
-# MongoDB client
-client = AsyncIOMotorClient(MONGODB_URI)
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# MongoDB client, timing every command when metrics are on
+client = AsyncIOMotorClient(
+    MONGODB_URI,
+    event_listeners=[MongoCommandListener()] if METRICS_ENABLED else []
+)
 db = client[DB_NAME]
 
 # Collections
 media_collection = db["media"]
 files_collection = db["files"]
+episodes_collection = db["episodes"]
+sync_state_collection = db["sync_state"]
+imdb_cache_collection = db["imdb_cache"]
+enrichment_jobs_collection = db["enrichment_jobs"]
 
 # Indexes
 async def create_indexes():
@@ -19,11 +32,46 @@ async def create_indexes():
         ("original_filename", "text")
     ])
     
+    # Listing sorts, alone and behind the media_type and genre filters, with
+    # _id as the tie-breaker for cursor pagination
+    for sort_key in [("created_at", -1), ("rating", -1), ("title", 1)]:
+        direction = sort_key[1]
+        await media_collection.create_index([sort_key, ("_id", direction)])
+        await media_collection.create_index([("media_type", 1), sort_key, ("_id", direction)])
+        await media_collection.create_index([("genres", 1), sort_key, ("_id", direction)])
+    
     # Create index for slug (unique)
     await media_collection.create_index("slug", unique=True)
     
+    # Media without IMDb data are found again by the name, type and year
+    # they were parsed from
+    await media_collection.create_index([("parsed_title", 1), ("media_type", 1), ("release_year", 1)])
+    
+    # One media document per IMDb ID, so concurrent ingest upserts converge
+    try:
+        await media_collection.create_index(
+            "imdb_id",
+            unique=True,
+            partialFilterExpression={"imdb_id": {"$type": "string"}}
+        )
+    except OperationFailure as e:
+        logger.warning(f"Could not create unique imdb_id index (duplicate media?): {e}")
+    
     # Create index for file_id (unique)
     await files_collection.create_index("file_id", unique=True)
     
-    # Create index for media_id (for faster lookups)
-    await files_collection.create_index("media_id")
\ No newline at end of file
+    # Create index for media_id (for faster lookups); season and episode let
+    # season listings be grouped from the index alone
+    await files_collection.create_index([("media_id", 1), ("season", 1), ("episode", 1)])
+    
+    # One episode document per (media_id, season, episode) for normalized media
+    await episodes_collection.create_index(
+        [("media_id", 1), ("season", 1), ("episode", 1)],
+        unique=True
+    )
+    
+    # Due enrichment jobs, newest uploads first
+    await enrichment_jobs_collection.create_index([("state", 1), ("priority", -1), ("run_at", 1)])
+    
+    # Expire cached IMDb lookups at their own expires_at time
+    await imdb_cache_collection.create_index("expires_at", expireAfterSeconds=0)
\ No newline at end of file
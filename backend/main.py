@@ -1,8 +1,9 @@
 import asyncio
 import logging
+import time
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 
 # Configure logging
@@ -14,13 +15,19 @@ logging.basicConfig(
     ]
 )
 
-from config import API_PREFIX, SITE_PASSWORD
+from config import API_PREFIX, SITE_PASSWORD, METRICS_ENABLED
 from database import create_indexes
-from routes import search, media, files
-from utils.sync import initialize_sync, sync_channel
+from routes import search, media, files, profiles
+from utils.sync import initialize_sync, sync_channel, start_enrichment, start_listening, stop_sync
+from utils.metrics import registry, http_requests
+from utils.profiler import ProfilerMiddleware
 
 app = FastAPI(title="Teleflix API")
 
+# Sampling profiler, added first so it is the innermost middleware and runs
+# in the same task as the route it profiles
+app.add_middleware(ProfilerMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -46,10 +53,40 @@ async def password_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Route templates by endpoint, so request paths do not become metric labels
+route_templates = {}
+
+def route_template(request: Request) -> str:
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if not route_templates:
+        route_templates.update({route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")})
+    return route_templates.get(endpoint, "unmatched")
+
+# Request timing middleware, outermost so it covers the password check
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            http_requests.observe(
+                time.perf_counter() - started,
+                method=request.method,
+                route=route_template(request),
+                status=status
+            )
+
 # Include routers
 app.include_router(search.router, prefix=API_PREFIX)
 app.include_router(media.router, prefix=API_PREFIX)
 app.include_router(files.router, prefix=API_PREFIX)
+app.include_router(profiles.router, prefix=API_PREFIX)
 
 @app.on_event("startup")
 async def startup_event():
@@ -59,8 +96,19 @@ async def startup_event():
     # Initialize Telegram sync
     await initialize_sync()
     
+    # Look up metadata for provisional media in the background
+    start_enrichment()
+    
     # Sync channel in background
     asyncio.create_task(sync_channel())
+    
+    # Ingest new posts as they arrive
+    start_listening()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write out buffered sync writes and stop the Telegram clients
+    await stop_sync()
 
 @app.get("/")
 async def root():
@@ -70,5 +118,11 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
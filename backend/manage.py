@@ -0,0 +1,103 @@
+"""
+Maintenance commands for the Teleflix backend.
+
+Usage:
+    python manage.py build-title-index --basics title.basics.tsv.gz --ratings title.ratings.tsv.gz
+    python manage.py reparse --workers 8
+    python manage.py normalize-media --batch-size 200 --pause 0.1
+    python manage.py backfill-qualities
+    python manage.py retry-enrichment
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("manage")
+
+def build_title_index(args):
+    """Rebuild the offline IMDb title index from dataset dumps"""
+    from config import IMDB_OFFLINE_INDEX
+    from utils.title_index import build_index
+    
+    output = args.output or IMDB_OFFLINE_INDEX
+    if not output:
+        raise SystemExit("No output path: pass --output or set IMDB_OFFLINE_INDEX")
+    
+    started = time.monotonic()
+    counts = build_index(args.basics, args.ratings, output)
+    logger.info(f"Built {output} in {time.monotonic() - started:.1f}s: {counts}")
+
+def reparse(args):
+    """Re-parse stored filenames and rewrite changed file fields"""
+    from utils.maintenance import reparse_files
+    
+    started = time.monotonic()
+    stats = asyncio.run(reparse_files(args.workers, args.chunksize, args.dry_run))
+    logger.info(f"Reparsed in {time.monotonic() - started:.1f}s: {stats}")
+
+def normalize(args):
+    """Move embedded seasons and files into the episodes and files collections"""
+    from utils.maintenance import normalize_media
+    
+    started = time.monotonic()
+    stats = asyncio.run(normalize_media(args.batch_size, args.pause, args.dry_run))
+    logger.info(f"Normalized in {time.monotonic() - started:.1f}s: {stats}")
+
+def qualities(args):
+    """Store the file qualities of media from before ingest kept them, for search facets"""
+    from utils.maintenance import backfill_qualities
+    
+    started = time.monotonic()
+    stats = asyncio.run(backfill_qualities(args.batch_size, args.pause, args.dry_run))
+    logger.info(f"Backfilled qualities in {time.monotonic() - started:.1f}s: {stats}")
+
+def retry_enrichment(args):
+    """Requeue metadata lookups that ran out of attempts"""
+    from utils.enrichment import enrichment_queue
+    
+    count = asyncio.run(enrichment_queue.retry_dead())
+    logger.info(f"Requeued {count} enrichment jobs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Teleflix maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    index_parser = commands.add_parser("build-title-index", help=build_title_index.__doc__)
+    index_parser.add_argument("--basics", required=True, help="Path to title.basics.tsv(.gz)")
+    index_parser.add_argument("--ratings", required=True, help="Path to title.ratings.tsv(.gz)")
+    index_parser.add_argument("--output", help="Index path (defaults to IMDB_OFFLINE_INDEX)")
+    index_parser.set_defaults(handler=build_title_index)
+    
+    reparse_parser = commands.add_parser("reparse", help=reparse.__doc__)
+    reparse_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    reparse_parser.add_argument("--chunksize", type=int, default=2000, help="Files per parse chunk and bulk write")
+    reparse_parser.add_argument("--dry-run", action="store_true", help="Count changes without writing")
+    reparse_parser.set_defaults(handler=reparse)
+    
+    normalize_parser = commands.add_parser("normalize-media", help=normalize.__doc__)
+    normalize_parser.add_argument("--batch-size", type=int, default=200, help="Media documents per batch")
+    normalize_parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    normalize_parser.add_argument("--dry-run", action="store_true", help="Count what would move without writing")
+    normalize_parser.set_defaults(handler=normalize)
+    
+    qualities_parser = commands.add_parser("backfill-qualities", help=qualities.__doc__)
+    qualities_parser.add_argument("--batch-size", type=int, default=500, help="Media documents per batch")
+    qualities_parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between batches")
+    qualities_parser.add_argument("--dry-run", action="store_true", help="Count what would change without writing")
+    qualities_parser.set_defaults(handler=qualities)
+    
+    retry_parser = commands.add_parser("retry-enrichment", help=retry_enrichment.__doc__)
+    retry_parser.set_defaults(handler=retry_enrichment)
+    
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -61,6 +61,25 @@ class MediaResponse(BaseModel):
     genres: List[str] = []
     release_year: Optional[int] = None
     
+class FacetCount(BaseModel):
+    value: str
+    count: int
+    
 class SearchResponse(BaseModel):
     results: List[MediaResponse]
-    total: int
\ No newline at end of file
+    # Only counted when facets are requested
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, List[FacetCount]]] = None
+    
+class Suggestion(BaseModel):
+    id: str
+    title: str
+    slug: str
+    media_type: MediaType
+    poster: Optional[str] = None
+    rating: Optional[float] = None
+    release_year: Optional[int] = None
+    
+class SuggestResponse(BaseModel):
+    results: List[Suggestion]
\ No newline at end of file
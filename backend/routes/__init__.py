@@ -1,4 +1,5 @@
 # Import routes
 from . import search
 from . import media
-from . import files
\ No newline at end of file
+from . import files
+from . import profiles
\ No newline at end of file
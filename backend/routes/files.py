@@ -1,10 +1,20 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional
+from urllib.parse import quote
 from database import files_collection
-from config import BOT_TOKENS
+from config import BASE_URL, API_PREFIX
+from utils.streaming import parse_range, stream_file, guess_mime_type
+from utils.chunk_cache import chunk_cache
+from utils.sync import telegram_sync
 
 router = APIRouter()
 
+def content_link(file_id: str, download: bool = False) -> str:
+    """Public URL of the byte stream for a file"""
+    link = f"{BASE_URL}{API_PREFIX}/content/{quote(file_id)}"
+    return f"{link}?download=true" if download else link
+
 @router.get("/file/{file_id}")
 async def get_file_link(file_id: str):
     """
@@ -15,19 +25,9 @@ async def get_file_link(file_id: str):
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Get bot token for this file
-    bot_index = file.get("bot_index", 0)
-    if bot_index >= len(BOT_TOKENS):
-        bot_index = 0
-    
-    bot_token = BOT_TOKENS[bot_index]
-    
-    # Generate download link
-    download_link = f"https://api.telegram.org/file/bot{bot_token}/{file_id}"
-    
     return {
         "file_id": file_id,
-        "download_link": download_link,
+        "download_link": content_link(file_id, download=True),
         "file_size": file.get("file_size"),
         "quality": file.get("quality"),
         "source": file.get("source"),
@@ -44,21 +44,81 @@ async def get_stream_link(file_id: str):
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Get bot token for this file
-    bot_index = file.get("bot_index", 0)
-    if bot_index >= len(BOT_TOKENS):
-        bot_index = 0
-    
-    bot_token = BOT_TOKENS[bot_index]
-    
-    # Generate streaming link
-    stream_link = f"https://api.telegram.org/file/bot{bot_token}/{file_id}"
-    
     return {
         "file_id": file_id,
-        "stream_link": stream_link,
+        "stream_link": content_link(file_id),
         "file_size": file.get("file_size"),
         "quality": file.get("quality"),
         "source": file.get("source"),
         "format": file.get("format")
-    }
\ No newline at end of file
+    }
+
+@router.api_route("/content/{file_id}", methods=["GET", "HEAD"])
+async def get_file_content(
+    file_id: str,
+    request: Request,
+    download: bool = Query(False, description="Serve as an attachment")
+):
+    """
+    Stream file bytes from Telegram, honouring Range requests
+    """
+    file = await files_collection.find_one(
+        {"file_id": file_id},
+        {"file_size": 1, "filename": 1, "format": 1, "bot_index": 1}
+    )
+    
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    file_size = file.get("file_size") or 0
+    filename = file.get("filename") or file_id
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"{'attachment' if download else 'inline'}; filename*=UTF-8''{quote(filename)}"
+    }
+    
+    try:
+        byte_range = parse_range(request.headers.get("range"), file_size) if file_size else None
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+    
+    status_code = 200
+    start, end = 0, file_size - 1 if file_size else None
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    if end is not None:
+        headers["Content-Length"] = str(end - start + 1)
+    
+    media_type = guess_mime_type(filename, file.get("format"))
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    
+    return StreamingResponse(
+        stream_file(
+            telegram_sync.scheduler, file_id, start, end,
+            cache=chunk_cache, preferred=file.get("bot_index")
+        ),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
+
+@router.get("/streaming/stats")
+async def get_streaming_stats():
+    """
+    Get chunk cache usage and hit ratio
+    """
+    return {"chunk_cache": chunk_cache.get_stats()}
+
+@router.get("/streaming/bots")
+async def get_bot_status():
+    """
+    Get load and health of each download bot
+    """
+    return {"bots": telegram_sync.scheduler.get_status()}
@@ -1,16 +1,110 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-from database import media_collection
+from typing import Any, Dict, List, Optional
+from database import media_collection, files_collection
 from bson.objectid import ObjectId
+from utils.query_cache import query_cache
+from utils.catalog import is_normalized, attach_tree, load_seasons
+from utils.enrichment import enrichment_queue
+from utils.imdb import get_lookup_stats
+
+# Media fields shown above a season or episode; the seasons tree is fetched
+# only down to the requested path
+MEDIA_HEADER_PROJECTION = {
+    "title": 1,
+    "slug": 1,
+    "media_type": 1,
+    "poster": 1,
+    "backdrop": 1,
+    "plot": 1,
+    "rating": 1,
+    "genres": 1,
+    "release_year": 1,
+    "layout": 1
+}
 
 router = APIRouter()
 
+def media_header(media: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "_id": str(media["_id"]),
+        "title": media["title"],
+        "slug": media["slug"],
+        "media_type": media["media_type"],
+        "poster": media.get("poster"),
+        "backdrop": media.get("backdrop"),
+        "plot": media.get("plot"),
+        "rating": media.get("rating"),
+        "genres": media.get("genres", []),
+        "release_year": media.get("release_year")
+    }
+
+async def list_seasons(media_id: str) -> List[Dict[str, Any]]:
+    """
+    Season numbers with their episode numbers and file counts, grouped from
+    the files collection through its (media_id, season, episode) index
+    """
+    pipeline = [
+        {"$match": {"media_id": media_id}},
+        {"$group": {"_id": "$season", "episodes": {"$addToSet": "$episode"}, "files": {"$sum": 1}}},
+        {"$sort": {"_id": 1}}
+    ]
+    groups = await files_collection.aggregate(pipeline).to_list(length=None)
+    
+    # Files stored before they carried season numbers are only placed in the
+    # media document, so list those from there (normalized media always
+    # have them)
+    if any(group["_id"] is None for group in groups):
+        return await list_seasons_from_media(media_id)
+    
+    return [
+        {
+            "season_number": group["_id"],
+            "episodes": sorted(group["episodes"]),
+            "episode_count": len(group["episodes"]),
+            "file_count": group["files"]
+        }
+        for group in groups
+    ]
+
+async def list_seasons_from_media(media_id: str) -> List[Dict[str, Any]]:
+    """Same listing as list_seasons, computed server-side from the seasons tree"""
+    episodes = {"$objectToArray": {"$ifNull": ["$$season.v.episodes", {}]}}
+    pipeline = [
+        {"$match": {"_id": media_id}},
+        {"$project": {"_id": 0, "seasons": {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$seasons", {}]}},
+            "as": "season",
+            "in": {
+                "season_number": "$$season.v.season_number",
+                "episodes": {"$map": {"input": episodes, "in": "$$this.v.episode_number"}},
+                "file_count": {"$sum": {"$map": {"input": episodes, "in": {"$size": {"$ifNull": ["$$this.v.files", []]}}}}}
+            }
+        }}}}
+    ]
+    result = await media_collection.aggregate(pipeline).to_list(length=1)
+    seasons = result[0]["seasons"] if result else []
+    
+    listing = [
+        {
+            "season_number": season["season_number"],
+            "episodes": sorted(number for number in season["episodes"] if number is not None),
+            "episode_count": len(season["episodes"]),
+            "file_count": season["file_count"]
+        }
+        for season in seasons
+    ]
+    return sorted(listing, key=lambda season: season["season_number"] or 0)
+
 @router.get("/media/{slug}")
-async def get_media_by_slug(slug: str):
+async def get_media_by_slug(
+    slug: str,
+    summary: bool = Query(False, description="Leave out the seasons tree and list seasons instead")
+):
     """
     Get media details by slug
     """
-    media = await media_collection.find_one({"slug": slug})
+    projection = {"seasons": 0} if summary else None
+    media = await media_collection.find_one({"slug": slug}, projection)
     
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
@@ -18,8 +112,29 @@ async def get_media_by_slug(slug: str):
     # Convert ObjectId to string
     media["_id"] = str(media["_id"])
     
+    # Normalized media get the same files[] / seasons tree from their collections
+    await attach_tree(media, seasons=not summary)
+    
+    if summary and media.get("media_type") in ["series", "anime"]:
+        media["season_list"] = await list_seasons(media["_id"])
+    
     return media
 
+@router.get("/media/{slug}/seasons")
+async def get_seasons(slug: str):
+    """
+    List the seasons of a series with their episode numbers
+    """
+    media = await media_collection.find_one({"slug": slug}, MEDIA_HEADER_PROJECTION)
+    
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+    
+    if media.get("media_type") not in ["series", "anime"]:
+        raise HTTPException(status_code=400, detail="Not a series or anime")
+    
+    return {"media": media_header(media), "seasons": await list_seasons(str(media["_id"]))}
+
 @router.get("/media/id/{media_id}")
 async def get_media_by_id(media_id: str):
     """
@@ -36,22 +151,41 @@ async def get_media_by_id(media_id: str):
     # Convert ObjectId to string
     media["_id"] = str(media["_id"])
     
-    return media
+    return await attach_tree(media)
 
 @router.get("/genres")
 async def get_genres():
     """
     Get all available genres
     """
-    genres = await media_collection.distinct("genres")
-    return {"genres": genres}
+    async def compute():
+        genres = await media_collection.distinct("genres")
+        return {"genres": genres}
+    
+    return await query_cache.get_or_compute("genres", {}, compute)
+
+@router.get("/enrichment/stats")
+async def get_enrichment_stats():
+    """
+    Get background metadata lookup queue counts
+    """
+    return await enrichment_queue.get_stats()
+
+@router.get("/imdb/stats")
+async def get_imdb_stats():
+    """
+    Get IMDb metadata cache hit ratio and coalesced lookups
+    """
+    return get_lookup_stats()
 
 @router.get("/media/{slug}/season/{season}")
 async def get_season(slug: str, season: int):
     """
     Get season details for a series
     """
-    media = await media_collection.find_one({"slug": slug})
+    # Fetch only the header and this season, not every season's files
+    projection = {**MEDIA_HEADER_PROJECTION, f"seasons.{season}": 1}
+    media = await media_collection.find_one({"slug": slug}, projection)
     
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
@@ -59,27 +193,16 @@ async def get_season(slug: str, season: int):
     if media.get("media_type") not in ["series", "anime"]:
         raise HTTPException(status_code=400, detail="Not a series or anime")
     
+    if is_normalized(media):
+        media["seasons"] = await load_seasons(str(media["_id"]), season)
+    
     season_str = str(season)
     if season_str not in media.get("seasons", {}):
         raise HTTPException(status_code=404, detail="Season not found")
     
-    # Convert ObjectId to string
-    media["_id"] = str(media["_id"])
-    
     # Return only the requested season
     return {
-        "media": {
-            "_id": media["_id"],
-            "title": media["title"],
-            "slug": media["slug"],
-            "media_type": media["media_type"],
-            "poster": media.get("poster"),
-            "backdrop": media.get("backdrop"),
-            "plot": media.get("plot"),
-            "rating": media.get("rating"),
-            "genres": media.get("genres", []),
-            "release_year": media.get("release_year")
-        },
+        "media": media_header(media),
         "season": media["seasons"][season_str]
     }
 
@@ -88,7 +211,9 @@ async def get_episode(slug: str, season: int, episode: int):
     """
     Get episode details for a series
     """
-    media = await media_collection.find_one({"slug": slug})
+    # Fetch only the header and this episode, not the rest of the season
+    projection = {**MEDIA_HEADER_PROJECTION, f"seasons.{season}.episodes.{episode}": 1}
+    media = await media_collection.find_one({"slug": slug}, projection)
     
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
@@ -96,6 +221,9 @@ async def get_episode(slug: str, season: int, episode: int):
     if media.get("media_type") not in ["series", "anime"]:
         raise HTTPException(status_code=400, detail="Not a series or anime")
     
+    if is_normalized(media):
+        media["seasons"] = await load_seasons(str(media["_id"]), season, episode)
+    
     season_str = str(season)
     episode_str = str(episode)
     
@@ -105,23 +233,9 @@ async def get_episode(slug: str, season: int, episode: int):
     if episode_str not in media["seasons"][season_str].get("episodes", {}):
         raise HTTPException(status_code=404, detail="Episode not found")
     
-    # Convert ObjectId to string
-    media["_id"] = str(media["_id"])
-    
     # Return only the requested episode
     return {
-        "media": {
-            "_id": media["_id"],
-            "title": media["title"],
-            "slug": media["slug"],
-            "media_type": media["media_type"],
-            "poster": media.get("poster"),
-            "backdrop": media.get("backdrop"),
-            "plot": media.get("plot"),
-            "rating": media.get("rating"),
-            "genres": media.get("genres", []),
-            "release_year": media.get("release_year")
-        },
+        "media": media_header(media),
         "season": season,
         "episode": media["seasons"][season_str]["episodes"][episode_str]
     }
\ No newline at end of file
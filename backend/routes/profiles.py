@@ -0,0 +1,67 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from utils.profiler import request_profiler
+
+router = APIRouter()
+
+def require_profile_token(request: Request):
+    """Profiles expose code paths and parameters, so they need the profile token"""
+    if not request_profiler.token:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    token = request.headers.get("X-Profile-Token") or request.query_params.get("token")
+    if not request_profiler.check_token(token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+def get_profile(profile_id: str):
+    session = request_profiler.get(profile_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return session
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles(
+    limit: int = Query(20, ge=1, le=100, description="Number of profiles to return"),
+    kind: Optional[str] = Query(None, description="Only request or sync profiles")
+):
+    """
+    List the slowest recent profiles
+    """
+    return {
+        "profiles": [
+            {**session.summary(), "top_frames": session.top_frames(5)}
+            for session in request_profiler.slowest(limit, kind)
+        ]
+    }
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile_details(profile_id: str):
+    """
+    Get one profile with its hottest frames and sampled stacks
+    """
+    session = get_profile(profile_id)
+    return {**session.summary(), "top_frames": session.top_frames(50), "stacks": session.stacks}
+
+@router.get("/profiles/{profile_id}/folded", dependencies=[Depends(require_profile_token)])
+async def download_profile(profile_id: str):
+    """
+    Download a profile's stacks in the folded format used by flame graph tools
+    """
+    session = get_profile(profile_id)
+    return PlainTextResponse(
+        session.folded(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{session.id}.folded"'}
+    )
+
+@router.post("/profiles/sync", dependencies=[Depends(require_profile_token)])
+async def profile_sync(backfill: bool = Query(True, description="Continue the history backfill too")):
+    """
+    Run one channel sync in the background under the profiler
+    """
+    from utils.sync import sync_channel, sync_in_progress
+    
+    if sync_in_progress():
+        raise HTTPException(status_code=409, detail="A channel sync is already in progress")
+    asyncio.create_task(sync_channel(backfill, profile=True))
+    return {"started": True}
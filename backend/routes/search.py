@@ -1,16 +1,116 @@
+import asyncio
 from fastapi import APIRouter, Query, HTTPException
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from database import media_collection
-from models.media import MediaResponse, SearchResponse
+from models.media import MediaResponse, SearchResponse, FacetCount, Suggestion, SuggestResponse
+from utils.query_cache import query_cache
+from utils.suggest import suggest_index
+from utils.pagination import (
+    MEDIA_RESPONSE_PROJECTION, SORT_FIELDS, sort_spec, apply_cursor, cursor_after,
+    encode_cursor, decode_cursor
+)
+
+# $facet branches counting matches per filter value
+FACET_STAGES = {
+    "genres": [{"$unwind": "$genres"}, {"$sortByCount": "$genres"}],
+    "media_types": [{"$sortByCount": "$media_type"}],
+    # Media stored before ingest kept "qualities" get it from the
+    # backfill-qualities maintenance command
+    "qualities": [{"$unwind": "$qualities"}, {"$sortByCount": "$qualities"}]
+}
 
 router = APIRouter()
 
+def to_response(doc) -> MediaResponse:
+    return MediaResponse(
+        id=doc["_id"],
+        title=doc["title"],
+        slug=doc["slug"],
+        media_type=doc["media_type"],
+        poster=doc.get("poster"),
+        rating=doc.get("rating"),
+        genres=doc.get("genres", []),
+        release_year=doc.get("release_year")
+    )
+
+async def fetch_page(query, sort: str, limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of media for a query, with the cursor for the next page. Pages
+    are plain finds, so the sort indexes bound their cost however many
+    documents match.
+    """
+    try:
+        if sort == "relevance":
+            # The text score cannot be filtered on, so this cursor holds an offset
+            offset = int(decode_cursor(cursor).get("skip", 0)) if cursor else 0
+            if offset < 0:
+                raise ValueError("Negative offset")
+            score = {"score": {"$meta": "textScore"}}
+            pages = (
+                media_collection.find(query, {**MEDIA_RESPONSE_PROJECTION, **score})
+                .sort([("score", {"$meta": "textScore"}), ("_id", 1)])
+                .skip(offset)
+            )
+        else:
+            field, direction = SORT_FIELDS[sort]
+            pages = (
+                media_collection.find(apply_cursor(query, cursor, field, direction), {**MEDIA_RESPONSE_PROJECTION, field: 1})
+                .sort(sort_spec(field, direction))
+            )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Fetch one extra document to know whether another page follows
+    docs = await pages.limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        if sort == "relevance":
+            next_cursor = encode_cursor({"skip": offset + limit})
+        else:
+            next_cursor = cursor_after(docs[limit - 1], field)
+    return docs[:limit], next_cursor
+
+async def count_matches(query) -> Tuple[int, Dict[str, List[FacetCount]]]:
+    """The total match count and the facet counts for a query, from one aggregation"""
+    branches = {"total": [{"$count": "count"}], **FACET_STAGES}
+    pipeline = [{"$match": query}, {"$facet": branches}]
+    result = (await media_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=1))[0]
+    
+    total = result["total"][0]["count"] if result["total"] else 0
+    facet_counts = {
+        name: [FacetCount(value=bucket["_id"], count=bucket["count"]) for bucket in result[name] if bucket["_id"] is not None]
+        for name in FACET_STAGES
+    }
+    return total, facet_counts
+
+async def fetch_results(query, sort: str, limit: int, cursor: Optional[str], facets: bool) -> SearchResponse:
+    """
+    A page of results. Counting every match is only worth it when facets
+    are asked for; the count then runs alongside the page.
+    """
+    total, facet_counts = None, None
+    if facets:
+        (docs, next_cursor), (total, facet_counts) = await asyncio.gather(
+            fetch_page(query, sort, limit, cursor),
+            count_matches(query)
+        )
+    else:
+        docs, next_cursor = await fetch_page(query, sort, limit, cursor)
+    
+    # Convert to response model
+    results = [to_response(doc) for doc in docs]
+    
+    return SearchResponse(results=results, total=total, next_cursor=next_cursor, facets=facet_counts)
+
 @router.get("/search", response_model=SearchResponse)
 async def search(
     q: str = Query(..., description="Search query"),
     media_type: Optional[str] = Query(None, description="Filter by media type (movie, series, anime)"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
-    sort: str = Query("recent", description="Sort by (recent, popular, az)")
+    sort: str = Query("recent", description="Sort by (recent, popular, az, relevance)"),
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+    facets: bool = Query(True, description="Include the total and genre, type and quality counts")
 ):
     """
     Search for media by title, genre, or filename
@@ -25,44 +125,21 @@ async def search(
     if genre:
         query["genres"] = genre
     
-    # Determine sort order
-    sort_options = {
-        "recent": [("created_at", -1)],
-        "popular": [("rating", -1)],
-        "az": [("title", 1)]
-    }
-    
-    sort_order = sort_options.get(sort, sort_options["recent"])
-    
-    # Execute query
-    cursor = media_collection.find(
-        query,
-        {"score": {"$meta": "textScore"}}
-    ).sort(sort_order)
+    if sort != "relevance" and sort not in SORT_FIELDS:
+        sort = "recent"
     
-    # Get total count
-    total = await media_collection.count_documents(query)
-    
-    # Convert to response model
-    results = []
-    async for doc in cursor:
-        results.append(MediaResponse(
-            id=doc["_id"],
-            title=doc["title"],
-            slug=doc["slug"],
-            media_type=doc["media_type"],
-            poster=doc.get("poster"),
-            rating=doc.get("rating"),
-            genres=doc.get("genres", []),
-            release_year=doc.get("release_year")
-        ))
+    async def compute():
+        return await fetch_results(query, sort, limit, cursor, facets)
     
-    return SearchResponse(results=results, total=total)
+    params = {"q": q, "media_type": media_type, "genre": genre, "sort": sort, "limit": limit, "cursor": cursor, "facets": facets}
+    return await query_cache.get_or_compute("search", params, compute)
 
 @router.get("/recent", response_model=SearchResponse)
 async def get_recent(
-    limit: int = Query(20, description="Number of results to return"),
-    media_type: Optional[str] = Query(None, description="Filter by media type")
+    limit: int = Query(20, ge=1, le=100, description="Number of results to return"),
+    media_type: Optional[str] = Query(None, description="Filter by media type"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+    facets: bool = Query(False, description="Include the total and genre, type and quality counts")
 ):
     """
     Get recent uploads
@@ -72,24 +149,28 @@ async def get_recent(
     if media_type:
         query["media_type"] = media_type
     
-    # Execute query
-    cursor = media_collection.find(query).sort("created_at", -1).limit(limit)
-    
-    # Get total count
-    total = await media_collection.count_documents(query)
-    
-    # Convert to response model
-    results = []
-    async for doc in cursor:
-        results.append(MediaResponse(
-            id=doc["_id"],
-            title=doc["title"],
-            slug=doc["slug"],
-            media_type=doc["media_type"],
-            poster=doc.get("poster"),
-            rating=doc.get("rating"),
-            genres=doc.get("genres", []),
-            release_year=doc.get("release_year")
-        ))
+    async def compute():
+        return await fetch_results(query, "recent", limit, cursor, facets)
     
-    return SearchResponse(results=results, total=total)
\ No newline at end of file
+    params = {"media_type": media_type, "limit": limit, "cursor": cursor, "facets": facets}
+    return await query_cache.get_or_compute("recent", params, compute)
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    q: str = Query(..., description="Beginning of a title or a word in it"),
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions to return"),
+    media_type: Optional[str] = Query(None, description="Filter by media type")
+):
+    """
+    Suggest titles as the user types, best rated and newest first
+    """
+    # Answered from the in-memory prefix index, so there is nothing to cache
+    results = [Suggestion(**media) for media in suggest_index.suggest(q, limit, media_type)]
+    return SuggestResponse(results=results)
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get response cache hit ratio and size
+    """
+    return query_cache.get_stats()
@@ -0,0 +1,238 @@
+import asyncio
+import copy
+import os
+import sys
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+# Tests import the backend modules the way main.py does, from the backend
+# directory. The MongoDB client connects lazily, so no server is needed as
+# long as the collections a test touches are replaced.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "teleflix_test")
+
+from bson.objectid import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# Pyrogram needs an event loop at import, before any test has run one
+import utils.sync as sync_module
+from utils.checkpoint import checkpoint_store
+from utils.enrichment import enrichment_queue
+from utils.matcher import TitleMatcher
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+def _parent(doc: Dict[str, Any], path: str):
+    *parents, field = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    return doc, field
+
+def _matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for path, condition in query.items():
+        value = _get(doc, path)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for operator, operand in condition.items():
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if operator == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if operator == "$exists" and (value is not None) != operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+def _apply(doc: Dict[str, Any], update: Dict[str, Any], inserted: bool):
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserted:
+            continue
+        for path, value in fields.items():
+            parent, field = _parent(doc, path)
+            if operator in ("$set", "$setOnInsert"):
+                parent[field] = copy.deepcopy(value)
+            elif operator == "$unset":
+                parent.pop(field, None)
+            elif operator == "$inc":
+                parent[field] = parent.get(field, 0) + value
+            elif operator == "$max":
+                if field not in parent or value > parent[field]:
+                    parent[field] = value
+            elif operator in ("$push", "$addToSet"):
+                values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                target = parent.setdefault(field, [])
+                for item in values:
+                    if operator == "$push" or item not in target:
+                        target.append(copy.deepcopy(item))
+
+class FakeCollection:
+    """In-memory stand-in for the parts of a Motor collection the sync uses"""
+    def __init__(self, name: str = "fake", unique: tuple = ()):
+        self.name = name
+        self.unique = unique
+        self.docs: List[Dict[str, Any]] = []
+
+    def _insert(self, doc: Dict[str, Any]):
+        for field in self.unique:
+            if doc.get(field) is not None and any(other.get(field) == doc[field] for other in self.docs):
+                raise DuplicateKeyError(f"duplicate {field}", 11000, {"keyPattern": {field: 1}})
+        doc.setdefault("_id", str(ObjectId()))
+        self.docs.append(doc)
+
+    def _find(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return next((doc for doc in self.docs if _matches(doc, query)), None)
+
+    def _update(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> Optional[Any]:
+        """Update the first matching document; returns the _id of an upserted one"""
+        doc = self._find(query)
+        if doc is not None:
+            _apply(doc, update, inserted=False)
+            return None
+        if not upsert:
+            return None
+        doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+        _apply(doc, update, inserted=True)
+        self._insert(doc)
+        return doc["_id"]
+
+    async def find_one(self, query: Dict[str, Any], projection=None, **kwargs):
+        doc = self._find(query)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection=None, **kwargs):
+        return FakeCursor([copy.deepcopy(doc) for doc in self.docs if _matches(doc, query or {})])
+
+    async def update_one(self, query, update, upsert: bool = False):
+        return SimpleNamespace(upserted_id=self._update(query, update, upsert))
+
+    async def update_many(self, query, update, upsert: bool = False):
+        matched = [doc for doc in self.docs if _matches(doc, query)]
+        for doc in matched:
+            _apply(doc, update, inserted=False)
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def delete_one(self, query):
+        doc = self._find(query)
+        if doc is not None:
+            self.docs.remove(doc)
+
+    async def delete_many(self, query):
+        self.docs = [doc for doc in self.docs if not _matches(doc, query)]
+
+    async def bulk_write(self, operations, ordered: bool = True):
+        upserted_ids, errors = {}, []
+        for index, operation in enumerate(operations):
+            try:
+                if isinstance(operation, InsertOne):
+                    self._insert(copy.deepcopy(operation._doc))
+                elif isinstance(operation, UpdateOne):
+                    upserted_id = self._update(operation._filter, operation._doc, operation._upsert)
+                    if upserted_id is not None:
+                        upserted_ids[index] = upserted_id
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": operation})
+        if errors:
+            upserted = [{"index": index, "_id": _id} for index, _id in upserted_ids.items()]
+            raise BulkWriteError({"writeErrors": errors, "upserted": upserted})
+        return SimpleNamespace(upserted_ids=upserted_ids)
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs) -> "FakeCursor":
+        return self
+
+    def hint(self, *args, **kwargs) -> "FakeCursor":
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+class FakeChannel:
+    """Stand-in for the Pyrogram client's get_chat_history, newest first"""
+    def __init__(self, filenames: List[str], fail_after: Optional[int] = None):
+        self.messages = [
+            SimpleNamespace(
+                id=index + 1,
+                media=True,
+                document=SimpleNamespace(file_id=f"file-{index + 1}", file_size=10 ** 9, file_name=filename),
+                video=None,
+                caption=None
+            )
+            for index, filename in enumerate(filenames)
+        ]
+        self.fail_after = fail_after
+        self.handlers = []
+
+    def add_handler(self, handler):
+        self.handlers.append(handler)
+
+    async def get_chat_history(self, chat_id, limit: int = 0, offset_id: int = 0, **kwargs):
+        served = 0
+        for message in reversed(self.messages):
+            if offset_id and message.id >= offset_id:
+                continue
+            if limit and served >= limit:
+                return
+            if self.fail_after is not None and served >= self.fail_after:
+                raise ConnectionError("connection lost")
+            served += 1
+            yield message
+
+@pytest.fixture
+def collections(monkeypatch):
+    """Replace every collection the sync touches with an in-memory one"""
+    fakes = SimpleNamespace(
+        media=FakeCollection("media", unique=("slug",)),
+        files=FakeCollection("files", unique=("file_id",)),
+        episodes=FakeCollection("episodes"),
+        sync_state=FakeCollection("sync_state"),
+        enrichment_jobs=FakeCollection("enrichment_jobs")
+    )
+    monkeypatch.setattr(sync_module, "media_collection", fakes.media)
+    monkeypatch.setattr(sync_module, "files_collection", fakes.files)
+    monkeypatch.setattr(sync_module, "episodes_collection", fakes.episodes)
+    monkeypatch.setattr(sync_module, "title_matcher", TitleMatcher())
+    monkeypatch.setattr(checkpoint_store, "collection", fakes.sync_state)
+    monkeypatch.setattr(enrichment_queue, "collection", fakes.enrichment_jobs)
+    return fakes
+
+@pytest.fixture
+def run():
+    """Run coroutines on one event loop for the whole test"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop.run_until_complete
+    loop.close()
+    asyncio.set_event_loop(None)
+
+@pytest.fixture
+def telegram_sync(collections, run):
+    """A TelegramSync writing to the in-memory collections, without a channel"""
+    sync = sync_module.TelegramSync()
+    sync.media_writer.flush_interval = sync.file_writer.flush_interval = sync.episode_writer.flush_interval = 0.01
+    return sync
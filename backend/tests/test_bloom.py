@@ -0,0 +1,16 @@
+from utils.bloom import BloomFilter
+
+def test_added_items_are_always_found():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    ids = [f"file-{i}" for i in range(1000)]
+    bloom.update(ids)
+
+    assert len(bloom) == 1000
+    assert all(file_id in bloom for file_id in ids)
+
+def test_false_positives_stay_near_the_error_rate():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    bloom.update(f"file-{i}" for i in range(2000))
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 200
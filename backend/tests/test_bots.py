@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from pyrogram.errors import FileReferenceExpired, FloodWait
+
+from config import BOT_FAILURE_THRESHOLD
+from utils.bots import BotScheduler
+from utils.streaming import fetch_chunk
+
+class FakeBot:
+    """Download client that answers every chunk request with one outcome"""
+    def __init__(self, name: str, error: Exception = None):
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    async def stream_media(self, file_id, limit=1, offset=0):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        yield f"{self.name}:{offset}".encode()
+
+def scheduler_with(*bots) -> BotScheduler:
+    scheduler = BotScheduler()
+    scheduler.register(list(bots))
+    return scheduler
+
+def use(scheduler, index, error):
+    async def transfer():
+        async with scheduler.use(index):
+            raise error
+    with pytest.raises(type(error)):
+        asyncio.run(transfer())
+
+def test_repeated_failures_rest_a_bot():
+    scheduler = scheduler_with(FakeBot("a"), FakeBot("b"))
+    for _ in range(BOT_FAILURE_THRESHOLD):
+        assert scheduler.pick() == 0
+        use(scheduler, 0, ConnectionError("connection reset"))
+
+    status = scheduler.get_status()[0]
+    assert status["failures"] == BOT_FAILURE_THRESHOLD and not status["healthy"]
+    assert scheduler.pick() == 1
+
+def test_flood_wait_rests_a_bot_for_the_requested_time():
+    scheduler = scheduler_with(FakeBot("a"), FakeBot("b"))
+    use(scheduler, 0, FloodWait(value=60))
+
+    status = scheduler.get_status()[0]
+    assert status["flood_waits"] == 1 and 55 < status["cooldown_seconds"] <= 60
+    assert scheduler.pick() == 1
+
+def test_file_errors_do_not_count_against_a_bot():
+    scheduler = scheduler_with(FakeBot("a"), FakeBot("b"))
+    for _ in range(BOT_FAILURE_THRESHOLD + 1):
+        use(scheduler, 0, FileReferenceExpired())
+
+    status = scheduler.get_status()[0]
+    assert status["failures"] == 0 and status["healthy"]
+
+def test_fetch_chunk_moves_on_from_a_failing_bot():
+    bots = [FakeBot("a", ConnectionError("connection reset")), FakeBot("b")]
+    scheduler = scheduler_with(*bots)
+
+    assert asyncio.run(fetch_chunk(scheduler, "file", 3, preferred=0)) == b"b:3"
+    assert [bot.calls for bot in bots] == [1, 1]
+
+def test_fetch_chunk_raises_file_errors_without_retrying():
+    bots = [FakeBot("a", FileReferenceExpired()), FakeBot("b")]
+    scheduler = scheduler_with(*bots)
+
+    with pytest.raises(FileReferenceExpired):
+        asyncio.run(fetch_chunk(scheduler, "file", 0, preferred=0))
+    assert [bot.calls for bot in bots] == [1, 0]
@@ -0,0 +1,31 @@
+import asyncio
+
+from utils.chunk_cache import ChunkCache
+
+def test_reads_slice_cached_chunks(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_bytes=1000)
+
+    async def scenario():
+        assert await cache.read("file", 0) is None
+        await cache.write("file", 0, b"0123456789")
+        return await cache.read("file", 0), await cache.read("file", 0, 2, 5)
+
+    assert asyncio.run(scenario()) == (b"0123456789", b"234")
+    assert cache.get_stats()["hits"] == 2 and cache.get_stats()["misses"] == 1
+
+def test_least_recently_used_blocks_are_evicted(tmp_path):
+    cache = ChunkCache(str(tmp_path), max_bytes=25)
+
+    async def scenario():
+        await cache.write("file", 0, b"a" * 10)
+        await cache.write("file", 1, b"b" * 10)
+        # Reading chunk 0 makes chunk 1 the oldest
+        await cache.read("file", 0)
+        await cache.write("file", 2, b"c" * 10)
+
+    asyncio.run(scenario())
+    assert [cache.contains("file", index) for index in range(3)] == [True, False, True]
+    assert cache.size == 20
+
+    # A restarted cache finds the blocks left on disk
+    assert ChunkCache(str(tmp_path), max_bytes=25).size == 20
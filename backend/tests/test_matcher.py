@@ -0,0 +1,47 @@
+import pytest
+
+from utils.matcher import TitleMatcher, numbers
+
+@pytest.fixture
+def matcher():
+    matcher = TitleMatcher(threshold=0.9)
+    matcher.add("hp1", ["Harry Potter and the Deathly Hallows Part 1"], "movie")
+    matcher.add("wick3", ["John Wick Chapter 3"], "movie")
+    matcher.add("sw4", ["Star Wars Episode IV"], "movie")
+    matcher.add("mi7", ["Mission Impossible Dead Reckoning Part One"], "movie")
+    matcher.add("office", ["The Office"], "series", 2005)
+    return matcher
+
+def test_numbers_read_digits_numerals_and_words():
+    assert numbers("part 2") == numbers("part ii") == numbers("part two") == (2,)
+    assert numbers("i robot") == ()
+
+@pytest.mark.parametrize("title", [
+    "Harry Potter and the Deathly Hallows Part 2",
+    "John Wick Chapter 4",
+    "Star Wars Episode V",
+    "Mission Impossible Dead Reckoning Part Two",
+])
+def test_sequels_do_not_match_each_other(matcher, title):
+    assert matcher.match(title, "movie") is None
+
+def test_near_duplicate_titles_match(matcher):
+    assert matcher.match("Harry.Potter.and.the.Deathly.Hallows.Part.1", "movie")[0] == "hp1"
+    assert matcher.match("Harry Potter and the Deathly Halows Part 1", "movie")[0] == "hp1"
+    assert matcher.match("Mission Impossible Dead Reckonin Part One", "movie")[0] == "mi7"
+    assert matcher.match("John Wick: Chapter 3", "movie")[0] == "wick3"
+
+def test_year_and_type_must_agree(matcher):
+    assert matcher.match("The Office", "series", 2005)[0] == "office"
+    assert matcher.match("The Office", "series", 2001) is None
+    assert matcher.match("The Office", "movie") is None
+
+def test_relink_and_set_year_update_one_media(matcher):
+    matcher.add("office-uk", ["The Office"], "series", 2001)
+    matcher.relink("office", "office-us")
+    matcher.set_year("office-us", 2006)
+
+    assert "office" not in matcher.slots
+    assert matcher.match("The Office", "series", 2006)[0] == "office-us"
+    assert matcher.match("The Office", "series", 2001)[0] == "office-uk"
+    assert matcher.match("The Office", "series", 2005) is None
@@ -0,0 +1,32 @@
+from utils.metrics import Registry
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("test_seconds", "Test timings", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value, stage="parse")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP test_seconds Test timings", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_seconds_bucket{stage="parse",le="1"} 3',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'test_seconds_sum{stage="parse"} 6.25',
+        'test_seconds_count{stage="parse"} 4',
+    ]
+
+def test_labels_are_escaped_and_failing_collectors_are_skipped():
+    registry = Registry()
+    counter = registry.counter("test_total", "Test counter", ["route"])
+    gauge = registry.gauge("test_gauge", "Test gauge")
+    counter.inc(route='/a"b\\c')
+
+    def broken():
+        raise RuntimeError("collector failed")
+    registry.add_collector(broken)
+    registry.add_collector(lambda: gauge.set(3))
+
+    rendered = registry.render()
+    assert 'test_total{route="/a\\"b\\\\c"} 1' in rendered
+    assert "test_gauge 3" in rendered
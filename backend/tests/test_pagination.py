@@ -0,0 +1,52 @@
+import datetime
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from routes.search import fetch_page
+from utils.pagination import apply_cursor, cursor_after, decode_cursor, encode_cursor, keyset_filter
+
+def test_cursors_round_trip_bson_values():
+    created_at = datetime.datetime(2024, 5, 1, 12, 30)
+    cursor = encode_cursor({"v": created_at, "id": "65f0c0ffee"})
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"v": created_at, "id": "65f0c0ffee"}
+    assert decode_cursor(cursor_after({"_id": "a", "rating": 8.1}, "rating")) == {"v": 8.1, "id": "a"}
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", encode_cursor({"v": 1})[:-3], "WzFd"])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_keyset_filter_continues_after_the_last_document():
+    assert keyset_filter("rating", -1, 8.1, "a") == {"$or": [
+        {"rating": {"$lt": 8.1}},
+        {"rating": 8.1, "_id": {"$lt": "a"}},
+        {"rating": None},
+    ]}
+    # Ascending past a missing value: the rest of the nulls, then every value
+    assert keyset_filter("title", 1, None, "a") == {"$or": [
+        {"title": None, "_id": {"$gt": "a"}},
+        {"title": {"$ne": None}},
+    ]}
+
+def test_apply_cursor_keeps_the_query_at_the_top_level():
+    query = {"$text": {"$search": "dune"}, "media_type": "movie"}
+    cursor = encode_cursor({"v": 8.1, "id": "a"})
+
+    assert apply_cursor(query, None, "rating", -1) is query
+    assert apply_cursor(query, cursor, "rating", -1) == {
+        **query,
+        "$and": [keyset_filter("rating", -1, 8.1, "a")]
+    }
+    with pytest.raises(ValueError):
+        apply_cursor(query, encode_cursor({"v": 8.1}), "rating", -1)
+
+@pytest.mark.parametrize("cursor", [encode_cursor({"skip": -20}), encode_cursor({"skip": "x"}), "not a cursor!"])
+def test_bad_relevance_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(fetch_page({"$text": {"$search": "dune"}}, "relevance", 20, cursor))
+    assert error.value.status_code == 400
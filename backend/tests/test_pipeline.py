@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from utils.pipeline import Pipeline
+
+async def items(count, fail_after=None):
+    for i in range(count):
+        if i == fail_after:
+            raise ConnectionError("connection lost")
+        yield i
+
+def make_pipeline(results):
+    async def double(item):
+        return item * 2
+
+    async def collect(item):
+        results.append(item)
+        return item
+
+    return Pipeline("test", queue_size=4).add_stage("double", double, workers=2).add_stage("collect", collect)
+
+def test_run_drains_every_item():
+    results = []
+    stats = asyncio.run(make_pipeline(results).run(items(20)))
+
+    assert sorted(results) == [i * 2 for i in range(20)]
+    assert stats["source"]["processed"] == 20
+    assert stats["collect"]["processed"] == 20
+
+def test_failing_handler_only_loses_its_item():
+    async def pick(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    results = []
+
+    async def collect(item):
+        results.append(item)
+        return item
+
+    pipeline = Pipeline("test").add_stage("pick", pick).add_stage("collect", collect)
+    stats = asyncio.run(pipeline.run(items(5)))
+
+    assert sorted(results) == [0, 1, 2, 4]
+    assert stats["pick"]["failed"] == 1
+
+def test_source_failure_raises_after_draining():
+    results = []
+    pipeline = make_pipeline(results)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(pipeline.run(items(20, fail_after=7)))
+
+    # Items read before the failure still went through every stage
+    assert sorted(results) == [i * 2 for i in range(7)]
+    assert pipeline.stats()["source"]["failed"] == 1
+
+def test_observe_gets_every_handler_call():
+    calls = []
+    pipeline = make_pipeline([])
+    pipeline.observe = lambda stage, seconds: calls.append(stage)
+    asyncio.run(pipeline.run(items(5)))
+
+    assert sorted(calls) == ["collect"] * 5 + ["double"] * 5
@@ -0,0 +1,17 @@
+from utils.profiler import Profiler, PROFILE_HEADER, PROFILE_PARAM
+
+def test_requests_are_flagged_by_the_token_only():
+    profiler = Profiler(sample_rate=0, token="secret")
+
+    assert profiler.enabled
+    assert profiler.should_profile({PROFILE_HEADER: "secret"}, {})
+    assert profiler.should_profile({}, {PROFILE_PARAM: ["wrong", "secret"]})
+    assert not profiler.should_profile({PROFILE_HEADER: "secrets"}, {PROFILE_PARAM: ["wrong"]})
+    assert not profiler.check_token(None)
+
+def test_profiling_is_off_without_a_token_or_sampling():
+    profiler = Profiler(sample_rate=0, token="")
+
+    assert not profiler.enabled
+    assert not profiler.check_token("")
+    assert not profiler.should_profile({PROFILE_HEADER: ""}, {})
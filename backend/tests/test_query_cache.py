@@ -0,0 +1,59 @@
+import asyncio
+
+from utils.query_cache import QueryCache, make_key
+
+def counting():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+    return calls, compute
+
+def test_keys_ignore_order_unset_params_and_query_case():
+    assert make_key("search", {"q": " Dark  Knight", "limit": 20, "cursor": None}) == make_key(
+        "search", {"limit": 20, "q": "dark knight"}
+    )
+
+def test_invalidate_drops_every_cached_response():
+    cache = QueryCache(max_size=10, ttl=60)
+    calls, compute = counting()
+
+    async def scenario():
+        first = await cache.get_or_compute("recent", {"limit": 20}, compute)
+        cached = await cache.get_or_compute("recent", {"limit": 20}, compute)
+        cache.invalidate()
+        fresh = await cache.get_or_compute("recent", {"limit": 20}, compute)
+        return first, cached, fresh
+
+    assert asyncio.run(scenario()) == (1, 1, 2)
+    assert cache.get_stats()["invalidated"] == 1
+
+def test_responses_computed_across_an_invalidation_are_not_cached():
+    cache = QueryCache(max_size=10, ttl=60)
+    calls, compute = counting()
+
+    async def slow():
+        # The sync writes while this response is being computed
+        cache.invalidate()
+        return await compute()
+
+    async def scenario():
+        await cache.get_or_compute("recent", {}, slow)
+        return await cache.get_or_compute("recent", {}, compute)
+
+    assert asyncio.run(scenario()) == 2
+
+def test_concurrent_misses_share_one_computation():
+    cache = QueryCache(max_size=10, ttl=60)
+    calls, compute = counting()
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return await compute()
+
+    async def scenario():
+        return await asyncio.gather(*[cache.get_or_compute("recent", {}, slow) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == [1] * 5
+    assert cache.get_stats()["coalesced"] == 4
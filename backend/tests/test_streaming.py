@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from utils.bots import BotScheduler
+from utils.streaming import CHUNK_SIZE, parse_range, stream_file
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("items=0-10", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-9, 20-29", (0, 9)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=500-100", "bytes=-0", "bytes=abc-", "bytes=-"])
+def test_unsatisfiable_ranges_raise(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+class FileBot:
+    """Download client serving one file from memory"""
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def stream_media(self, file_id, limit=1, offset=0):
+        chunk = self.data[offset * CHUNK_SIZE:(offset + 1) * CHUNK_SIZE]
+        if chunk:
+            yield chunk
+
+def read(data: bytes, start: int, end=None, read_ahead: int = 2) -> bytes:
+    scheduler = BotScheduler()
+    scheduler.register([FileBot(data), FileBot(data)])
+
+    async def collect():
+        return b"".join([part async for part in stream_file(scheduler, "file", start, end, read_ahead=read_ahead)])
+    return asyncio.run(collect())
+
+def test_stream_file_returns_exactly_the_range():
+    data = bytes(range(256)) * (CHUNK_SIZE * 3 // 256 + 7)
+
+    assert read(data, 0) == data
+    assert read(data, CHUNK_SIZE - 10, CHUNK_SIZE + 10) == data[CHUNK_SIZE - 10:CHUNK_SIZE + 11]
+    assert read(data, 2 * CHUNK_SIZE + 5, read_ahead=8) == data[2 * CHUNK_SIZE + 5:]
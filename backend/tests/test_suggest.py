@@ -0,0 +1,32 @@
+from utils.suggest import SHORT_PREFIX_TOP, SuggestIndex
+
+def media(media_id, title, rating, media_type="movie"):
+    return {"_id": media_id, "title": title, "slug": media_id, "media_type": media_type, "rating": rating}
+
+def test_long_prefixes_rank_every_match():
+    index = SuggestIndex()
+    index.build([media(f"trek-{i}", f"Star Trek {i}", 5.0) for i in range(500)])
+    # Sorts after every "star trek" key, and is added after the build
+    index.add(media("wars", "Star Wars", 8.6))
+
+    assert [hit["id"] for hit in index.suggest("star", 1)] == ["wars"]
+    assert [hit["id"] for hit in index.suggest("Star W", 5)] == ["wars"]
+
+def test_media_type_is_filtered_before_the_top_results():
+    index = SuggestIndex()
+    movies = [media(f"movie-{i}", f"Saga {i}", 9.0) for i in range(SHORT_PREFIX_TOP + 5)]
+    index.build(movies + [media("show", "Sagas", 6.0, "series")])
+    index.add(media("anime", "Sakura", 5.0, "anime"))
+
+    for query in ("s", "sa", "sag", "saga"):
+        assert [hit["id"] for hit in index.suggest(query, 3, "series")] == ["show"]
+    assert [hit["id"] for hit in index.suggest("sa", 3, "anime")] == ["anime"]
+    assert len(index.suggest("sa", 50)) == SHORT_PREFIX_TOP
+
+def test_removed_media_are_not_suggested():
+    index = SuggestIndex()
+    index.build([media("a", "Arrival", 7.9), media("b", "Argo", 7.7)])
+    index.remove("a")
+
+    assert [hit["id"] for hit in index.suggest("ar", 5)] == ["b"]
+    assert [hit["id"] for hit in index.suggest("arri", 5)] == []
@@ -0,0 +1,263 @@
+import asyncio
+
+import pytest
+
+import utils.sync as sync_module
+from conftest import FakeChannel
+from config import CHANNEL_ID
+from utils.checkpoint import checkpoint_store
+from utils import metrics
+from utils.metrics import stage_durations
+
+FILENAMES = [
+    "Inception.2010.1080p.BluRay.x264-SPARKS.mkv",
+    "Breaking.Bad.S01E01.720p.HDTV.x264.mkv",
+    "Breaking.Bad.S01E02.720p.HDTV.x264.mkv",
+    "Interstellar.2014.2160p.WEB-DL.x265.mkv",
+    "Breaking.Bad.S02E01.1080p.WEB-DL.x264.mkv",
+]
+
+@pytest.fixture
+def deferred(monkeypatch):
+    monkeypatch.setattr(sync_module, "ENRICH_DEFERRED", True)
+
+def stage_count(stage):
+    state = stage_durations._values.get((stage,))
+    return state[2] if state else 0
+
+def test_run_pipeline_stores_every_message(telegram_sync, collections, deferred, run):
+    telegram_sync.app = FakeChannel(FILENAMES)
+    timed = {stage: stage_count(stage) for stage in ("parse", "enrich", "persist")}
+
+    stats = run(telegram_sync.sync_recent(limit=10))
+
+    # Every message is timed in every stage
+    assert all(stage_count(stage) == count + len(FILENAMES) for stage, count in timed.items())
+
+    assert stats["source"]["processed"] == len(FILENAMES)
+    assert stats["persist"]["processed"] == len(FILENAMES)
+    assert stats["writes"]["files"]["operations"] == len(FILENAMES)
+    assert stats["seen_filter"]["size"] == len(FILENAMES)
+
+    assert sorted(doc["file_id"] for doc in collections.files.docs) == [f"file-{i}" for i in range(1, 6)]
+    titles = sorted(doc["title"] for doc in collections.media.docs)
+    assert titles == ["Breaking Bad", "Inception", "Interstellar"]
+    assert all(doc.get("provisional") for doc in collections.media.docs)
+    assert len(collections.enrichment_jobs.docs) == 3
+
+    series = next(doc for doc in collections.media.docs if doc["media_type"] == "series")
+    assert set(series["seasons"]) == {"1", "2"}
+    assert len(collections.episodes.docs) == 3
+
+def test_incremental_sync_advances_checkpoint(telegram_sync, collections, deferred, run):
+    telegram_sync.app = FakeChannel(FILENAMES)
+    run(checkpoint_store.set_last_message_id(CHANNEL_ID, 2))
+
+    result = run(telegram_sync.sync_incremental())
+
+    assert result == {"messages": 3, "last_message_id": 5}
+    assert sorted(doc["file_id"] for doc in collections.files.docs) == ["file-3", "file-4", "file-5"]
+    assert run(checkpoint_store.get(CHANNEL_ID))["last_message_id"] == 5
+
+def test_incremental_sync_keeps_checkpoint_when_history_fails(telegram_sync, collections, deferred, run):
+    telegram_sync.app = FakeChannel(FILENAMES, fail_after=1)
+    run(checkpoint_store.set_last_message_id(CHANNEL_ID, 2))
+
+    with pytest.raises(ConnectionError):
+        run(telegram_sync.sync_incremental())
+
+    # Message 5 was stored, but 3 and 4 were never read
+    assert [doc["file_id"] for doc in collections.files.docs] == ["file-5"]
+    assert run(checkpoint_store.get(CHANNEL_ID))["last_message_id"] == 2
+
+def test_backfill_is_not_completed_by_a_failed_page(telegram_sync, collections, deferred, run):
+    telegram_sync.app = FakeChannel(FILENAMES, fail_after=0)
+    run(checkpoint_store.set_backfill_offset(CHANNEL_ID, 6))
+
+    with pytest.raises(ConnectionError):
+        run(telegram_sync.sync_backfill())
+
+    state = run(checkpoint_store.get(CHANNEL_ID))
+    assert state["backfill_offset_id"] == 6
+    assert not state["backfill_complete"]
+
+def imdb_result(imdb_id, title, year, media_type="series"):
+    async def search_imdb(*args, **kwargs):
+        return {
+            "imdb_id": imdb_id, "title": title, "slug": title.lower().replace(" ", "-"),
+            "poster": None, "plot": "", "rating": 9.5, "genres": ["Drama"], "release_year": year
+        }
+    return search_imdb
+
+def test_provisional_media_keep_the_parsed_year(telegram_sync, collections, deferred, run, monkeypatch):
+    telegram_sync.app = FakeChannel(FILENAMES[:1])
+    run(telegram_sync.sync_recent(limit=10))
+
+    media = collections.media.docs[0]
+    assert media["provisional"] and media["release_year"] == 2010
+
+    # IMDb's year replaces the parsed one for every indexed name
+    monkeypatch.setattr(sync_module, "search_imdb", imdb_result("tt1375666", "Inception", 2011, "movie"))
+    run(telegram_sync.enrich_media(collections.enrichment_jobs.docs[0]))
+
+    matcher = sync_module.title_matcher
+    assert {matcher.years[i] for i, media_id in enumerate(matcher.media_ids) if media_id == media["_id"]} == {2011}
+    assert matcher.match("Inception", "movie", 2011)[0] == media["_id"]
+    assert matcher.match("Inception", "movie", 2010) is None
+
+def test_relink_moves_normalized_files_into_an_embedded_target(telegram_sync, collections, deferred, run, monkeypatch):
+    collections.media.docs.append({
+        "_id": "target", "imdb_id": "tt0903747", "title": "Breaking Bad", "slug": "breaking-bad-2008",
+        "media_type": "series", "seasons": {}
+    })
+    monkeypatch.setattr(sync_module, "MEDIA_LAYOUT", sync_module.NORMALIZED)
+    telegram_sync.app = FakeChannel(FILENAMES[1:3])
+    run(telegram_sync.sync_recent(limit=10))
+    provisional = next(doc for doc in collections.media.docs if doc.get("provisional"))
+
+    monkeypatch.setattr(sync_module, "search_imdb", imdb_result("tt0903747", "Breaking Bad", 2008))
+    run(telegram_sync.enrich_media(collections.enrichment_jobs.docs[0]))
+
+    assert [doc["_id"] for doc in collections.media.docs] == ["target"]
+    assert {doc["media_id"] for doc in collections.files.docs} == {"target"}
+    assert {doc["media_id"] for doc in collections.episodes.docs} == {"target"}
+    episodes = collections.media.docs[0]["seasons"]["1"]["episodes"]
+    assert sorted(episodes) == ["1", "2"]
+    assert [file["file_id"] for file in episodes["2"]["files"]] == ["file-2"]
+    assert telegram_sync._relinked[provisional["_id"]] == "target"
+
+def test_writes_waiting_on_a_relink_follow_it(telegram_sync, collections, deferred, run):
+    telegram_sync.app = FakeChannel(FILENAMES[1:2])
+    run(telegram_sync.sync_recent(limit=10))
+    old_id = collections.media.docs[0]["_id"]
+
+    async def scenario():
+        message = FakeChannel(FILENAMES[2:3]).messages[0]
+        message.document.file_id = "file-late"
+        entry = await telegram_sync.parse_message(message)
+        entry["media_id"] = old_id
+        async with telegram_sync._media_lock(old_id):
+            # The store resolved the provisional id before the redirect
+            store = asyncio.ensure_future(telegram_sync.persist_entry(entry))
+            await asyncio.sleep(0)
+            telegram_sync._relinked[old_id] = "target"
+        await store
+        await telegram_sync.flush_writes()
+
+    run(scenario())
+    assert next(doc for doc in collections.files.docs if doc["file_id"] == "file-late")["media_id"] == "target"
+
+def test_new_posts_wake_the_listener(telegram_sync, collections, deferred, run):
+    channel = telegram_sync.app = FakeChannel(FILENAMES)
+    run(checkpoint_store.set_last_message_id(CHANNEL_ID, 4))
+
+    async def scenario():
+        # A long poll interval, so only the post itself can start the sync
+        telegram_sync.start_listening(poll_interval=60)
+        await channel.handlers[0].callback(channel, channel.messages[-1])
+        for _ in range(100):
+            if collections.files.docs:
+                break
+            await asyncio.sleep(0.01)
+        telegram_sync._listener.cancel()
+        await asyncio.gather(telegram_sync._listener, return_exceptions=True)
+
+    run(scenario())
+    assert [doc["file_id"] for doc in collections.files.docs] == ["file-5"]
+    assert run(checkpoint_store.get(CHANNEL_ID))["last_message_id"] == 5
+
+def test_only_one_channel_sync_runs_at_a_time(telegram_sync, collections, deferred, run):
+    telegram_sync.app = FakeChannel(FILENAMES)
+
+    async def scenario():
+        first = asyncio.ensure_future(telegram_sync.sync_channel(backfill=False))
+        await asyncio.sleep(0)
+        assert telegram_sync.syncing
+        second = await telegram_sync.sync_channel(backfill=False)
+        return await first, second
+
+    first, second = run(scenario())
+    assert "error" not in first
+    assert "already in progress" in second["error"]
+    assert not telegram_sync.syncing
+
+def test_files_without_a_name_use_the_caption(telegram_sync, collections, deferred, run):
+    channel = telegram_sync.app = FakeChannel(FILENAMES[:2])
+    channel.messages[0].document.file_name = None
+    channel.messages[0].caption = "Inception.2010.1080p.BluRay.x264-SPARKS.mkv\nUploaded by someone"
+    channel.messages[1].document.file_name = None
+
+    run(telegram_sync.sync_recent(limit=10))
+
+    filenames = {doc["file_id"]: doc["filename"] for doc in collections.files.docs}
+    assert filenames == {"file-1": "Inception.2010.1080p.BluRay.x264-SPARKS.mkv", "file-2": "file-2"}
+    assert not telegram_sync._inflight_files
+
+def failing_parser(monkeypatch, bad_filenames):
+    parse_filename = sync_module.parse_filename
+
+    def parse(filename):
+        if filename in bad_filenames:
+            raise TypeError("cannot parse")
+        return parse_filename(filename)
+    monkeypatch.setattr(sync_module, "parse_filename", parse)
+
+def test_incremental_checkpoint_stops_before_a_failed_message(telegram_sync, collections, deferred, run, monkeypatch):
+    telegram_sync.app = FakeChannel(FILENAMES)
+    run(checkpoint_store.set_last_message_id(CHANNEL_ID, 2))
+    parse_filename = sync_module.parse_filename
+    failing_parser(monkeypatch, {FILENAMES[3]})
+
+    result = run(telegram_sync.sync_incremental())
+
+    assert result["last_message_id"] == 3
+    assert sorted(doc["file_id"] for doc in collections.files.docs) == ["file-3", "file-5"]
+    assert not telegram_sync._inflight_files
+
+    # The next run picks the failed message up again
+    monkeypatch.setattr(sync_module, "parse_filename", parse_filename)
+    assert run(telegram_sync.sync_incremental())["last_message_id"] == 5
+    assert sorted(doc["file_id"] for doc in collections.files.docs) == ["file-3", "file-4", "file-5"]
+
+def test_backfill_stops_at_a_failed_message(telegram_sync, collections, deferred, run, monkeypatch):
+    telegram_sync.app = FakeChannel(FILENAMES)
+    run(checkpoint_store.set_backfill_offset(CHANNEL_ID, 6))
+    failing_parser(monkeypatch, {FILENAMES[2]})
+
+    result = run(telegram_sync.sync_backfill())
+
+    assert result == {"messages": 5, "pages": 1, "complete": False, "offset_id": 4}
+    state = run(checkpoint_store.get(CHANNEL_ID))
+    assert state["backfill_offset_id"] == 4 and not state["backfill_complete"]
+
+def test_same_titled_media_stay_apart(telegram_sync, collections, deferred, run):
+    collections.media.docs.append({"_id": "other", "title": "Dune", "slug": "dune", "media_type": "movie", "release_year": 2021})
+    telegram_sync.app = FakeChannel([
+        "Dune.1984.1080p.BluRay.x264.mkv",
+        "Dune.2000.S01E01.720p.HDTV.x264.mkv",
+        "Fargo.1996.1080p.BluRay.x264.mkv",
+        "Fargo.S01E01.720p.HDTV.x264.mkv",
+    ])
+
+    run(telegram_sync.sync_recent(limit=10))
+
+    created = [doc for doc in collections.media.docs if doc["_id"] != "other"]
+    assert sorted((doc["title"], doc["media_type"], doc["release_year"]) for doc in created) == [
+        ("Dune", "movie", 1984), ("Dune", "series", 2000), ("Fargo", "movie", 1996), ("Fargo", "series", None)
+    ]
+    # "dune" belongs to the 2021 film, so both new Dunes get their own slug
+    assert len({doc["slug"] for doc in collections.media.docs}) == 5
+    assert {doc["media_id"] for doc in collections.files.docs} == {doc["_id"] for doc in created}
+    assert len(collections.enrichment_jobs.docs) == 4
+
+def test_lag_counts_posts_without_media_as_handled(telegram_sync, collections, deferred, run, monkeypatch):
+    channel = telegram_sync.app = FakeChannel(FILENAMES[:2] + ["notice"])
+    channel.messages[-1].media = None
+    monkeypatch.setattr(metrics.sync_head, "_values", {})
+    monkeypatch.setattr(metrics.sync_handled, "_values", {})
+
+    run(telegram_sync.sync_recent(limit=10))
+    metrics.registry.render()
+
+    assert metrics.sync_head.get() == 3
+    assert metrics.sync_lag.get() == 0
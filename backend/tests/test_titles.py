@@ -0,0 +1,20 @@
+from utils.imdb_cache import make_key
+from utils.parser import normalize_title
+
+def test_normalize_ascii_titles():
+    assert normalize_title("The.Office_US ") == "the office us"
+    assert normalize_title("Spider-Man: No Way Home") == "spider man no way home"
+
+def test_normalize_keeps_non_ascii_titles():
+    assert normalize_title("進撃の巨人") == "進撃の巨人"
+    assert normalize_title("Атака Титанов") == "атака титанов"
+    assert normalize_title("Amélie") == "amélie"
+    # Full-width forms compare equal to their ASCII counterparts
+    assert normalize_title("ＳＰＹ×ＦＡＭＩＬＹ") == "spy family"
+
+def test_distinct_non_ascii_titles_get_distinct_keys():
+    assert make_key("進撃の巨人", 2013, "series") != make_key("鬼滅の刃", 2013, "series")
+    assert make_key("The Office", None, "series") == make_key("the.office ", None, "series")
+
+def test_titles_without_letters_are_not_cached():
+    assert make_key("!!! ???", 2020, "movie") is None
@@ -0,0 +1,49 @@
+import hashlib
+import math
+from typing import Iterable
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. A miss is definite; a hit is only
+    probable and has to be confirmed against the source of truth.
+
+    Sized for capacity items at error_rate false positives. For 1M Telegram
+    file_ids (~80 characters each) at 1% this is 1.2 MB with 7 hash
+    functions (1.8 MB at 0.1%), against ~70 MB for a set of 64-bit hashes
+    and ~160 MB for a set of the id strings themselves. Past capacity the
+    false positive rate climbs, so size it with room to grow.
+    """
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
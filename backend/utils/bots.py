@@ -0,0 +1,137 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from pyrogram.errors import BadRequest, FloodWait
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import BOT_FAILURE_THRESHOLD, BOT_FAILURE_COOLDOWN
+from utils.metrics import bot_requests
+
+# Latency assumed for a bot before it has served anything
+DEFAULT_LATENCY = 0.5
+
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.2
+
+# Errors about the requested file rather than the bot: an invalid or expired
+# file id or reference, or one that does not decode. Every bot would fail
+# the same way, so they do not count against a bot and are not retried.
+FILE_ERRORS = (BadRequest, ValueError)
+
+class BotState:
+    """Load and health of one download client"""
+    def __init__(self, index: int, client: Any):
+        self.index = index
+        self.client = client
+        self.name = getattr(client, "name", f"bot_{index}")
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.flood_waits = 0
+        self.consecutive_failures = 0
+        self.latency: Optional[float] = None
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "name": self.name,
+            "healthy": self.healthy(now),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "flood_waits": self.flood_waits,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "cooldown_seconds": round(max(self.cooldown_until - now, 0), 1),
+            "last_error": self.last_error
+        }
+
+class BotScheduler:
+    """
+    Pick a download client per request: the healthy bot with the lowest
+    expected wait, (in-flight transfers + 1) x recent latency. Bots sit out
+    a FloodWait for as long as Telegram asks, and after repeated failures
+    for a growing cooldown. Only transport and Telegram server errors count
+    as failures; errors about the file itself do not. If every bot is
+    cooling down, the one that recovers first is used.
+    """
+    def __init__(self):
+        self.bots: List[BotState] = []
+
+    def register(self, clients: List[Any]):
+        self.bots = [BotState(index, client) for index, client in enumerate(clients)]
+
+    @property
+    def size(self) -> int:
+        return len(self.bots)
+
+    def _expected_wait(self, bot: BotState) -> float:
+        latency = bot.latency
+        if latency is None:
+            known = [b.latency for b in self.bots if b.latency is not None]
+            latency = sum(known) / len(known) if known else DEFAULT_LATENCY
+        return (bot.in_flight + 1) * latency
+
+    def pick(self, exclude=(), preferred: Optional[int] = None) -> int:
+        """Index of the bot to use next, or -1 if none are registered"""
+        candidates = [bot for bot in self.bots if bot.index not in exclude] or self.bots
+        if not candidates:
+            return -1
+
+        now = time.monotonic()
+        healthy = [bot for bot in candidates if bot.healthy(now)]
+        if not healthy:
+            return min(candidates, key=lambda bot: bot.cooldown_until).index
+        return min(
+            healthy,
+            key=lambda bot: (self._expected_wait(bot), bot.index != preferred, bot.index)
+        ).index
+
+    @asynccontextmanager
+    async def use(self, index: int):
+        """Track one transfer on a bot, recording its latency and outcome"""
+        bot = self.bots[index]
+        bot.in_flight += 1
+        bot.requests += 1
+        started = time.monotonic()
+        try:
+            yield bot.client
+        except FloodWait as e:
+            bot_requests.observe(time.monotonic() - started, bot=bot.name, outcome="flood_wait")
+            bot.flood_waits += 1
+            bot.last_error = f"FloodWait {e.value}s"
+            bot.cooldown_until = time.monotonic() + e.value
+            logger.warning(f"{bot.name} hit FloodWait, resting for {e.value}s")
+            raise
+        except FILE_ERRORS:
+            bot_requests.observe(time.monotonic() - started, bot=bot.name, outcome="file_error")
+            raise
+        except Exception as e:
+            bot_requests.observe(time.monotonic() - started, bot=bot.name, outcome="error")
+            bot.failures += 1
+            bot.consecutive_failures += 1
+            bot.last_error = str(e)
+            if bot.consecutive_failures >= BOT_FAILURE_THRESHOLD:
+                backoff = BOT_FAILURE_COOLDOWN * 2 ** (bot.consecutive_failures - BOT_FAILURE_THRESHOLD)
+                bot.cooldown_until = time.monotonic() + min(backoff, 3600)
+                logger.warning(f"{bot.name} failed {bot.consecutive_failures} times in a row, resting for {backoff}s")
+            raise
+        else:
+            elapsed = time.monotonic() - started
+            bot_requests.observe(elapsed, bot=bot.name, outcome="ok")
+            bot.latency = elapsed if bot.latency is None else (1 - LATENCY_ALPHA) * bot.latency + LATENCY_ALPHA * elapsed
+            bot.consecutive_failures = 0
+        finally:
+            bot.in_flight -= 1
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [bot.to_dict(now) for bot in self.bots]
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class BulkWriter:
+    """
+    Buffer write operations for one collection and send them as unordered
+    bulk_write calls once batch_size operations are queued or flush_interval
+    seconds have passed since the first one. Every operation gets a future
+    that resolves when its batch is written: to the upserted _id for upserts
+    that inserted a document, otherwise None. Operations that fail inside a
+    batch fail only their own future, with a WriteError (DuplicateKeyError for
+    duplicate keys). on_flush, if given, is called after every batch that
+    wrote anything.
+    """
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        name: str = "",
+        on_flush: Optional[Callable[[], None]] = None
+    ):
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.name = name or collection.name
+        self.on_flush = on_flush
+        self._buffer: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+        self.stats = {"operations": 0, "batches": 0, "errors": 0, "size_flushes": 0, "timed_flushes": 0}
+        self._batch_seconds = 0.0
+
+    async def add(self, operation) -> asyncio.Future:
+        """Queue an operation, flushing first if the batch is full"""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._buffer.append((operation, future))
+        self.stats["operations"] += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self.stats["size_flushes"] += 1
+            await self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._flush_later)
+        return future
+
+    def _flush_later(self):
+        self._timer = None
+        if self._buffer:
+            self.stats["timed_flushes"] += 1
+            task = asyncio.ensure_future(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        """Write everything buffered so far"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        operations = [operation for operation, _ in batch]
+        started = time.perf_counter()
+        upserted: Dict[int, Any] = {}
+        errors: Dict[int, Exception] = {}
+
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids or {}
+        except BulkWriteError as e:
+            upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+            for error in e.details.get("writeErrors", []):
+                error_class = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                errors[error["index"]] = error_class(error.get("errmsg"), error.get("code"), error)
+                logger.error(f"Bulk write to {self.name} failed for {error.get('op')}: {error.get('errmsg')}")
+        except Exception as e:
+            logger.error(f"Bulk write of {len(batch)} operations to {self.name} failed: {e}")
+            errors = {index: e for index in range(len(batch))}
+        finally:
+            self._batch_seconds += time.perf_counter() - started
+            self.stats["batches"] += 1
+
+        self.stats["errors"] += len(errors)
+        if self.on_flush is not None and len(errors) < len(batch):
+            self.on_flush()
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(upserted.get(index))
+
+    async def close(self):
+        """Flush the remaining buffer and wait for timed flushes in progress"""
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "buffered": len(self._buffer),
+            "ops_per_batch": round(self.stats["operations"] / batches, 1) if batches else 0.0,
+            "mean_batch_ms": round(self._batch_seconds / batches * 1000, 2) if batches else 0.0
+        }
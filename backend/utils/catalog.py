@@ -0,0 +1,72 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from database import episodes_collection, files_collection
+
+# Value of a media document's "layout" once its seasons and files live in
+# the episodes and files collections instead of being embedded
+NORMALIZED = "normalized"
+
+# File fields as they appear embedded in a media document
+FILE_PROJECTION = {"_id": 0, "media_id": 0}
+
+def is_normalized(media: Dict[str, Any]) -> bool:
+    return media.get("layout") == NORMALIZED
+
+async def load_files(media_id: str) -> List[Dict[str, Any]]:
+    """A movie's files, in the order they were stored"""
+    cursor = files_collection.find({"media_id": media_id}, FILE_PROJECTION).sort("_id", 1)
+    return await cursor.to_list(length=None)
+
+async def load_seasons(media_id: str, season: Optional[int] = None, episode: Optional[int] = None) -> Dict[str, Any]:
+    """
+    The seasons tree of a normalized series, or just one season or episode
+    of it, shaped like the embedded seasons -> episodes -> files dicts. Both
+    queries are served by the (media_id, season, episode) indexes.
+    """
+    query: Dict[str, Any] = {"media_id": media_id}
+    if season is not None:
+        query["season"] = season
+        if episode is not None:
+            query["episode"] = episode
+
+    seasons: Dict[str, Any] = {}
+
+    def episode_entry(season_number: int, episode_number: int) -> Dict[str, Any]:
+        season_entry = seasons.setdefault(str(season_number), {"season_number": season_number, "episodes": {}})
+        return season_entry["episodes"].setdefault(
+            str(episode_number), {"episode_number": episode_number, "files": []}
+        )
+
+    projection = {"_id": 0, "season": 1, "episode": 1, "title": 1}
+    async for doc in episodes_collection.find(query, projection).sort([("season", 1), ("episode", 1)]):
+        entry = episode_entry(doc["season"], doc["episode"])
+        if doc.get("title"):
+            entry["title"] = doc["title"]
+
+    async for doc in files_collection.find(query, FILE_PROJECTION).sort("_id", 1):
+        if doc.get("season") is None or doc.get("episode") is None:
+            continue
+        episode_entry(doc["season"], doc["episode"])["files"].append(doc)
+
+    return seasons
+
+async def attach_tree(media: Dict[str, Any], seasons: bool = True) -> Dict[str, Any]:
+    """
+    Give a normalized media document the files[] or seasons tree it would
+    have had embedded, so responses keep their shape. Embedded documents
+    are returned unchanged.
+    """
+    if not is_normalized(media):
+        return media
+
+    del media["layout"]
+    media_id = str(media["_id"])
+    if media.get("media_type") == "movie":
+        media["files"] = await load_files(media_id)
+    elif seasons:
+        media["seasons"] = await load_seasons(media_id)
+    return media
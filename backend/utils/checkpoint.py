@@ -0,0 +1,54 @@
+import logging
+from typing import Dict, Any
+from datetime import datetime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from database import sync_state_collection
+
+class CheckpointStore:
+    """
+    Persisted sync progress per channel.
+
+    - last_message_id: newest message id that has been ingested; incremental
+      syncs only fetch messages above it
+    - backfill_offset_id: exclusive upper bound of the next backfill page;
+      the backfill walks older history below it
+    - backfill_complete: set once the backfill reaches the start of the channel
+    """
+    def __init__(self, collection=sync_state_collection):
+        self.collection = collection
+    
+    async def get(self, channel_id: int) -> Dict[str, Any]:
+        state = await self.collection.find_one({"_id": channel_id})
+        return state or {"_id": channel_id}
+    
+    async def set_last_message_id(self, channel_id: int, message_id: int):
+        # $max keeps the checkpoint monotonic if syncs overlap
+        await self.collection.update_one(
+            {"_id": channel_id},
+            {
+                "$max": {"last_message_id": message_id},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+    
+    async def set_backfill_offset(self, channel_id: int, offset_id: int, complete: bool = False):
+        await self.collection.update_one(
+            {"_id": channel_id},
+            {
+                "$set": {
+                    "backfill_offset_id": offset_id,
+                    "backfill_complete": complete,
+                    "updated_at": datetime.utcnow()
+                }
+            },
+            upsert=True
+        )
+    
+    async def reset(self, channel_id: int):
+        await self.collection.delete_one({"_id": channel_id})
+
+checkpoint_store = CheckpointStore()
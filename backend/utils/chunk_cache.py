@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import CHUNK_CACHE_DIR, CHUNK_CACHE_SIZE
+
+def _read_block(path: str, low: int, high: Optional[int]) -> bytes:
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as block:
+            return block[low:high]
+
+def _write_block(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _remove_blocks(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class ChunkCache:
+    """
+    On-disk LRU cache of streamed file chunks, keyed by (file_id, chunk
+    index). Each chunk is one block file under the cache directory; reads
+    memory-map the block and slice the requested bytes straight out of the
+    page cache. Blocks are evicted least recently used first once the total
+    size passes max_bytes. Disk I/O runs on the default executor so the
+    event loop never waits on the disk.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._blocks: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0, "bytes_served": 0}
+        if self.enabled:
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    @staticmethod
+    def _digest(file_id: str) -> str:
+        return hashlib.sha1(file_id.encode()).hexdigest()
+
+    def _path(self, digest: str, index: int) -> str:
+        return os.path.join(self.directory, digest[:2], digest, f"{index}.chunk")
+
+    def _scan(self):
+        """Rebuild the index from blocks left by a previous run, oldest first"""
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                index = name[:-len(".chunk")]
+                if not name.endswith(".chunk") or not index.isdigit():
+                    # Leftover temp files from interrupted writes
+                    _remove_blocks([path])
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, os.path.basename(root), int(index), stat.st_size))
+
+        for _, digest, index, size in sorted(found):
+            self._blocks[(digest, index)] = size
+            self.size += size
+        if found:
+            logger.info(f"Chunk cache holds {len(self._blocks)} blocks ({self.size / 1e9:.2f} GB)")
+
+    def contains(self, file_id: str, index: int) -> bool:
+        return (self._digest(file_id), index) in self._blocks
+
+    async def read(self, file_id: str, index: int, low: int = 0, high: Optional[int] = None) -> Optional[bytes]:
+        """Bytes low..high of a cached chunk, or None on a miss"""
+        key = (self._digest(file_id), index)
+        if key not in self._blocks:
+            self.stats["misses"] += 1
+            return None
+
+        self._blocks.move_to_end(key)
+        loop = asyncio.get_event_loop()
+        try:
+            data = await loop.run_in_executor(None, _read_block, self._path(*key), low, high)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache block {key}: {e}")
+            self._forget(key)
+            self.stats["errors"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        self.stats["bytes_served"] += len(data)
+        return data
+
+    async def write(self, file_id: str, index: int, data: bytes):
+        """Store a whole chunk, evicting old blocks to stay within budget"""
+        if not self.enabled or not data or len(data) > self.max_bytes:
+            return
+
+        key = (self._digest(file_id), index)
+        if key in self._blocks:
+            return
+
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, _write_block, self._path(*key), data)
+        except OSError as e:
+            logger.warning(f"Could not cache chunk {index} of {file_id}: {e}")
+            self.stats["errors"] += 1
+            return
+
+        if key in self._blocks:
+            # Another stream cached the same chunk meanwhile
+            return
+        self._blocks[key] = len(data)
+        self.size += len(data)
+        self.stats["writes"] += 1
+
+        evicted = []
+        while self.size > self.max_bytes and self._blocks:
+            old_key = next(iter(self._blocks))
+            self._forget(old_key)
+            evicted.append(self._path(*old_key))
+        if evicted:
+            self.stats["evictions"] += len(evicted)
+            await loop.run_in_executor(None, _remove_blocks, evicted)
+
+    def _forget(self, key: Tuple[str, int]):
+        size = self._blocks.pop(key, None)
+        if size is not None:
+            self.size -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "blocks": len(self._blocks),
+            "size_bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+# Create singleton instance
+chunk_cache = ChunkCache(CHUNK_CACHE_DIR, CHUNK_CACHE_SIZE)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the
+    work, later callers await the same in-flight result.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["calls"] += 1
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            # Shield so a cancelled follower does not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+class TokenBucket:
+    """
+    Async token bucket rate limiter: allows `rate` acquisitions per second
+    on average, with bursts of up to `capacity`. A rate of 0 disables it.
+    """
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        # Created lazily so it binds to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+async def retry_async(
+    fn: Callable[[], Awaitable[Any]],
+    attempts: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    name: str = "call"
+) -> Any:
+    """Await fn(), retrying failures with exponential backoff and jitter"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt >= attempts:
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.5)
+            logger.warning(f"{name} failed (attempt {attempt}/{attempts}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
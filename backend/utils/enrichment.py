@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import (
+    ENRICH_WORKERS, ENRICH_MAX_ATTEMPTS, ENRICH_RETRY_DELAY, ENRICH_LEASE, ENRICH_POLL_INTERVAL
+)
+from database import enrichment_jobs_collection
+
+# Job states; finished jobs are deleted
+PENDING = "pending"
+RUNNING = "running"
+DEAD = "dead"
+
+# Longest wait between attempts, in seconds
+MAX_RETRY_DELAY = 6 * 3600
+
+class EnrichmentQueue:
+    """
+    Persistent queue of metadata lookups for provisional media, one job per
+    media document. Workers claim the due job with the highest priority (the
+    newest message) and hold it for a lease; a worker that dies mid-job
+    leaves it to be claimed again once the lease runs out. Failed jobs are
+    retried with exponential backoff and end up dead after max_attempts,
+    where they stay until retried by hand.
+    """
+    def __init__(
+        self,
+        collection=enrichment_jobs_collection,
+        workers: int = ENRICH_WORKERS,
+        max_attempts: int = ENRICH_MAX_ATTEMPTS,
+        retry_delay: float = ENRICH_RETRY_DELAY,
+        lease: float = ENRICH_LEASE,
+        poll_interval: float = ENRICH_POLL_INTERVAL
+    ):
+        self.collection = collection
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"enqueued": 0, "completed": 0, "retried": 0, "gave_up": 0}
+
+    async def enqueue(self, media_id: str, payload: Dict[str, Any], priority: int = 0):
+        """Queue a lookup for a media document unless one is already queued"""
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": media_id},
+            {
+                "$setOnInsert": {
+                    "state": PENDING,
+                    "attempts": 0,
+                    "run_at": now,
+                    "created_at": now,
+                    **payload
+                },
+                # Later uploads for the same media make the job more urgent
+                "$max": {"priority": priority},
+                "$set": {"updated_at": now}
+            },
+            upsert=True
+        )
+        self.stats["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """Take the most urgent due job, or None if nothing is due"""
+        now = datetime.utcnow()
+        # Running jobs are due again once their lease (stored in run_at) expires
+        return await self.collection.find_one_and_update(
+            {"state": {"$in": [PENDING, RUNNING]}, "run_at": {"$lte": now}},
+            {
+                "$set": {"state": RUNNING, "run_at": now + timedelta(seconds=self.lease), "updated_at": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", -1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def complete(self, job: Dict[str, Any]):
+        # Matching on attempts leaves the job alone if its lease was lost
+        await self.collection.delete_one({"_id": job["_id"], "attempts": job["attempts"]})
+        self.stats["completed"] += 1
+
+    async def fail(self, job: Dict[str, Any], error: Exception):
+        """Schedule a retry with exponential backoff, or give up on the job"""
+        now = datetime.utcnow()
+        update = {"last_error": str(error), "updated_at": now}
+        if job["attempts"] >= self.max_attempts:
+            update["state"] = DEAD
+            self.stats["gave_up"] += 1
+            logger.error(f"Enrichment of {job['_id']} failed {job['attempts']} times, giving up: {error}")
+        else:
+            delay = min(MAX_RETRY_DELAY, self.retry_delay * 2 ** (job["attempts"] - 1))
+            delay *= random.uniform(0.5, 1.5)
+            update["state"] = PENDING
+            update["run_at"] = now + timedelta(seconds=delay)
+            self.stats["retried"] += 1
+            logger.warning(f"Enrichment of {job['_id']} failed (attempt {job['attempts']}): {error}; retrying in {delay:.0f}s")
+        await self.collection.update_one({"_id": job["_id"], "attempts": job["attempts"]}, {"$set": update})
+
+    async def retry_dead(self) -> int:
+        """Give every dead job a fresh set of attempts"""
+        result = await self.collection.update_many(
+            {"state": DEAD},
+            {"$set": {"state": PENDING, "attempts": 0, "run_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    async def _worker(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        while True:
+            try:
+                job = await self.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim an enrichment job: {e}")
+                job = None
+
+            if job is None:
+                # Sleep until the poll interval passes or a job is enqueued
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._process(job, handler)
+            except Exception as e:
+                # The job is claimed again once its lease expires
+                logger.error(f"Failed to record the outcome of enrichment job {job['_id']}: {e}")
+
+    async def _process(self, job: Dict[str, Any], handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        try:
+            await handler(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.fail(job, e)
+        else:
+            await self.complete(job)
+
+    def start(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Run handler on jobs from background workers until stopped"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._worker(handler)) for _ in range(self.workers)]
+        logger.info(f"Started {self.workers} enrichment workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def get_stats(self) -> Dict[str, Any]:
+        counts = {
+            doc["_id"]: doc["count"]
+            async for doc in self.collection.aggregate([{"$group": {"_id": "$state", "count": {"$sum": 1}}}])
+        }
+        return {
+            **self.stats,
+            "workers": len(self._tasks),
+            "pending": counts.get(PENDING, 0),
+            "running": counts.get(RUNNING, 0),
+            "dead": counts.get(DEAD, 0)
+        }
+
+# Create singleton instance
+enrichment_queue = EnrichmentQueue()
@@ -1,67 +1,157 @@
 import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from imdb import Cinemagoer
 from slugify import slugify
 
+from config import (
+    IMDB_WORKERS, IMDB_RATE_LIMIT, IMDB_RATE_BURST, IMDB_RETRIES, IMDB_RETRY_DELAY,
+    IMDB_OFFLINE_INDEX
+)
+from utils.imdb_cache import metadata_cache, make_key, MISSING
+from utils.concurrency import SingleFlight, TokenBucket, retry_async
+from utils.title_index import load_index
+from utils.metrics import registry, imdb_lookups, imdb_fetches, imdb_cache
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Initialize Cinemagoer
 ia = Cinemagoer()
 
-async def search_imdb(title: str, year: Optional[int] = None, media_type: str = "movie") -> Optional[Dict[str, Any]]:
+# Cinemagoer is blocking, so it gets its own bounded pool instead of the
+# event loop's default executor used by the rest of the app
+executor = ThreadPoolExecutor(max_workers=IMDB_WORKERS, thread_name_prefix="imdb")
+rate_limiter = TokenBucket(IMDB_RATE_LIMIT, IMDB_RATE_BURST)
+lookups = SingleFlight()
+
+# Optional local index of the IMDb dataset dumps, queried before the network
+title_index = load_index(IMDB_OFFLINE_INDEX)
+
+def get_lookup_stats() -> Dict[str, Any]:
+    """Metadata cache hits and misses, and lookups that shared a request"""
+    return {
+        **metadata_cache.get_stats(),
+        "lookups": lookups.stats["calls"],
+        "coalesced": lookups.stats["coalesced"]
+    }
+
+def _update_cache_metrics():
+    for stat, value in get_lookup_stats().items():
+        imdb_cache.set(value, stat=stat)
+
+registry.add_collector(_update_cache_metrics)
+
+async def run_imdb(fn, *args, **kwargs):
+    """Run a blocking Cinemagoer call, rate limited and retried"""
+    loop = asyncio.get_event_loop()
+    
+    async def attempt():
+        await rate_limiter.acquire()
+        return await loop.run_in_executor(executor, lambda: fn(*args, **kwargs))
+    
+    return await retry_async(
+        attempt,
+        attempts=IMDB_RETRIES,
+        base_delay=IMDB_RETRY_DELAY,
+        name=f"IMDb {fn.__name__}"
+    )
+
+async def search_imdb(
+    title: str,
+    year: Optional[int] = None,
+    media_type: str = "movie",
+    raise_errors: bool = False
+) -> Optional[Dict[str, Any]]:
     """
-    Search IMDb for a title and return metadata
+    Search IMDb for a title and return metadata, using the metadata cache.
+    Lookup errors return None like a missing title unless raise_errors is set.
     """
-    try:
-        # Run IMDb search in a thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        search_results = await loop.run_in_executor(
-            None, lambda: ia.search_movie(title)
-        )
-        
-        if not search_results:
-            return None
-        
-        # Filter by year if provided
-        if year:
-            filtered_results = [m for m in search_results if m.get('year') == year]
-            if filtered_results:
-                search_results = filtered_results
-        
-        # Filter by type if needed
-        kind_filter = {
-            "movie": "movie",
-            "series": "tv series",
-            "anime": "tv series"  # Anime is usually categorized as TV series
-        }
-        
-        filtered_by_kind = [m for m in search_results if m.get('kind') == kind_filter.get(media_type)]
-        if filtered_by_kind:
-            search_results = filtered_by_kind
-        
-        # Get the first result
-        movie_id = search_results[0].movieID
-        
-        # Get full movie data
-        movie = await loop.run_in_executor(
-            None, lambda: ia.get_movie(movie_id, info=['main', 'plot'])
-        )
-        
-        # Extract relevant data
-        result = {
-            "imdb_id": movie.movieID,
-            "title": movie.get('title'),
-            "slug": slugify(movie.get('title')),
-            "plot": movie.get('plot outline', ''),
-            "rating": movie.get('rating'),
-            "genres": movie.get('genres', []),
-            "release_year": movie.get('year'),
-            "poster": movie.get('full-size cover url', movie.get('cover url'))
-        }
-        
+    key = make_key(title, year, media_type)
+    if key is not None:
+        cached = await metadata_cache.get(key)
+        if cached is not MISSING:
+            imdb_lookups.inc(source="cache", result="found" if cached else "not_found")
+            return cached
+    
+    async def lookup():
+        result = title_index.lookup(title, year, media_type) if title_index else None
+        if result is not None:
+            imdb_lookups.inc(source="offline", result="found")
+        else:
+            started = time.perf_counter()
+            try:
+                result = await fetch_imdb(title, year, media_type)
+            except Exception:
+                imdb_fetches.observe(time.perf_counter() - started, result="error")
+                imdb_lookups.inc(source="imdb", result="error")
+                raise
+            outcome = "found" if result else "not_found"
+            imdb_fetches.observe(time.perf_counter() - started, result=outcome)
+            imdb_lookups.inc(source="imdb", result=outcome)
+        if key is not None:
+            await metadata_cache.set(key, result)
         return result
+    
+    try:
+        if key is None:
+            # Uncacheable titles are looked up on their own every time
+            return await lookup()
+        # Concurrent lookups for the same key share one request
+        return await lookups.do(key, lookup)
     except Exception as e:
+        # Errors are not cached, only confirmed "not found" results are
+        if raise_errors:
+            raise
         logger.error(f"Error fetching IMDb data: {e}")
-        return None
\ No newline at end of file
+        return None
+
+async def fetch_imdb(title: str, year: Optional[int] = None, media_type: str = "movie") -> Optional[Dict[str, Any]]:
+    """
+    Query IMDb directly. Returns None when there is no match and raises on
+    lookup errors.
+    """
+    # Run IMDb search in a thread pool to avoid blocking
+    search_results = await run_imdb(ia.search_movie, title)
+    
+    if not search_results:
+        return None
+    
+    # Filter by year if provided
+    if year:
+        filtered_results = [m for m in search_results if m.get('year') == year]
+        if filtered_results:
+            search_results = filtered_results
+    
+    # Filter by type if needed
+    kind_filter = {
+        "movie": "movie",
+        "series": "tv series",
+        "anime": "tv series"  # Anime is usually categorized as TV series
+    }
+    
+    filtered_by_kind = [m for m in search_results if m.get('kind') == kind_filter.get(media_type)]
+    if filtered_by_kind:
+        search_results = filtered_by_kind
+    
+    # Get the first result
+    movie_id = search_results[0].movieID
+    
+    # Get full movie data
+    movie = await run_imdb(ia.get_movie, movie_id, info=['main', 'plot'])
+    
+    # Extract relevant data
+    result = {
+        "imdb_id": movie.movieID,
+        "title": movie.get('title'),
+        "slug": slugify(movie.get('title')),
+        "plot": movie.get('plot outline', ''),
+        "rating": movie.get('rating'),
+        "genres": movie.get('genres', []),
+        "release_year": movie.get('year'),
+        "poster": movie.get('full-size cover url', movie.get('cover url'))
+    }
+    
+    return result
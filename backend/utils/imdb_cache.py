@@ -0,0 +1,127 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import IMDB_CACHE_SIZE, IMDB_CACHE_TTL, IMDB_NEGATIVE_CACHE_TTL
+from database import imdb_cache_collection
+from utils.parser import normalize_title
+
+# Returned by get() when the key is not cached at all. A cached None is a
+# negative entry ("IMDb has no match"), which is different from a miss.
+MISSING = object()
+
+def make_key(title: str, year: Optional[int], media_type: str) -> Optional[str]:
+    """
+    Normalize a lookup into a cache key, so that "The.Office", "the office "
+    and "The Office" share one entry. Titles with no letters or digits get
+    None: one key for all of them would hand each the others' metadata.
+    """
+    name = normalize_title(title)
+    if not name:
+        return None
+    return f"{media_type}|{year or ''}|{name}"
+
+class MetadataCache:
+    """
+    Two-tier cache for IMDb lookups: an in-process LRU in front of a
+    persistent Mongo collection. Entries carry their own expiry, and
+    negative results ("not found") expire sooner than positive ones.
+    """
+    def __init__(
+        self,
+        collection=imdb_cache_collection,
+        max_size: int = IMDB_CACHE_SIZE,
+        ttl: int = IMDB_CACHE_TTL,
+        negative_ttl: int = IMDB_NEGATIVE_CACHE_TTL
+    ):
+        self.collection = collection
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "errors": 0
+        }
+
+    def _remember(self, key: str, value: Optional[Dict[str, Any]], expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value (possibly None), or MISSING"""
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                if value is None:
+                    self.stats["negative_hits"] += 1
+                return value
+            del self._memory[key]
+
+        try:
+            doc = await self.collection.find_one({"_id": key})
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"IMDb cache read failed: {e}")
+            doc = None
+
+        # The TTL monitor only runs periodically, so check expiry ourselves
+        if doc and doc["expires_at"] > datetime.utcnow():
+            expires_at = now + (doc["expires_at"] - datetime.utcnow()).total_seconds()
+            self._remember(key, doc["value"], expires_at)
+            self.stats["persistent_hits"] += 1
+            if doc["value"] is None:
+                self.stats["negative_hits"] += 1
+            return doc["value"]
+
+        self.stats["misses"] += 1
+        return MISSING
+
+    async def set(self, key: str, value: Optional[Dict[str, Any]]):
+        """Store a result; None is stored as a short-lived negative entry"""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._remember(key, value, time.time() + ttl)
+        self.stats["writes"] += 1
+
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "value": value,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"IMDb cache write failed: {e}")
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._memory),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+        }
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from database import media_collection, files_collection, episodes_collection
+from utils.catalog import NORMALIZED
+from utils.parser import parse_batch
+
+# File fields derived from the filename
+REPARSED_FIELDS = ("quality", "source", "format")
+
+# Qualities of the files embedded in a media document, from files[] and the
+# seasons tree, gathered server side so only the list is sent back
+TREE_QUALITIES = {"$setUnion": [
+    {"$ifNull": ["$files.quality", []]},
+    {"$reduce": {
+        "input": {"$objectToArray": {"$ifNull": ["$seasons", {}]}},
+        "initialValue": [],
+        "in": {"$setUnion": ["$$value", {"$reduce": {
+            "input": {"$objectToArray": {"$ifNull": ["$$this.v.episodes", {}]}},
+            "initialValue": [],
+            "in": {"$setUnion": ["$$value", {"$ifNull": ["$$this.v.files.quality", []]}]}
+        }}]}
+    }}
+]}
+
+def _file_updates(doc: Dict[str, Any], parsed: Dict[str, Any]):
+    """Build the update operations for one file, or None if unchanged"""
+    changes = {
+        field: parsed[field] for field in REPARSED_FIELDS
+        if doc.get(field) != parsed[field]
+    }
+    if not changes:
+        return None
+
+    file_op = UpdateOne({"_id": doc["_id"]}, {"$set": changes})
+
+    # Also update the copy embedded in the media document, which lives in
+    # files[] for movies and under its season/episode for series (normalized
+    # media have no copy, so the filter matches nothing)
+    if doc.get("season") is not None and doc.get("episode") is not None:
+        path = f"seasons.{doc['season']}.episodes.{doc['episode']}.files"
+    else:
+        path = "files"
+    media_op = UpdateOne(
+        {"_id": doc["media_id"], f"{path}.file_id": doc["file_id"]},
+        {"$set": {f"{path}.$[file].{field}": value for field, value in changes.items()}},
+        array_filters=[{"file.file_id": doc["file_id"]}]
+    )
+    return file_op, media_op
+
+async def _bulk_write(collection, operations: List[UpdateOne], stats: Dict[str, int]) -> set:
+    """Write unordered, returning the indexes of the operations that failed"""
+    if not operations:
+        return set()
+    try:
+        await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        failed = set()
+        for error in e.details.get("writeErrors", []):
+            stats["errors"] += 1
+            failed.add(error["index"])
+            logger.error(f"Write failed for {error.get('op')}: {error['errmsg']}")
+        return failed
+    return set()
+
+async def _recompute_qualities(media_ids: List[Any], stats: Dict[str, int]):
+    """
+    Rebuild "qualities" of the given media from their files, in the files
+    collection and in any embedded tree. Unlike ingest this overwrites the
+    list, so qualities no file has any more are dropped.
+    """
+    qualities = {media_id: set() for media_id in media_ids}
+    async for media in media_collection.aggregate([
+        {"$match": {"_id": {"$in": media_ids}}},
+        {"$project": {"qualities": TREE_QUALITIES}}
+    ]):
+        qualities[media["_id"]].update(media["qualities"])
+    async for group in files_collection.aggregate([
+        {"$match": {"media_id": {"$in": media_ids}}},
+        {"$group": {"_id": "$media_id", "qualities": {"$addToSet": "$quality"}}}
+    ]):
+        qualities[group["_id"]].update(group["qualities"])
+
+    operations = []
+    for media_id, values in qualities.items():
+        values.discard(None)
+        operations.append(UpdateOne({"_id": media_id}, {"$set": {"qualities": sorted(values)}}))
+    failed = await _bulk_write(media_collection, operations, stats)
+    stats["requalified"] += len(operations) - len(failed)
+
+async def _apply_batch(docs: List[Dict[str, Any]], results: List[Dict[str, Any]], stats: Dict[str, int], dry_run: bool):
+    file_ops, media_ops = [], []
+    # Media whose search facets change with their files' qualities
+    requalify = set()
+    for doc, parsed in zip(docs, results):
+        updates = _file_updates(doc, parsed)
+        if updates:
+            file_ops.append(updates[0])
+            if doc.get("media_id"):
+                media_ops.append(updates[1])
+                if doc.get("quality") != parsed["quality"]:
+                    requalify.add(doc["media_id"])
+
+    stats["scanned"] += len(docs)
+    stats["changed"] += len(file_ops)
+    if dry_run:
+        stats["requalified"] += len(requalify)
+        return
+    await _bulk_write(files_collection, file_ops, stats)
+    await _bulk_write(media_collection, media_ops, stats)
+    if requalify:
+        await _recompute_qualities(list(requalify), stats)
+
+async def reparse_files(workers: int = 1, chunksize: int = 2000, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Re-parse the filename of every stored file and rewrite the fields that
+    changed with unordered bulk writes. Parsing runs on a process pool while
+    earlier chunks are written, with a bounded number of chunks in flight.
+    Media whose file qualities changed get their "qualities" list rebuilt.
+    Files stored before filenames were recorded are counted as skipped.
+    """
+    stats = {"scanned": 0, "changed": 0, "requalified": 0, "skipped": 0, "errors": 0}
+    stats["skipped"] = await files_collection.count_documents({"filename": {"$exists": False}})
+
+    loop = asyncio.get_event_loop()
+    projection = {"file_id": 1, "filename": 1, "media_id": 1, "season": 1, "episode": 1}
+    projection.update({field: 1 for field in REPARSED_FIELDS})
+    cursor = files_collection.find({"filename": {"$exists": True}}, projection).batch_size(chunksize)
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = deque()
+        docs = []
+
+        async def submit(docs):
+            future = loop.run_in_executor(pool, parse_batch, [doc["filename"] for doc in docs])
+            pending.append((docs, future))
+            if len(pending) >= max(1, workers) * 2:
+                batch, results = pending.popleft()
+                await _apply_batch(batch, await results, stats, dry_run)
+
+        async for doc in cursor:
+            docs.append(doc)
+            if len(docs) >= chunksize:
+                await submit(docs)
+                docs = []
+                logger.info(f"Reparse progress: {stats}")
+        if docs:
+            await submit(docs)
+
+        while pending:
+            batch, results = pending.popleft()
+            await _apply_batch(batch, await results, stats, dry_run)
+
+    logger.info(f"Reparse finished: {stats}")
+    return stats
+
+def _normalize_ops(media: Dict[str, Any], now: datetime):
+    """
+    The episode and file upserts that copy one media document's embedded
+    tree into the episodes and files collections, and its embedded qualities
+    """
+    media_id = media["_id"]
+    episode_ops, file_ops, qualities = [], [], set()
+
+    def copy_file(file: Dict[str, Any], **position):
+        qualities.add(file.get("quality"))
+        # Rows stored by older versions may lack the position fields
+        placed = {"media_id": media_id, **position}
+        file_ops.append(UpdateOne(
+            {"file_id": file["file_id"]},
+            {"$set": placed, "$setOnInsert": {k: v for k, v in file.items() if k not in placed}},
+            upsert=True
+        ))
+
+    for file in media.get("files") or []:
+        copy_file(file)
+
+    for season_key, season in (media.get("seasons") or {}).items():
+        season_number = season.get("season_number", int(season_key))
+        for episode_key, episode in (season.get("episodes") or {}).items():
+            episode_number = episode.get("episode_number", int(episode_key))
+            fields = {"created_at": now}
+            if episode.get("title"):
+                fields["title"] = episode["title"]
+            episode_ops.append(UpdateOne(
+                {"media_id": media_id, "season": season_number, "episode": episode_number},
+                {"$setOnInsert": fields},
+                upsert=True
+            ))
+            for file in episode.get("files") or []:
+                copy_file(file, season=season_number, episode=episode_number)
+
+    qualities.discard(None)
+    return episode_ops, file_ops, qualities
+
+async def normalize_media(batch_size: int = 200, pause: float = 0.0, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move embedded seasons and files out of media documents into the episodes
+    and files collections, batch_size documents at a time while the API and
+    sync keep running. Each batch upserts the episodes and file rows first;
+    only media whose copies all succeeded then drop the embedded tree and
+    are marked normalized. Ingest writes file rows and episode documents for
+    both layouts, so files pushed into a tree while it is being copied are
+    not lost. Re-running resumes with the media not yet normalized.
+    """
+    stats = {"scanned": 0, "migrated": 0, "episodes": 0, "files": 0, "errors": 0}
+    projection = {"files": 1, "seasons": 1, "qualities": 1}
+    cursor = media_collection.find({"layout": {"$ne": NORMALIZED}}, projection).sort("_id", 1).batch_size(batch_size)
+
+    async def migrate(batch: List[Dict[str, Any]]):
+        now = datetime.utcnow()
+        episode_ops, file_ops, media_ops = [], [], []
+        owners = {"episodes": [], "files": []}
+        for media in batch:
+            episodes, files, qualities = _normalize_ops(media, now)
+            episode_ops.extend(episodes)
+            file_ops.extend(files)
+            owners["episodes"].extend([media["_id"]] * len(episodes))
+            owners["files"].extend([media["_id"]] * len(files))
+            update = {"$set": {"layout": NORMALIZED}, "$unset": {"seasons": "", "files": ""}}
+            if qualities:
+                update["$addToSet"] = {"qualities": {"$each": sorted(qualities)}}
+            media_ops.append((media["_id"], UpdateOne({"_id": media["_id"]}, update)))
+
+        stats["scanned"] += len(batch)
+        stats["episodes"] += len(episode_ops)
+        stats["files"] += len(file_ops)
+        if dry_run:
+            stats["migrated"] += len(batch)
+            return
+
+        failed_media = {owners["episodes"][i] for i in await _bulk_write(episodes_collection, episode_ops, stats)}
+        failed_media |= {owners["files"][i] for i in await _bulk_write(files_collection, file_ops, stats)}
+        ready = [op for media_id, op in media_ops if media_id not in failed_media]
+        failed = await _bulk_write(media_collection, ready, stats)
+        stats["migrated"] += len(ready) - len(failed)
+
+    batch = []
+    async for media in cursor:
+        batch.append(media)
+        if len(batch) >= batch_size:
+            await migrate(batch)
+            batch = []
+            logger.info(f"Normalize progress: {stats}")
+            # Leave room for live traffic between batches
+            if pause:
+                await asyncio.sleep(pause)
+    if batch:
+        await migrate(batch)
+
+    logger.info(f"Normalize finished: {stats}")
+    return stats
+
+async def backfill_qualities(batch_size: int = 500, pause: float = 0.0, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Give media stored before ingest kept "qualities" the list gathered from
+    their files, so search facets can read that field alone. Embedded media
+    are read from their own tree, normalized media from the files
+    collection. Qualities are added to the set rather than overwriting it,
+    so ones ingested meanwhile are kept. Re-running only touches media still
+    missing the field.
+    """
+    stats = {"scanned": 0, "updated": 0, "errors": 0}
+    cursor = media_collection.aggregate([
+        {"$match": {"qualities": {"$exists": False}}},
+        {"$sort": {"_id": 1}},
+        {"$project": {"layout": 1, "qualities": TREE_QUALITIES}}
+    ], batchSize=batch_size)
+
+    async def backfill(batch: List[Dict[str, Any]]):
+        qualities = {media["_id"]: set(media["qualities"]) for media in batch}
+        normalized = [media["_id"] for media in batch if media.get("layout") == NORMALIZED]
+        if normalized:
+            async for group in files_collection.aggregate([
+                {"$match": {"media_id": {"$in": normalized}}},
+                {"$group": {"_id": "$media_id", "qualities": {"$addToSet": "$quality"}}}
+            ]):
+                qualities[group["_id"]].update(group["qualities"])
+
+        operations = []
+        for media_id, values in qualities.items():
+            values.discard(None)
+            if values:
+                update = {"$addToSet": {"qualities": {"$each": sorted(values)}}}
+                operations.append(UpdateOne({"_id": media_id}, update))
+            else:
+                operations.append(UpdateOne({"_id": media_id, "qualities": {"$exists": False}}, {"$set": {"qualities": []}}))
+
+        stats["scanned"] += len(batch)
+        if dry_run:
+            stats["updated"] += len(operations)
+            return
+        failed = await _bulk_write(media_collection, operations, stats)
+        stats["updated"] += len(operations) - len(failed)
+
+    batch = []
+    async for media in cursor:
+        batch.append(media)
+        if len(batch) >= batch_size:
+            await backfill(batch)
+            batch = []
+            logger.info(f"Qualities backfill progress: {stats}")
+            if pause:
+                await asyncio.sleep(pause)
+    if batch:
+        await backfill(batch)
+
+    logger.info(f"Qualities backfill finished: {stats}")
+    return stats
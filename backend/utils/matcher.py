@@ -0,0 +1,165 @@
+import logging
+import math
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from utils.parser import normalize_title
+
+# Sequel and part numbers written out. A lone "i" is left out: it is far
+# more often the pronoun than a numeral.
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
+}
+ROMAN_NUMERALS = {
+    "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9, "x": 10,
+    "xi": 11, "xii": 12, "xiii": 13, "xiv": 14, "xv": 15
+}
+
+def numbers(name: str) -> Tuple[int, ...]:
+    """
+    Numbers in a normalized title, from digits, roman numerals or number
+    words, so "Part Two", "Part II" and "Part 2" all give (2,)
+    """
+    found = []
+    for token in name.split():
+        if token.isdecimal():
+            found.append(int(token))
+        elif token in NUMBER_WORDS:
+            found.append(NUMBER_WORDS[token])
+        elif token in ROMAN_NUMERALS:
+            found.append(ROMAN_NUMERALS[token])
+    return tuple(sorted(found))
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized title, padded to weight word edges"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Dice coefficient of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+def _group(media_type: Optional[str]) -> str:
+    # Series and anime share episode layouts, so they can match each other
+    return "movie" if media_type == "movie" else "series"
+
+class TitleMatcher:
+    """
+    In-memory trigram index over known media names (titles, slugs and the
+    parsed titles they were created from), used to map a parsed filename
+    title to an existing media document before any network lookup.
+    Names only match names with the same numbers in them: sequels score
+    close to each other but are different media.
+    """
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        # Parallel arrays, one slot per indexed name
+        self.names: List[str] = []
+        self.media_ids: List[str] = []
+        self.groups: List[str] = []
+        self.years: List[Optional[int]] = []
+        self.sizes: List[int] = []
+        self.numbers: List[Tuple[int, ...]] = []
+        self.postings: Dict[str, List[int]] = {}
+        # Slots of each media document's names, so updating one media
+        # never scans the whole index
+        self.slots: Dict[str, List[int]] = {}
+        self.stats = {"matches": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, media_id: str, names: List[str], media_type: Optional[str] = None, year: Optional[int] = None):
+        """Index one or more names for a media document"""
+        for name in {normalize_title(name) for name in names}:
+            if not name:
+                continue
+
+            index = len(self.names)
+            self.names.append(name)
+            self.media_ids.append(media_id)
+            self.slots.setdefault(media_id, []).append(index)
+            self.groups.append(_group(media_type))
+            self.years.append(year)
+            grams = trigrams(name)
+            self.sizes.append(len(grams))
+            self.numbers.append(numbers(name))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+
+    def add_media(self, media: Dict[str, Any], *aliases: str):
+        """Index a media document by its title, slug and any aliases"""
+        self.add(
+            str(media["_id"]),
+            [media.get("title", ""), media.get("slug", ""), *aliases],
+            media.get("media_type"),
+            media.get("release_year")
+        )
+
+    def relink(self, media_id: str, new_media_id: str):
+        """Point every name indexed for one media document at another"""
+        slots = self.slots.pop(media_id, [])
+        for index in slots:
+            self.media_ids[index] = new_media_id
+        self.slots.setdefault(new_media_id, []).extend(slots)
+
+    def set_year(self, media_id: str, year: Optional[int]):
+        """Set the year of every name indexed for a media document"""
+        for index in self.slots.get(media_id, ()):
+            self.years[index] = year
+
+    def match(self, title: str, media_type: Optional[str] = None, year: Optional[int] = None) -> Optional[Tuple[str, float]]:
+        """Return (media_id, score) of the best match above the threshold"""
+        name = normalize_title(title)
+        query = trigrams(name) if name else set()
+        if not query:
+            return None
+
+        # Prefix filter: a name scoring >= threshold shares at least
+        # min_overlap trigrams with the query, so it must contain one of the
+        # (len(query) - min_overlap + 1) rarest query trigrams. Only those
+        # posting lists are scanned, which skips very common trigrams.
+        min_overlap = max(1, math.ceil(self.threshold * len(query) / (2 - self.threshold)))
+        grams = sorted(query, key=lambda gram: len(self.postings.get(gram, ())))
+        candidates: Set[int] = set()
+        for gram in grams[:len(query) - min_overlap + 1]:
+            candidates.update(self.postings.get(gram, ()))
+
+        # Length filter: Dice >= threshold bounds the size ratio of the sets
+        min_size = self.threshold * len(query) / (2 - self.threshold)
+        max_size = (2 - self.threshold) * len(query) / self.threshold
+
+        group = _group(media_type)
+        query_numbers = numbers(name)
+        best: Optional[Tuple[str, float]] = None
+        for index in candidates:
+            if not min_size <= self.sizes[index] <= max_size or self.groups[index] != group:
+                continue
+            if year and self.years[index] and self.years[index] != year:
+                continue
+            if self.numbers[index] != query_numbers:
+                continue
+            score = 1.0 if self.names[index] == name else similarity(query, trigrams(self.names[index]))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (self.media_ids[index], score)
+
+        self.stats["matches" if best else "misses"] += 1
+        return best
+
+    async def load(self, collection) -> int:
+        """Index every media document in the collection"""
+        cursor = collection.find(
+            {},
+            {"title": 1, "slug": 1, "media_type": 1, "release_year": 1, "parsed_title": 1}
+        )
+        count = 0
+        async for media in cursor:
+            self.add_media(media, media.get("parsed_title", ""))
+            count += 1
+        logger.info(f"Title matcher loaded {count} media ({len(self)} names)")
+        return count
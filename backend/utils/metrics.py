@@ -0,0 +1,291 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond parses to slow IMDb lookups
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for metrics with a fixed set of label names"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # MongoDB command events arrive on driver threads
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples()
+        ]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_max(self, value: float, **labels):
+        key = self._key(labels)
+        if value > self._values.get(key, -math.inf):
+            self._values[key] = value
+
+    def get(self, **labels) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+    def samples(self) -> Iterable[str]:
+        for key, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram. Observations only bump one bucket count, the
+    sum and the total; buckets are accumulated when rendered.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+class Registry:
+    """
+    Named metrics rendered in the Prometheus text exposition format.
+    Collectors are callbacks that refresh gauges from existing stats right
+    before rendering, so those stats cost nothing between scrapes.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Create singleton instance
+registry = Registry()
+
+# HTTP
+http_requests = registry.histogram(
+    "teleflix_http_request_duration_seconds",
+    "Time from request to response start, by route template",
+    ["method", "route", "status"]
+)
+
+# MongoDB
+mongo_commands = registry.histogram(
+    "teleflix_mongo_command_duration_seconds",
+    "MongoDB command round trip time",
+    ["command", "collection"]
+)
+mongo_failures = registry.counter(
+    "teleflix_mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["command", "collection"]
+)
+
+# IMDb
+imdb_lookups = registry.counter(
+    "teleflix_imdb_lookups_total",
+    "IMDb metadata lookups by where they were answered and the outcome",
+    ["source", "result"]
+)
+imdb_cache = registry.gauge(
+    "teleflix_imdb_cache",
+    "IMDb metadata cache and lookup coalescing counters since start, by stat",
+    ["stat"]
+)
+imdb_fetches = registry.histogram(
+    "teleflix_imdb_fetch_duration_seconds",
+    "Live IMDb lookups (search plus details), including retries",
+    ["result"]
+)
+
+# Sync
+parse_durations = registry.histogram(
+    "teleflix_parse_filename_duration_seconds",
+    "Time to parse one filename",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+)
+sync_messages = registry.counter(
+    "teleflix_sync_messages_total",
+    "Channel messages by ingest outcome",
+    ["outcome"]
+)
+stage_durations = registry.histogram(
+    "teleflix_sync_stage_duration_seconds",
+    "Time one message spends in each ingest stage handler",
+    ["stage"]
+)
+sync_head = registry.gauge(
+    "teleflix_sync_channel_head_message_id",
+    "Newest channel message id seen"
+)
+sync_handled = registry.gauge(
+    "teleflix_sync_handled_message_id",
+    "Newest channel message id the sync has finished with, media or not"
+)
+sync_lag = registry.gauge(
+    "teleflix_sync_lag_messages",
+    "Message ids between the channel head and the newest handled message"
+)
+
+# Download bots
+bot_requests = registry.histogram(
+    "teleflix_bot_request_duration_seconds",
+    "Telegram transfers per download bot by outcome",
+    ["bot", "outcome"]
+)
+
+def _update_sync_lag():
+    head, handled = sync_head.get(), sync_handled.get()
+    if head is not None and handled is not None:
+        sync_lag.set(max(head - handled, 0))
+
+registry.add_collector(_update_sync_lag)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Time every command sent by the MongoDB client, per collection"""
+    def __init__(self):
+        self._started: Dict[int, Tuple[str, str]] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._started[event.request_id] = (
+            event.command_name,
+            collection if isinstance(collection, str) else ""
+        )
+
+    def succeeded(self, event):
+        labels = self._started.pop(event.request_id, (event.command_name, ""))
+        mongo_commands.observe(event.duration_micros / 1e6, command=labels[0], collection=labels[1])
+
+    def failed(self, event):
+        labels = self._started.pop(event.request_id, (event.command_name, ""))
+        mongo_commands.observe(event.duration_micros / 1e6, command=labels[0], collection=labels[1])
+        mongo_failures.inc(command=labels[0], collection=labels[1])
@@ -0,0 +1,79 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+
+# Fields needed to build a MediaResponse; list queries fetch nothing else
+MEDIA_RESPONSE_PROJECTION = {
+    "title": 1,
+    "slug": 1,
+    "media_type": 1,
+    "poster": 1,
+    "rating": 1,
+    "genres": 1,
+    "release_year": 1
+}
+
+# Sort options for listing media: field and direction, with _id breaking ties
+SORT_FIELDS = {
+    "recent": ("created_at", -1),
+    "popular": ("rating", -1),
+    "az": ("title", 1)
+}
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    """Opaque, URL-safe token for the position after a page"""
+    return base64.urlsafe_b64encode(json_util.dumps(data).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
+
+def sort_spec(field: str, direction: int) -> List[Tuple[str, int]]:
+    return [(field, direction), ("_id", direction)]
+
+def keyset_filter(field: str, direction: int, value: Any, last_id: Any) -> Dict[str, Any]:
+    """
+    Match documents that sort after (value, last_id) in the given direction.
+    Missing or null values sort before everything ascending and after
+    everything descending, and range operators never match them, so they
+    get explicit clauses.
+    """
+    op = "$gt" if direction == 1 else "$lt"
+    same_value = {field: value, "_id": {op: last_id}}
+    if value is None:
+        clauses = [same_value]
+        if direction == 1:
+            clauses.append({field: {"$ne": None}})
+    else:
+        clauses = [{field: {op: value}}, same_value]
+        if direction == -1:
+            clauses.append({field: None})
+    return {"$or": clauses}
+
+def cursor_after(doc: Dict[str, Any], field: str) -> str:
+    """Cursor continuing after the given (last) document of a page"""
+    return encode_cursor({"v": doc.get(field), "id": doc["_id"]})
+
+def apply_cursor(query: Dict[str, Any], cursor: Optional[str], field: str, direction: int) -> Dict[str, Any]:
+    """Restrict a query to the documents after a keyset cursor"""
+    if not cursor:
+        return query
+    position = decode_cursor(cursor)
+    if "id" not in position:
+        raise ValueError("Invalid cursor")
+    # Keep the original conditions (including any $text) at the top level
+    restricted = dict(query)
+    restricted["$and"] = query.get("$and", []) + [
+        keyset_filter(field, direction, position.get("v"), position["id"])
+    ]
+    return restricted
@@ -1,5 +1,87 @@
 import re
-from typing import Dict, Optional, Any
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Any, List, Iterable, Iterator
+
+# Patterns are compiled once at import; parse_filename runs for every file
+# during syncs and re-parses.
+EXTENSION_RE = re.compile(r'\.[a-zA-Z0-9]+$')
+YEAR_RE = re.compile(r'[\(\[\s.](\d{4})[\)\]\s.]')
+ALT_SEASON_EPISODE_RE = re.compile(r'(\d{1,2})x(\d{1,2})')
+GROUP_SUFFIX_RE = re.compile(r'[-\.\[]([A-Za-z0-9]+)[\.\]]?$')
+
+# For movies, the title ends at the first of these (matched case-insensitively)
+TITLE_END_MARKERS = tuple(marker.lower() for marker in [
+    '1080p', '720p', '480p', '2160p', 'BluRay', 'WEB-DL', 'WEBRip', 'HDTV',
+    'BRRip', 'DVDRip', 'x264', 'x265', 'HEVC', 'H.265', 'H264'
+])
+
+# Tag lookup tables (regex alternatives, leftmost match wins, earlier
+# entries win ties). Tags match anywhere in the name, not only as whole
+# tokens, so e.g. "NF" inside a word still counts as a source.
+QUALITY_TAGS = ['2160p', '1080p', '720p', '480p']
+SOURCE_TAGS = ['BluRay', 'WEB-DL', 'WEBRip', 'HDTV', 'BRRip', 'DVDRip', 'NF']
+FORMAT_TAGS = ['x264', 'x265', 'HEVC', r'H\.265', 'H264', 'AVC']
+AUDIO_CODEC_TAGS = [r'DDP5\.1', r'DDP[0-9]\.[0-9]', 'AAC', 'DTS', 'TrueHD', 'FLAC', 'AC3', 'EAC3', 'Atmos']
+# Tried in order; the first table with a match wins
+LANGUAGE_TAGS = [
+    ['Hindi-English', 'Hindi', 'Bengali', 'Tamil', 'Telugu', r'Multi[\s._-]*Audio', r'Dual[\s._-]*Audio'],
+    ['English', 'Japanese', 'Korean', 'Chinese', 'Spanish', 'French', 'German']
+]
+SUBTITLE_TAGS = [
+    ['Subbed', 'Dubbed', r'English[\s._-]*Sub', r'Dual[\s._-]*Subs?', r'Multi[\s._-]*Subs?'],
+    [r'Soft[\s._-]*Subs?', r'Hard[\s._-]*Subs?']
+]
+# Common groups, used when the name does not end with one
+KNOWN_GROUPS = ['YIFY', 'PSA', 'EVO', 'Telly', 'Archie', 'Tigole', 'QxR', 'NTb', 'RARBG', 'SPARKS', 'FGT', 'GECKOS']
+
+BRACKETED_RE = re.compile(r'\[.*?\]|\(.*?\)')
+NON_SLUG_RE = re.compile(r'[^a-z0-9-]')
+HYPHENS_RE = re.compile(r'-+')
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+class _Patterns:
+    """
+    Case-insensitive patterns, compiled either with re.IGNORECASE or in
+    lowercase for matching an already lowercased name. For ASCII names the
+    two are equivalent and the lowercase form is several times faster; other
+    names keep re.IGNORECASE, whose case folding differs from str.lower().
+    """
+    def __init__(self, lowercase: bool):
+        def compile_(pattern: str):
+            if lowercase:
+                return re.compile(pattern.lower())
+            return re.compile(pattern, re.IGNORECASE)
+        
+        def alternation(tags: List[str]):
+            return compile_('(' + '|'.join(tags) + ')')
+        
+        self.season_episode = compile_(r'S(\d{1,2})E(\d{1,2})')
+        self.episode = compile_(r'(?:Ep|Episode)[\s._-]*(\d{1,2})')
+        self.ep_split = compile_(r'Ep\s*\d+')
+        self.episode_split = compile_(r'Episode\s*\d+')
+        self.quality = alternation(QUALITY_TAGS)
+        self.source = alternation(SOURCE_TAGS)
+        self.format = alternation(FORMAT_TAGS)
+        self.audio_codec = alternation(AUDIO_CODEC_TAGS)
+        self.languages = [alternation(tags) for tags in LANGUAGE_TAGS]
+        self.subtitles = [alternation(tags) for tags in SUBTITLE_TAGS]
+        self.known_group = alternation(KNOWN_GROUPS)
+
+LOWERCASE_PATTERNS = _Patterns(lowercase=True)
+IGNORECASE_PATTERNS = _Patterns(lowercase=False)
+
+def _prepare(text: str):
+    """Pick the text to match against and the matching pattern set"""
+    if text.isascii():
+        return text.lower(), LOWERCASE_PATTERNS
+    return text, IGNORECASE_PATTERNS
+
+def _search(pattern, text: str) -> Optional[str]:
+    match = pattern.search(text)
+    return match.group(1).lower() if match else None
 
 def parse_filename(filename: str) -> Dict[str, Any]:
     """
@@ -30,148 +112,157 @@ def parse_filename(filename: str) -> Dict[str, Any]:
         "media_type": "movie"  # Default to movie
     }
     
-    # Get original filename without extension for group extraction
-    original_name = filename
-    
     # Clean up filename (remove extension)
-    clean_name = re.sub(r'\.[a-zA-Z0-9]+$', '', filename)
+    clean_name = EXTENSION_RE.sub('', filename)
     
     # Try to extract year
-    year_match = re.search(r'[\(\[\s.](\d{4})[\)\]\s.]', clean_name)
+    year_match = YEAR_RE.search(clean_name)
     if year_match:
         result["year"] = int(year_match.group(1))
         # Remove year from clean_name for further processing
-        clean_name = re.sub(r'[\(\[\s.](\d{4})[\)\]\s.]', ' ', clean_name)
+        clean_name = YEAR_RE.sub(' ', clean_name)
     
-    # Check for series patterns
-    # Standard S01E01 format
-    series_match = re.search(r'S(\d{1,2})E(\d{1,2})', clean_name, re.IGNORECASE)
-    # Alternative 1x01 format
-    alt_series_match = re.search(r'(\d{1,2})x(\d{1,2})', clean_name)
-    # Ep01 or Episode 01 format
-    ep_match = re.search(r'(?:Ep|Episode)[\s._-]*(\d{1,2})', clean_name, re.IGNORECASE)
+    # Positions in text line up with clean_name, so titles are sliced from
+    # clean_name to keep their original case
+    text, patterns = _prepare(clean_name)
+    
+    # Check for series patterns: S01E01, then 1x01, then Ep01 / Episode 01.
+    # The title is everything before the episode marker.
+    series_match = patterns.season_episode.search(text) or (
+        "x" in clean_name and ALT_SEASON_EPISODE_RE.search(clean_name)
+    )
+    ep_match = None if series_match else patterns.episode.search(text)
     
     if series_match:
         result["media_type"] = "series"
         result["season"] = int(series_match.group(1))
         result["episode"] = int(series_match.group(2))
-        # Extract title (everything before S01E01)
-        title_part = clean_name.split(series_match.group(0))[0].strip()
-        result["title"] = clean_title(title_part)
-    elif alt_series_match:
-        result["media_type"] = "series"
-        result["season"] = int(alt_series_match.group(1))
-        result["episode"] = int(alt_series_match.group(2))
-        # Extract title (everything before 1x01)
-        title_part = clean_name.split(alt_series_match.group(0))[0].strip()
-        result["title"] = clean_title(title_part)
+        result["title"] = clean_title(clean_name[:series_match.start()].strip())
     elif ep_match:
         result["media_type"] = "series"
         result["season"] = 1  # Default to season 1 if not specified
         result["episode"] = int(ep_match.group(1))
-        # Extract title (everything before Ep/Episode)
-        split_term = "Ep" if "Ep" in clean_name else "Episode"
-        title_part = re.split(f"{split_term}\\s*\\d+", clean_name, flags=re.IGNORECASE)[0].strip()
-        result["title"] = clean_title(title_part)
+        split_pattern = patterns.ep_split if "Ep" in clean_name else patterns.episode_split
+        split_match = split_pattern.search(text)
+        title_part = clean_name[:split_match.start()] if split_match else clean_name
+        result["title"] = clean_title(title_part.strip())
     else:
         # For movies, title is everything before year or quality indicators
-        title_end_markers = ['1080p', '720p', '480p', '2160p', 'BluRay', 'WEB-DL', 'WEBRip', 'HDTV', 'BRRip', 'DVDRip', 'x264', 'x265', 'HEVC', 'H.265', 'H264']
+        lower_name = clean_name.lower()
         title_end_pos = len(clean_name)
-        
-        for marker in title_end_markers:
-            pos = clean_name.lower().find(marker.lower())
-            if pos > 0 and pos < title_end_pos:
+        for marker in TITLE_END_MARKERS:
+            pos = lower_name.find(marker)
+            if 0 < pos < title_end_pos:
                 title_end_pos = pos
-        
         result["title"] = clean_title(clean_name[:title_end_pos])
     
     # Generate slug from title
     result["slug"] = generate_slug(result["title"])
     
-    # Extract quality (2160p, 1080p, 720p, 480p, etc.)
-    quality_match = re.search(r'(2160p|1080p|720p|480p)', clean_name, re.IGNORECASE)
-    if quality_match:
-        result["quality"] = quality_match.group(1).lower()
-    
-    # Extract source (BluRay, WEB-DL, HDTV, etc.)
-    source_match = re.search(r'(BluRay|WEB-DL|WEBRip|HDTV|BRRip|DVDRip|NF)', clean_name, re.IGNORECASE)
-    if source_match:
-        result["source"] = source_match.group(1).lower()
-    
-    # Extract format (x264, x265, HEVC, H.265, etc.)
-    format_match = re.search(r'(x264|x265|HEVC|H\.265|H264|AVC)', clean_name, re.IGNORECASE)
-    if format_match:
-        result["format"] = format_match.group(1).lower()
+    # Extract quality, source and format (1080p, BluRay, x264, etc.)
+    result["quality"] = _search(patterns.quality, text)
+    result["source"] = _search(patterns.source, text)
+    result["format"] = _search(patterns.format, text)
     
     # Extract language (Hindi, English, Multi Audio, Dual Audio, etc.)
-    language_patterns = [
-        r'(Hindi-English|Hindi|Bengali|Tamil|Telugu|Multi[\s._-]*Audio|Dual[\s._-]*Audio)',
-        r'(English|Japanese|Korean|Chinese|Spanish|French|German)'
-    ]
-    
-    for pattern in language_patterns:
-        language_match = re.search(pattern, clean_name, re.IGNORECASE)
-        if language_match:
-            result["language"] = language_match.group(1).replace('.', ' ').strip().lower()
+    for pattern in patterns.languages:
+        language = _search(pattern, text)
+        if language:
+            result["language"] = language.replace('.', ' ').strip()
             break
     
     # Extract audio codec (DDP5.1, AAC, DTS, TrueHD, FLAC, etc.)
-    audio_codec_match = re.search(r'(DDP5\.1|DDP[0-9]\.[0-9]|AAC|DTS|TrueHD|FLAC|AC3|EAC3|Atmos)', clean_name, re.IGNORECASE)
-    if audio_codec_match:
-        result["audio_codec"] = audio_codec_match.group(1).lower()
+    result["audio_codec"] = _search(patterns.audio_codec, text)
     
     # Extract subtitle info (Subbed, Dubbed, English Sub, Dual Subs, etc.)
-    subtitle_patterns = [
-        r'(Subbed|Dubbed|English[\s._-]*Sub|Dual[\s._-]*Subs?|Multi[\s._-]*Subs?)',
-        r'(Soft[\s._-]*Subs?|Hard[\s._-]*Subs?)'
-    ]
-    
-    for pattern in subtitle_patterns:
-        subtitle_match = re.search(pattern, clean_name, re.IGNORECASE)
-        if subtitle_match:
-            result["subtitle_info"] = subtitle_match.group(1).replace('.', ' ').strip().lower()
+    for pattern in patterns.subtitles:
+        subtitle_info = _search(pattern, text)
+        if subtitle_info:
+            result["subtitle_info"] = subtitle_info.replace('.', ' ').strip()
             break
     
     # Extract release group (usually at the end of filename before extension)
-    # Common groups: YIFY, PSA, EVO, Telly, Archie, Tigole, QxR, NTb
-    group_match = re.search(r'[-\.\[]([A-Za-z0-9]+)[\.\]]?$', original_name)
+    group_match = GROUP_SUFFIX_RE.search(filename)
     if group_match:
         result["group"] = group_match.group(1).lower()
     else:
-        # Try to find common release groups in the filename
-        group_patterns = r'(YIFY|PSA|EVO|Telly|Archie|Tigole|QxR|NTb|RARBG|SPARKS|FGT|GECKOS)'
-        common_group = re.search(group_patterns, original_name, re.IGNORECASE)
-        if common_group:
-            result["group"] = common_group.group(1).lower()
+        group_text, group_patterns = _prepare(filename)
+        result["group"] = _search(group_patterns.known_group, group_text)
     
     return result
 
+def parse_batch(filenames: List[str]) -> List[Dict[str, Any]]:
+    """
+    Parse a list of filenames (module-level so process pools can pickle it)
+    """
+    return [parse_filename(filename) for filename in filenames]
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_filenames(filenames: Iterable[str], workers: int = 1, chunksize: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Parse many filenames, yielding results in input order.
+    
+    With workers > 1 the input is split into chunks that are parsed on a
+    process pool. The input is consumed lazily and only a few chunks per
+    worker are in flight, so memory stays bounded for very large inputs.
+    """
+    if workers <= 1:
+        for filename in filenames:
+            yield parse_filename(filename)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(filenames, chunksize):
+            pending.append(pool.submit(parse_batch, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
 def clean_title(title: str) -> str:
     """
     Clean up title by removing dots, extra spaces, and other separators
     """
     # Replace dots, underscores with spaces
-    title = re.sub(r'[._]', ' ', title)
+    title = title.replace('.', ' ').replace('_', ' ')
     # Remove any brackets and their contents
-    title = re.sub(r'\[.*?\]|\(.*?\)', '', title)
+    title = BRACKETED_RE.sub('', title)
     # Remove any remaining special characters
-    title = re.sub(r'[\-_]', ' ', title)
-    # Remove extra spaces
-    title = re.sub(r'\s+', ' ', title)
-    return title.strip()
+    title = title.replace('-', ' ')
+    # Collapse whitespace
+    return ' '.join(title.split())
 
 def generate_slug(title: str) -> str:
     """
     Generate a SEO-friendly slug from title
     """
-    # Convert to lowercase
-    slug = title.lower()
-    # Replace spaces with hyphens
-    slug = re.sub(r'\s+', '-', slug)
+    # Lowercase, with whitespace runs turned into hyphens
+    slug = '-'.join(title.lower().split())
     # Remove any non-alphanumeric characters except hyphens
-    slug = re.sub(r'[^a-z0-9-]', '', slug)
+    slug = NON_SLUG_RE.sub('', slug)
     # Remove multiple consecutive hyphens
-    slug = re.sub(r'-+', '-', slug)
+    if '--' in slug:
+        slug = HYPHENS_RE.sub('-', slug)
     # Remove leading and trailing hyphens
-    slug = slug.strip('-')
-    return slug
\ No newline at end of file
+    return slug.strip('-')
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize a title for matching: casefolded words of letters and digits,
+    in any script, separated by single spaces. Non-ASCII titles go through
+    NFKC first so full-width and composed forms compare equal.
+    """
+    title = title or ""
+    if title.isascii():
+        return NON_ALNUM_RE.sub(' ', title.lower()).strip()
+    return NON_WORD_RE.sub(' ', unicodedata.normalize("NFKC", title).casefold()).strip()
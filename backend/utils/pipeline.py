@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a stage queue
+_STOP = object()
+
+StageHandler = Callable[[Any], Awaitable[Optional[Any]]]
+
+class StageStats:
+    """Throughput counters for a single pipeline stage"""
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self, queue_depth: int = 0) -> Dict[str, Any]:
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queue_depth": queue_depth,
+            "elapsed": round(elapsed, 3),
+            "per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            # Fraction of worker time spent inside the handler
+            "utilization": round(self.busy_time / (elapsed * self.workers), 3) if elapsed else 0.0
+        }
+
+class _Stage:
+    def __init__(self, name: str, handler: StageHandler, workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = StageStats(name, self.workers)
+
+class Pipeline:
+    """
+    Staged producer/consumer pipeline.
+
+    Items from the source flow through each stage in order. Every stage has
+    its own pool of workers and a bounded input queue, so a slow stage applies
+    backpressure to the ones before it instead of buffering without limit.
+    A handler returns the item for the next stage, or None to drop it.
+    A failing handler only loses its own item, but a failing source fails
+    the run: the items already read are drained, then run() raises the
+    source's exception so callers never mistake a cut-short run for a
+    complete one. observe, if given, is called with the stage name and
+    seconds of every handler call.
+    """
+    def __init__(
+        self,
+        name: str,
+        queue_size: int = 100,
+        observe: Optional[Callable[[str, float], None]] = None
+    ):
+        self.name = name
+        self.queue_size = queue_size
+        self.observe = observe
+        self.stages: List[_Stage] = []
+        self.source_stats = StageStats("source", 1)
+        self.source_error: Optional[BaseException] = None
+
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1) -> "Pipeline":
+        self.stages.append(_Stage(name, handler, workers, self.queue_size))
+        return self
+
+    async def _feed(self, source: AsyncIterator[Any]):
+        stats = self.source_stats
+        stats.started_at = time.monotonic()
+        first = self.stages[0]
+        try:
+            async for item in source:
+                stats.processed += 1
+                await first.queue.put(item)
+        except Exception as e:
+            stats.failed += 1
+            self.source_error = e
+            logger.error(f"[{self.name}] Error reading source after {stats.processed} items: {e}")
+        finally:
+            stats.finished_at = time.monotonic()
+            for _ in range(first.workers):
+                await first.queue.put(_STOP)
+
+    async def _work(self, stage: _Stage, next_stage: Optional[_Stage]):
+        stats = stage.stats
+        while True:
+            item = await stage.queue.get()
+            if item is _STOP:
+                return
+
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"[{self.name}] Error in stage {stage.name}: {e}")
+                continue
+            finally:
+                elapsed = time.monotonic() - started
+                stats.busy_time += elapsed
+                if self.observe is not None:
+                    self.observe(stage.name, elapsed)
+
+            if result is None:
+                stats.dropped += 1
+                continue
+
+            stats.processed += 1
+            if next_stage:
+                await next_stage.queue.put(result)
+
+    async def _run_stage(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        stage.stats.started_at = time.monotonic()
+
+        await asyncio.gather(*[
+            self._work(stage, next_stage) for _ in range(stage.workers)
+        ])
+
+        stage.stats.finished_at = time.monotonic()
+        if next_stage:
+            for _ in range(next_stage.workers):
+                await next_stage.queue.put(_STOP)
+
+    async def run(self, source: AsyncIterator[Any]) -> Dict[str, Any]:
+        """
+        Drain the source through every stage and return the stage stats.
+        Raises the source's exception if reading it failed part way.
+        """
+        if not self.stages:
+            raise ValueError("Pipeline has no stages")
+
+        self.source_error = None
+        await asyncio.gather(
+            self._feed(source),
+            *[self._run_stage(i) for i in range(len(self.stages))]
+        )
+
+        stats = self.stats()
+        logger.info(f"[{self.name}] Finished: {stats}")
+        if self.source_error is not None:
+            raise self.source_error
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        result = {"source": self.source_stats.to_dict()}
+        for stage in self.stages:
+            result[stage.name] = stage.stats.to_dict(stage.queue.qsize())
+        return result
@@ -0,0 +1,265 @@
+import asyncio
+import hmac
+import inspect
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import PROFILE_SAMPLE_RATE, PROFILE_INTERVAL, PROFILE_TOKEN, PROFILE_KEEP
+
+# Header or query parameter that asks for a request to be profiled; its
+# value must be PROFILE_TOKEN
+PROFILE_HEADER = "x-profile"
+PROFILE_PARAM = "profile"
+
+# Deepest stack kept per sample
+MAX_DEPTH = 64
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}:{frame.f_lineno}"
+
+def _awaiting_frames(coro) -> List[Any]:
+    """Frames of a suspended coroutine and everything it is awaiting, outermost first"""
+    frames = []
+    while coro is not None and len(frames) < MAX_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+def _thread_frames(frame) -> List[Any]:
+    """Frames of a running thread, outermost first"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+def _in_coroutine(frames: List[Any]) -> bool:
+    """Whether a thread's stack is inside a coroutine, i.e. running a task"""
+    return any(frame.f_code.co_flags & (inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR) for frame in frames)
+
+class ProfileSession:
+    """
+    Samples collected for one request or sync run. A session bound to a task
+    gets that task's stack on every tick: the running stack when the task
+    holds the event loop, otherwise the chain of coroutines it is suspended
+    in, so time spent awaiting Mongo, IMDb or Telegram shows up too. An
+    unbound session samples whatever the loop thread is running, or "idle".
+    """
+    def __init__(self, kind: str, name: str, task: Optional[asyncio.Task] = None, details: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.name = name
+        self.task = task
+        self.details = details or {}
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        self.stacks: Dict[str, int] = {}
+        self.samples = {"running": 0, "waiting": 0, "idle": 0}
+
+    def add(self, state: str, frames: List[Any]):
+        self.samples[state] += 1
+        stack = ";".join(_frame_name(frame) for frame in frames) or state
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1),
+            "samples": self.samples,
+            **self.details
+        }
+
+    def top_frames(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Innermost frames by share of samples"""
+        counts: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            counts[leaf] = counts.get(leaf, 0) + count
+        total = sum(counts.values()) or 1
+        ranked = sorted(counts.items(), key=lambda item: -item[1])[:limit]
+        return [{"frame": frame, "samples": count, "share": round(count / total, 3)} for frame, count in ranked]
+
+    def folded(self) -> str:
+        """Stacks in the folded format read by flamegraph tools"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]))
+
+class Profiler:
+    """
+    Opt-in statistical profiler. A daemon thread wakes every interval
+    seconds while sessions are open and records a stack for each; nothing
+    runs while no session is open. Finished sessions are kept in memory,
+    the most recent keep of them.
+    """
+    def __init__(
+        self,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval: float = PROFILE_INTERVAL,
+        token: str = PROFILE_TOKEN,
+        keep: int = PROFILE_KEEP
+    ):
+        self.sample_rate = sample_rate
+        self.interval = max(interval, 0.001)
+        self.token = token
+        self.profiles: "deque[ProfileSession]" = deque(maxlen=max(1, keep))
+        self._sessions: Dict[str, ProfileSession] = {}
+        self._loop_thread: Optional[int] = None
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self):
+        if self._loop_thread is None:
+            self._loop_thread = threading.get_ident()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if not self._sessions:
+                self._wakeup.wait()
+                self._wakeup.clear()
+            time.sleep(self.interval)
+            try:
+                self._sample()
+            except Exception as e:
+                # Stacks change under the sampler; a torn read only loses a tick
+                logger.debug(f"Profiler sample failed: {e}")
+
+    def _sample(self):
+        sessions = list(self._sessions.values())
+        if not sessions:
+            return
+        frames = _thread_frames(sys._current_frames().get(self._loop_thread))
+        for session in sessions:
+            if session.task is None:
+                if _in_coroutine(frames):
+                    session.add("running", frames[-MAX_DEPTH:])
+                else:
+                    session.add("idle", [])
+                continue
+            # The task holds the loop when its coroutine's frame is on the stack
+            coro = session.task.get_coro()
+            root = next((index for index, frame in enumerate(frames) if frame is coro.cr_frame), None)
+            if root is not None:
+                session.add("running", frames[root:][-MAX_DEPTH:])
+            else:
+                session.add("waiting", _awaiting_frames(coro))
+
+    def start(self, kind: str, name: str, bind_task: bool = True, **details) -> ProfileSession:
+        """Open a session, bound to the current task unless bind_task is off"""
+        self._ensure_thread()
+        task = asyncio.current_task() if bind_task else None
+        session = ProfileSession(kind, name, task, details)
+        self._sessions[session.id] = session
+        self._wakeup.set()
+        return session
+
+    def stop(self, session: ProfileSession):
+        self._sessions.pop(session.id, None)
+        session.finish()
+        self.profiles.append(session)
+        logger.info(f"Profiled {session.kind} {session.name} in {session.duration * 1000:.0f}ms")
+
+    async def profile(self, kind: str, name: str, awaitable: Awaitable, **details) -> Any:
+        """Await something while sampling the whole event loop"""
+        session = self.start(kind, name, bind_task=False, **details)
+        try:
+            return await awaitable
+        finally:
+            self.stop(session)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any request can be profiled, by token or by sampling"""
+        return bool(self.token) or self.sample_rate > 0
+
+    def check_token(self, value: Optional[str]) -> bool:
+        """Compare a presented token with PROFILE_TOKEN in constant time"""
+        if not self.token or value is None:
+            return False
+        return hmac.compare_digest(value.encode(), self.token.encode())
+
+    def should_profile(self, headers: Dict[str, str], params: Dict[str, List[str]]) -> bool:
+        if self.token:
+            if self.check_token(headers.get(PROFILE_HEADER)) or any(self.check_token(value) for value in params.get(PROFILE_PARAM, [])):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def slowest(self, limit: int = 20, kind: Optional[str] = None) -> List[ProfileSession]:
+        sessions = [session for session in self.profiles if kind is None or session.kind == kind]
+        return sorted(sessions, key=lambda session: -session.duration)[:limit]
+
+    def get(self, profile_id: str) -> Optional[ProfileSession]:
+        return next((session for session in self.profiles if session.id == profile_id), None)
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware that profiles sampled or flagged requests. It should be
+    the innermost middleware so the route runs in the task it profiles.
+    """
+    def __init__(self, app, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled:
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if not self.profiler.should_profile(headers, params):
+            return await self.app(scope, receive, send)
+
+        # The token never ends up in the recorded parameters
+        params.pop(PROFILE_PARAM, None)
+        status = {"code": 500}
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        session = self.profiler.start("request", f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            endpoint = scope.get("endpoint")
+            route = next(
+                (route.path for route in getattr(scope.get("app"), "routes", []) if getattr(route, "endpoint", None) is endpoint),
+                None
+            ) if endpoint else None
+            session.details.update({
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "params": {key: values[0] if len(values) == 1 else values for key, values in params.items()},
+                "status": status["code"]
+            })
+            self.profiler.stop(session)
+
+# Create singleton instance
+request_profiler = Profiler()
@@ -0,0 +1,109 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from utils.concurrency import SingleFlight
+
+def make_key(name: str, params: Dict[str, Any]) -> str:
+    """
+    Normalize route parameters into a cache key: unset parameters are
+    dropped, order does not matter, and free-text queries ignore case and
+    extra whitespace
+    """
+    parts = []
+    for key in sorted(params):
+        value = params[key]
+        if value is None:
+            continue
+        if key == "q" and isinstance(value, str):
+            value = " ".join(value.lower().split())
+        parts.append(f"{key}={value}")
+    return f"{name}?{'&'.join(parts)}"
+
+class QueryCache:
+    """
+    In-process LRU cache of read API responses. Entries expire after a TTL
+    and are also invalidated as a whole by bumping the generation, which the
+    sync does whenever it writes to the catalog. Concurrent misses for the
+    same key share one computation.
+    """
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[str, Tuple[int, float, Any]]" = OrderedDict()
+        self._flights = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def invalidate(self):
+        """Drop every cached response; they are discarded lazily"""
+        self.generation += 1
+        self.stats["invalidations"] += 1
+
+    def _get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        generation, expires_at, value = entry
+        if generation != self.generation or expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats["invalidated" if generation != self.generation else "expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def _set(self, key: str, generation: int, value: Any):
+        # A response computed before an invalidation must not be cached
+        if generation != self.generation:
+            return
+        self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_compute(self, name: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached response for a route and its parameters, computing it on a miss"""
+        if not self.enabled:
+            return await compute()
+
+        key = make_key(name, params)
+        entry = self._get(key)
+        if entry is not None:
+            return entry[2]
+
+        generation = self.generation
+
+        async def load():
+            value = await compute()
+            self._set(key, generation, value)
+            return value
+
+        return await self._flights.do((generation, key), load)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "coalesced": self._flights.stats["coalesced"],
+            "size": len(self._entries),
+            "generation": self.generation,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+# Create singleton instance
+query_cache = QueryCache()
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from config import STREAM_READ_AHEAD
+from utils.bots import FILE_ERRORS
+
+# Pyrogram downloads files in chunks of this size; offsets count chunks
+CHUNK_SIZE = 1024 * 1024
+
+MIME_TYPES = {
+    "mkv": "video/x-matroska",
+    "mp4": "video/mp4",
+    "m4v": "video/x-m4v",
+    "avi": "video/x-msvideo",
+    "webm": "video/webm",
+    "mov": "video/quicktime",
+    "ts": "video/mp2t",
+    "wmv": "video/x-ms-wmv",
+    "flv": "video/x-flv",
+}
+
+def guess_mime_type(filename: Optional[str], file_format: Optional[str] = None) -> str:
+    """Content type from the stored format or the file extension"""
+    extension = (file_format or "").lower()
+    if extension not in MIME_TYPES and filename and "." in filename:
+        extension = filename.rsplit(".", 1)[1].lower()
+    return MIME_TYPES.get(extension, "application/octet-stream")
+
+def parse_range(header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into an inclusive (start, end) byte range.
+    Returns None when the whole file should be served and raises ValueError
+    when the range cannot be satisfied. Only the first range of a multi-range
+    request is honoured.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    spec = header[len("bytes="):].split(",")[0].strip()
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError(f"Invalid range: {header}")
+            start, end = max(file_size - length, 0), file_size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+    except ValueError:
+        raise ValueError(f"Invalid range: {header}")
+
+    end = min(end, file_size - 1)
+    if start < 0 or start > end:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, end
+
+def _trim(chunk: bytes, chunk_start: int, start: int, end: Optional[int]) -> bytes:
+    """Cut a chunk down to the part inside the requested range"""
+    low = max(start - chunk_start, 0)
+    high = len(chunk) if end is None else min(end + 1 - chunk_start, len(chunk))
+    if low == 0 and high == len(chunk):
+        return chunk
+    return chunk[low:high]
+
+def _consume(task: asyncio.Task):
+    # Read-ahead tasks may finish after the stream is gone
+    if not task.cancelled():
+        task.exception()
+
+async def fetch_chunk(scheduler, file_id: str, index: int, preferred: Optional[int] = None) -> bytes:
+    """
+    Download one chunk through the bot the scheduler picks, moving on to
+    other bots if it fails. Errors about the file itself are raised at
+    once. Returns b"" past the end of the file.
+    """
+    tried = set()
+    error = None
+    for _ in range(max(scheduler.size, 1)):
+        bot = scheduler.pick(exclude=tried, preferred=preferred)
+        tried.add(bot)
+        try:
+            async with scheduler.use(bot) as client:
+                chunks = client.stream_media(file_id, limit=1, offset=index)
+                try:
+                    async for chunk in chunks:
+                        return chunk
+                    return b""
+                finally:
+                    await chunks.aclose()
+        except FILE_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"Chunk {index} of {file_id} failed on bot {bot}: {e}")
+            error = e
+    raise error
+
+async def _load_chunk(scheduler, file_id: str, index: int, cache, preferred: Optional[int]) -> bytes:
+    if cache is not None and cache.enabled:
+        chunk = await cache.read(file_id, index)
+        if chunk is not None:
+            return chunk
+
+    chunk = await fetch_chunk(scheduler, file_id, index, preferred)
+    if cache is not None:
+        await cache.write(file_id, index, chunk)
+    return chunk
+
+async def stream_file(
+    scheduler,
+    file_id: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    cache=None,
+    read_ahead: int = STREAM_READ_AHEAD,
+    preferred: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield the bytes start..end (inclusive) of a Telegram file. Up to
+    read_ahead chunks ahead of the one being sent are loaded concurrently,
+    from the cache or from Telegram through whichever bots the scheduler
+    finds least loaded, and are yielded in order. At most read_ahead chunks
+    are held per stream. Closing the generator (e.g. when the client
+    disconnects) cancels the outstanding downloads.
+    """
+    index = start // CHUNK_SIZE
+    last = end // CHUNK_SIZE if end is not None else None
+    window = max(1, read_ahead)
+    pending: Dict[int, asyncio.Task] = {}
+    next_index = index
+
+    try:
+        while last is None or index <= last:
+            # Keep the read-ahead window full
+            while len(pending) < window and (last is None or next_index <= last):
+                task = asyncio.ensure_future(
+                    _load_chunk(scheduler, file_id, next_index, cache, preferred)
+                )
+                task.add_done_callback(_consume)
+                pending[next_index] = task
+                next_index += 1
+
+            chunk = await pending.pop(index)
+            data = _trim(chunk, index * CHUNK_SIZE, start, end)
+            if data:
+                yield data
+            if len(chunk) < CHUNK_SIZE:
+                return  # Short chunk: end of file
+            index += 1
+    finally:
+        for task in pending.values():
+            task.cancel()
@@ -0,0 +1,207 @@
+import heapq
+import logging
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from utils.parser import normalize_title
+
+# Prefixes shorter than this are answered from precomputed top lists
+SHORT_PREFIX = 4
+
+# Media kept per short prefix, overall and per media type
+SHORT_PREFIX_TOP = 32
+
+# Longest indexed key; longer queries are cut to this and filtered after
+KEY_LENGTH = 32
+
+# Days for the recency bonus to halve, and its weight against a 0-10 rating
+RECENCY_HALF_LIFE = 90
+RECENCY_WEIGHT = 3.0
+
+# Seconds between recomputing every rank as the recency bonus decays
+RERANK_INTERVAL = 6 * 3600
+
+# Media fields returned in suggestions, stored as tuples in this order
+SUGGEST_FIELDS = ("title", "slug", "media_type", "poster", "rating", "release_year", "created_at")
+MEDIA_TYPE = SUGGEST_FIELDS.index("media_type")
+RATING = SUGGEST_FIELDS.index("rating")
+CREATED_AT = SUGGEST_FIELDS.index("created_at")
+
+def _timestamp(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Stored datetimes are naive UTC
+        return value.replace(tzinfo=timezone.utc).timestamp()
+    return value
+
+def _score(info: Tuple, now: float) -> float:
+    """Rating plus a bonus for recently added media that halves every half-life"""
+    score = float(info[RATING] or 0)
+    if info[CREATED_AT]:
+        age_days = max(now - info[CREATED_AT], 0) / 86400
+        score += RECENCY_WEIGHT * 0.5 ** (age_days / RECENCY_HALF_LIFE)
+    return score
+
+class SuggestIndex:
+    """
+    Prefix index for search-as-you-type over media titles, slugs and
+    alternate names. Every word-start suffix of each title and alternate
+    name ("dark knight", "knight" for "The Dark Knight"), plus each whole
+    slug, is a key in one sorted list, so a prefix is a contiguous range
+    found with bisect and ranked as a whole. Prefixes of one to three
+    letters match too much to rank per keystroke, so each keeps a short
+    list of its best media instead, overall and per media type. Results are
+    ranked by rating plus a bonus for recently added media, precomputed per
+    media and refreshed every few hours.
+    """
+    def __init__(self):
+        self.keys: List[str] = []
+        self.ids: List[str] = []
+        self.media: Dict[str, Tuple] = {}
+        self._names: Dict[str, Tuple[str, ...]] = {}
+        # Keyed by (prefix, media type), with None for all types
+        self._short: Dict[Tuple[str, Optional[str]], List[Tuple[float, str]]] = {}
+        self._rank: Dict[str, float] = {}
+        self._ranked_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.media)
+
+    def _index(self, media: Dict[str, Any], aliases: Iterable[Optional[str]]) -> Tuple[List[str], List[str]]:
+        """
+        Record a media document; return the keys for its new names and the
+        words whose short prefixes should list it
+        """
+        media_id = str(media["_id"])
+        previous = self.media.get(media_id)
+        self.media[media_id] = tuple(
+            _timestamp(media[field]) if field in media else (previous[i] if previous else None)
+            for i, field in enumerate(SUGGEST_FIELDS)
+        )
+
+        keys, words = [], []
+        names = self._names.get(media_id, ())
+        slug = normalize_title(media.get("slug") or "")
+        if slug and slug not in names:
+            names += (slug,)
+            keys.append(slug[:KEY_LENGTH])
+
+        for name in (media.get("title"), *aliases):
+            normalized = normalize_title(name or "")
+            if not normalized or normalized in names:
+                continue
+            names += (normalized,)
+            name_words = normalized.split()
+            for i in range(len(name_words)):
+                keys.append(" ".join(name_words[i:])[:KEY_LENGTH])
+            words.extend(name_words)
+
+        self._names[media_id] = names
+        return keys, words
+
+    def add(self, media: Dict[str, Any], *aliases: Optional[str]):
+        """Index a media document (or update its fields) under its names"""
+        media_id = str(media["_id"])
+        keys, words = self._index(media, aliases)
+        for key in keys:
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.ids.insert(position, media_id)
+
+        rank = self._rank[media_id] = _score(self.media[media_id], self._ranked_at)
+        media_type = self.media[media_id][MEDIA_TYPE]
+        for prefix in {word[:length] for word in words for length in range(1, min(SHORT_PREFIX, len(word) + 1))}:
+            for short_key in ((prefix, None), (prefix, media_type)):
+                top = self._short.setdefault(short_key, [])
+                if any(existing == media_id for _, existing in top):
+                    continue
+                if len(top) < SHORT_PREFIX_TOP:
+                    heapq.heappush(top, (rank, media_id))
+                elif rank > top[0][0]:
+                    heapq.heapreplace(top, (rank, media_id))
+
+    def remove(self, media_id: str):
+        """Stop suggesting a media document; its keys are skipped from now on"""
+        self.media.pop(media_id, None)
+        self._names.pop(media_id, None)
+        self._rank.pop(media_id, None)
+
+    def build(self, docs: Iterable[Dict[str, Any]]):
+        """Index many documents at once, sorting everything a single time"""
+        entries = list(zip(self.keys, self.ids))
+        short: Dict[Tuple[str, Optional[str]], set] = {}
+        for media in docs:
+            media_id = str(media["_id"])
+            keys, words = self._index(media, [media.get("parsed_title")])
+            entries.extend((key, media_id) for key in keys)
+            media_type = self.media[media_id][MEDIA_TYPE]
+            for word in words:
+                for length in range(1, min(SHORT_PREFIX, len(word) + 1)):
+                    short.setdefault((word[:length], None), set()).add(media_id)
+                    short.setdefault((word[:length], media_type), set()).add(media_id)
+
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [media_id for _, media_id in entries]
+
+        self._rerank()
+        for short_key, media_ids in short.items():
+            ranked = {(self._rank[media_id], media_id) for media_id in media_ids}
+            ranked.update(self._short.get(short_key, []))
+            top = heapq.nlargest(SHORT_PREFIX_TOP, ranked)
+            heapq.heapify(top)
+            self._short[short_key] = top
+
+    def _rerank(self):
+        self._ranked_at = time.time()
+        self._rank = {media_id: _score(info, self._ranked_at) for media_id, info in self.media.items()}
+
+    async def load(self, collection):
+        """Build the index from every media document"""
+        started = time.perf_counter()
+        projection = {field: 1 for field in SUGGEST_FIELDS}
+        projection["parsed_title"] = 1
+        self.build([doc async for doc in collection.find({}, projection)])
+        logger.info(
+            f"Indexed {len(self.media)} titles for suggestions "
+            f"({len(self.keys)} keys) in {time.perf_counter() - started:.1f}s"
+        )
+
+    def suggest(self, query: str, limit: int = 10, media_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Best media with a name or name word starting with the query"""
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+
+        if time.time() - self._ranked_at > RERANK_INTERVAL:
+            self._rerank()
+
+        if len(prefix) < SHORT_PREFIX:
+            candidates = {media_id for _, media_id in self._short.get((prefix, media_type or None), [])}
+        else:
+            # Keys starting with the prefix sort right before prefix + U+10FFFF
+            key = prefix[:KEY_LENGTH]
+            start = bisect_left(self.keys, key)
+            end = bisect_left(self.keys, key + "\U0010ffff", start)
+            candidates = set(self.ids[start:end])
+
+        candidates = {media_id for media_id in candidates if media_id in self.media}
+        if media_type:
+            candidates = {media_id for media_id in candidates if self.media[media_id][MEDIA_TYPE] == media_type}
+        if len(prefix) > KEY_LENGTH:
+            candidates = {
+                media_id for media_id in candidates
+                if any((" " + name).find(" " + prefix) >= 0 for name in self._names[media_id])
+            }
+
+        return [
+            {"id": media_id, **dict(zip(SUGGEST_FIELDS, self.media[media_id]))}
+            for media_id in heapq.nlargest(limit, candidates, key=self._rank.__getitem__)
+        ]
+
+# Create singleton instance
+suggest_index = SuggestIndex()
@@ -1,21 +1,56 @@
 import asyncio
 import os
 import logging
-from typing import Dict, Any, List
-from pyrogram import Client
+import weakref
+from typing import Dict, Any, List, Optional, Set
+from pyrogram import Client, filters
+from pyrogram.handlers import MessageHandler
 from pyrogram.types import Message
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from bson.objectid import ObjectId
 from datetime import datetime
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-from config import TELEGRAM_API_ID, TELEGRAM_API_HASH, BOT_TOKENS, CHANNEL_ID
-from database import media_collection, files_collection
+from config import (
+    TELEGRAM_API_ID, TELEGRAM_API_HASH, BOT_TOKENS, CHANNEL_ID,
+    SYNC_QUEUE_SIZE, SYNC_PARSE_WORKERS, SYNC_ENRICH_WORKERS, SYNC_PERSIST_WORKERS,
+    SYNC_PAGE_SIZE, SYNC_BACKFILL, SYNC_WRITE_BATCH_SIZE, SYNC_WRITE_INTERVAL, SYNC_POLL_INTERVAL,
+    TITLE_MATCH_THRESHOLD, SEEN_FILTER_CAPACITY, SEEN_FILTER_ERROR_RATE, MEDIA_LAYOUT,
+    ENRICH_DEFERRED
+)
+from database import media_collection, files_collection, episodes_collection
 from utils.parser import parse_filename
 from utils.imdb import search_imdb
+from utils.pipeline import Pipeline
+from utils.bulk import BulkWriter
+from utils.bloom import BloomFilter
+from utils.bots import BotScheduler
+from utils.query_cache import query_cache
+from utils.checkpoint import checkpoint_store
+from utils.catalog import NORMALIZED, FILE_PROJECTION
+from utils.enrichment import enrichment_queue
+from utils.profiler import request_profiler
+from utils.metrics import parse_durations, stage_durations, sync_messages, sync_head, sync_handled
+from utils.matcher import TitleMatcher
+from utils.suggest import suggest_index
 from models.media import MediaType
 
+# Media fields returned from ingest upserts, enough to index the title for
+# matching and suggestions
+MEDIA_MATCH_PROJECTION = {
+    "title": 1, "slug": 1, "media_type": 1, "release_year": 1,
+    "poster": 1, "rating": 1, "created_at": 1, "provisional": 1
+}
+
+# Fields that enrichment copies from IMDb onto a provisional media document
+IMDB_FIELDS = ("imdb_id", "title", "slug", "poster", "plot", "rating", "genres", "release_year")
+
+# Fuzzy index of known media titles, loaded on initialize
+title_matcher = TitleMatcher(threshold=TITLE_MATCH_THRESHOLD)
+
 class TelegramSync:
     def __init__(self):
         self.app = Client(
@@ -25,8 +60,31 @@ class TelegramSync:
             workdir="./session"
         )
         self.bots = []
-        self.bot_count = len(BOT_TOKENS)
-        self.current_bot_index = 0
+        self.scheduler = BotScheduler()
+        self.pipeline: Optional[Pipeline] = None
+        # Set while a full channel sync runs, so only one runs at a time
+        self.syncing = False
+        # Created on first use so it binds to the running event loop
+        self._incremental_lock: Optional[asyncio.Lock] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._inflight_files = set()
+        # Messages whose ingest failed, so checkpoints stop short of them,
+        # and the pending writes of messages still being stored
+        self._failed_messages: Set[int] = set()
+        self._pending_writes: Set[asyncio.Future] = set()
+        # Provisional media merged into existing media by enrichment, and
+        # the locks that keep writes for a media apart from its relink
+        self._relinked: Dict[str, str] = {}
+        self._media_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # Cached API responses are stale once new media or files land
+        self.media_writer = BulkWriter(
+            media_collection, SYNC_WRITE_BATCH_SIZE, SYNC_WRITE_INTERVAL,
+            on_flush=query_cache.invalidate
+        )
+        self.file_writer = BulkWriter(files_collection, SYNC_WRITE_BATCH_SIZE, SYNC_WRITE_INTERVAL)
+        self.episode_writer = BulkWriter(episodes_collection, SYNC_WRITE_BATCH_SIZE, SYNC_WRITE_INTERVAL)
+        self.seen_files = BloomFilter(SEEN_FILTER_CAPACITY, SEEN_FILTER_ERROR_RATE)
+        self.seen_stats = {"skipped_lookups": 0, "lookups": 0, "false_positives": 0}
     
     async def initialize(self):
         """Initialize Telegram client and bots"""
@@ -46,23 +104,54 @@ class TelegramSync:
                 self.bots.append(bot)
         
         logger.info(f"Initialized {len(self.bots)} download bots")
+        self.scheduler.register(self.bots or [self.app])
+        
+        # Index existing media for title matching
+        await title_matcher.load(media_collection)
+        
+        # Index titles and alternate names for search-as-you-type
+        await suggest_index.load(media_collection)
+        
+        # Remember stored file_ids so new files skip the duplicate lookup
+        await self.load_seen_files()
     
     async def stop(self):
         """Stop Telegram client and bots"""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await enrichment_queue.stop()
+        await self.flush_writes()
         await self.app.stop()
         for bot in self.bots:
             await bot.stop()
     
-    def get_next_bot_index(self):
-        """Get next bot index for load balancing"""
-        index = self.current_bot_index
-        self.current_bot_index = (self.current_bot_index + 1) % self.bot_count
-        return index
+    async def load_seen_files(self):
+        """Fill the seen-file filter from the file_id index"""
+        count = await files_collection.estimated_document_count()
+        seen_files = BloomFilter(max(SEEN_FILTER_CAPACITY, count * 2), SEEN_FILTER_ERROR_RATE)
+        
+        # Projection on the indexed field only, so the scan is covered by the index
+        cursor = files_collection.find({}, {"file_id": 1, "_id": 0}).hint([("file_id", 1)])
+        async for doc in cursor:
+            seen_files.add(doc["file_id"])
+        
+        self.seen_files = seen_files
+        logger.info(f"Loaded {len(seen_files)} file ids into the seen filter ({seen_files.memory_bytes / 1e6:.1f} MB)")
     
-    async def process_message(self, message: Message):
-        """Process a Telegram message and store media info"""
+    async def flush_writes(self):
+        """Write out all buffered media, file and episode operations"""
+        await self.media_writer.close()
+        await self.file_writer.close()
+        await self.episode_writer.close()
+    
+    async def parse_message(self, message: Message) -> Optional[Dict[str, Any]]:
+        """Extract file info from a message and parse its filename"""
+        sync_head.set_max(message.id)
         if not message.media:
-            return
+            sync_handled.set_max(message.id)
+            return None
         
         # Extract file information
         if message.document:
@@ -74,132 +163,588 @@ class TelegramSync:
             file_size = message.video.file_size
             filename = message.video.file_name
         else:
-            return  # Unsupported media type
+            sync_handled.set_max(message.id)
+            return None  # Unsupported media type
         
-        # Check if file already exists
-        existing_file = await files_collection.find_one({"file_id": file_id})
-        if existing_file:
-            logger.debug(f"File already exists: {filename}")
-            return
+        # Telegram often sends files without a name; the caption usually
+        # carries the release name instead
+        if not filename:
+            filename = (message.caption or "").strip().split("\n")[0] or file_id
         
-        # Parse filename
-        parsed = parse_filename(filename)
+        # Skip files already stored or already being ingested
+        if file_id in self._inflight_files:
+            sync_messages.inc(outcome="duplicate")
+            sync_handled.set_max(message.id)
+            return None
         
-        # Get IMDb metadata
-        imdb_data = await search_imdb(
-            parsed["title"], 
-            parsed["year"], 
-            parsed["media_type"]
-        )
-        
-        if not imdb_data:
-            logger.warning(f"No IMDb data found for: {filename}")
-            # Create basic metadata without IMDb
-            media_id = str(ObjectId())
-            media_data = {
-                "_id": media_id,
-                "title": parsed["title"],
-                "slug": parsed["title"].lower().replace(" ", "-"),
-                "media_type": parsed["media_type"],
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
-                "original_filename": filename
-            }
+        # Only files the filter may have seen need checking against the database
+        if file_id in self.seen_files:
+            self.seen_stats["lookups"] += 1
+            existing_file = await files_collection.find_one({"file_id": file_id}, {"_id": 1})
+            if existing_file:
+                logger.debug(f"File already exists: {filename}")
+                sync_messages.inc(outcome="duplicate")
+                sync_handled.set_max(message.id)
+                return None
+            self.seen_stats["false_positives"] += 1
         else:
-            # Check if media already exists by IMDb ID
-            existing_media = await media_collection.find_one({"imdb_id": imdb_data["imdb_id"]})
+            self.seen_stats["skipped_lookups"] += 1
+        
+        self._inflight_files.add(file_id)
+        try:
+            with parse_durations.time():
+                parsed = parse_filename(filename)
+        except Exception:
+            self._inflight_files.discard(file_id)
+            self._failed_messages.add(message.id)
+            sync_messages.inc(outcome="failed")
+            raise
+        
+        return {
+            "message_id": message.id,
+            "file_id": file_id,
+            "file_size": file_size,
+            "filename": filename,
+            "parsed": parsed
+        }
+    
+    def match_media(self, parsed: Dict[str, Any]) -> Optional[str]:
+        """Find existing media for a parsed title without a network lookup"""
+        match = title_matcher.match(parsed["title"], parsed["media_type"], parsed["year"])
+        if not match:
+            return None
+        
+        media_id, score = match
+        logger.debug(f"Matched '{parsed['title']}' to media {media_id} (score {score:.2f})")
+        return media_id
+    
+    async def enrich_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach IMDb metadata to a parsed entry"""
+        parsed = entry["parsed"]
+        
+        entry["media_id"] = self.match_media(parsed)
+        if entry["media_id"] or ENRICH_DEFERRED:
+            # Unknown titles are stored as provisional media and looked up
+            # in the background
+            return entry
+        
+        try:
+            entry["imdb_data"] = await search_imdb(
+                parsed["title"], 
+                parsed["year"], 
+                parsed["media_type"]
+            )
+        except Exception:
+            self._inflight_files.discard(entry["file_id"])
+            self._failed_messages.add(entry["message_id"])
+            sync_messages.inc(outcome="failed")
+            raise
+        return entry
+    
+    async def persist_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue the writes for a parsed and enriched entry"""
+        try:
+            writes = await self._store_entry(entry)
+        except Exception:
+            self._inflight_files.discard(entry["file_id"])
+            self._failed_messages.add(entry["message_id"])
+            sync_messages.inc(outcome="failed")
+            raise
+        
+        # The file stays in flight until its batch has been written
+        done = asyncio.gather(*writes, return_exceptions=True)
+        done.add_done_callback(lambda future: self._entry_written(entry, future))
+        self._pending_writes.add(done)
+        done.add_done_callback(self._pending_writes.discard)
+        return entry
+    
+    def _entry_written(self, entry: Dict[str, Any], done: asyncio.Future):
+        self._inflight_files.discard(entry["file_id"])
+        if done.cancelled():
+            return
+        for result in done.result():
+            if isinstance(result, Exception):
+                logger.error(f"Failed to store {entry['filename']}: {result}")
+                self._failed_messages.add(entry["message_id"])
+                sync_messages.inc(outcome="failed")
+                return
+        sync_messages.inc(outcome="stored")
+        sync_handled.set_max(entry["message_id"])
+        logger.info(f"Processed: {entry['filename']}")
+    
+    def _media_lock(self, media_id: str) -> asyncio.Lock:
+        """Lock for queuing writes to one media document, dropped once unused"""
+        lock = self._media_locks.get(media_id)
+        if lock is None:
+            lock = self._media_locks[media_id] = asyncio.Lock()
+        return lock
+    
+    async def _upsert_media(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        """Upsert a media document and return its matcher fields"""
+        for attempt in range(2):
+            try:
+                written = await self.media_writer.add(UpdateOne(query, update, upsert=True))
+                upserted_id = await written
+            except DuplicateKeyError:
+                if attempt:
+                    raise
+                # Either a concurrent ingest inserted the same media first, in
+                # which case the retry matches it, or the slug belongs to other
+                # media and the new document needs a distinct one
+                inserted = update["$setOnInsert"]
+                if "slug" in inserted and not await media_collection.find_one(query, {"_id": 1}):
+                    inserted["slug"] = f"{inserted['slug']}-{inserted['_id'][-6:]}"
+                continue
             
-            if existing_media:
-                media_id = existing_media["_id"]
-                media_data = existing_media
-            else:
-                # Create new media entry
-                media_id = str(ObjectId())
-                media_data = {
-                    "_id": media_id,
-                    "title": imdb_data["title"],
-                    "slug": imdb_data["slug"],
-                    "media_type": parsed["media_type"],
-                    "imdb_id": imdb_data["imdb_id"],
-                    "poster": imdb_data["poster"],
-                    "plot": imdb_data["plot"],
-                    "rating": imdb_data["rating"],
-                    "genres": imdb_data["genres"],
-                    "release_year": imdb_data["release_year"],
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow(),
-                    "original_filename": filename
-                }
+            if upserted_id is not None:
+                return {**query, **update["$setOnInsert"]}
+            # The media already existed under a name the matcher did not know
+            return await media_collection.find_one(query, MEDIA_MATCH_PROJECTION)
+    
+    async def _store_entry(self, entry: Dict[str, Any]) -> List[asyncio.Future]:
+        file_id = entry["file_id"]
+        file_size = entry["file_size"]
+        filename = entry["filename"]
+        parsed = entry["parsed"]
+        imdb_data = entry.get("imdb_data")
+        now = datetime.utcnow()
         
         # Create file info
         file_info = {
             "file_id": file_id,
             "file_size": file_size,
+            "filename": filename,
             "quality": parsed["quality"],
             "source": parsed["source"],
             "format": parsed["format"],
-            "bot_index": self.get_next_bot_index(),
-            "media_id": media_id
+            # Only a preference: streams use whichever bot is healthy and least loaded
+            "bot_index": max(self.scheduler.pick(), 0)
         }
         
-        # Update media based on type
-        if parsed["media_type"] == "movie":
-            # For movies, add file directly to media
-            if "files" not in media_data:
-                media_data["files"] = []
-            
-            media_data["files"].append(file_info)
-            
-        elif parsed["media_type"] in ["series", "anime"]:
-            # For series/anime, organize by season and episode
+        update = {"$set": {"updated_at": now}, "$addToSet": {"qualities": parsed["quality"]}}
+        
+        # Embedded media also get the file pushed onto its exact path instead
+        # of rewriting the document: files[] for movies, seasons.S.episodes.E.files
+        # for series/anime. Normalized media only need the file row and the
+        # episode document, so the push is filtered to skip them.
+        embed = {"$push": {"files": file_info}}
+        episode_key = None
+        if parsed["media_type"] in ["series", "anime"]:
             season_num = parsed["season"] or 1
             episode_num = parsed["episode"] or 1
+            file_info["season"] = season_num
+            file_info["episode"] = episode_num
             
-            if "seasons" not in media_data:
-                media_data["seasons"] = {}
-                
-            if str(season_num) not in media_data["seasons"]:
-                media_data["seasons"][str(season_num)] = {
-                    "season_number": season_num,
-                    "episodes": {}
+            episode_path = f"seasons.{season_num}.episodes.{episode_num}"
+            embed = {
+                "$set": {
+                    f"seasons.{season_num}.season_number": season_num,
+                    f"{episode_path}.episode_number": episode_num
+                },
+                "$push": {f"{episode_path}.files": file_info}
+            }
+            episode_key = {"season": season_num, "episode": episode_num}
+        
+        # Re-check the matcher: another worker may have created the media
+        # while this entry was being enriched. Known media only need the
+        # updates, which are batched with other writes without waiting.
+        writes = []
+        media_id = entry.get("media_id") or self.match_media(parsed)
+        media_id = self._relinked.get(media_id, media_id)
+        known = bool(media_id)
+        provisional = False
+        if not known:
+            if imdb_data:
+                query = {"imdb_id": imdb_data["imdb_id"]}
+                new_media = {
+                    "title": imdb_data["title"],
+                    "slug": imdb_data["slug"],
+                    "media_type": parsed["media_type"],
+                    "poster": imdb_data["poster"],
+                    "plot": imdb_data["plot"],
+                    "rating": imdb_data["rating"],
+                    "genres": imdb_data["genres"],
+                    "release_year": imdb_data["release_year"]
+                }
+            else:
+                if not ENRICH_DEFERRED:
+                    logger.warning(f"No IMDb data found for: {filename}")
+                # Create basic metadata without IMDb. Such media are found
+                # again by the name, type and year they were parsed from; the
+                # slug only has to be unique, and gets a suffix if taken
+                query = {
+                    "parsed_title": parsed["title"],
+                    "media_type": parsed["media_type"],
+                    "release_year": parsed["year"]
                 }
-                
-            if str(episode_num) not in media_data["seasons"][str(season_num)]["episodes"]:
-                media_data["seasons"][str(season_num)]["episodes"][str(episode_num)] = {
-                    "episode_number": episode_num,
-                    "files": []
+                new_media = {
+                    "title": parsed["title"],
+                    "slug": parsed["title"].lower().replace(" ", "-"),
+                    "media_type": parsed["media_type"],
+                    # Keeps the matcher from merging same-titled media of
+                    # other years until enrichment fills in the real one
+                    "release_year": parsed["year"]
                 }
+                if ENRICH_DEFERRED:
+                    new_media["provisional"] = True
+            
+            # Header fields are only written when the upsert creates the media
+            update["$setOnInsert"] = {
+                "_id": str(ObjectId()),
+                **new_media,
+                "created_at": now,
+                "original_filename": filename,
+                "parsed_title": parsed["title"]
+            }
+            if MEDIA_LAYOUT == NORMALIZED:
+                update["$setOnInsert"]["layout"] = NORMALIZED
+            media = await self._upsert_media(query, update)
+            media_id = media["_id"]
+            provisional = media.get("provisional", False)
             
-            media_data["seasons"][str(season_num)]["episodes"][str(episode_num)]["files"].append(file_info)
+            # Make this media (and the name it was found under) matchable
+            title_matcher.add_media(media, parsed["title"])
+            suggest_index.add(media, parsed["title"])
+        
+        # A relink of this media holds the lock while it moves its rows, so
+        # writes are queued either before it flushes or after the redirect
+        async with self._media_lock(media_id):
+            media_id = self._relinked.get(media_id, media_id)
+            if known:
+                writes.append(await self.media_writer.add(UpdateOne({"_id": media_id}, update)))
+            writes.append(await self.media_writer.add(
+                UpdateOne({"_id": media_id, "layout": {"$ne": NORMALIZED}}, embed)
+            ))
+            
+            # Store file info, and the episode it belongs to, for both layouts:
+            # migrating media to the normalized layout then loses nothing
+            writes.append(await self.file_writer.add(InsertOne({**file_info, "media_id": media_id})))
+            if episode_key:
+                writes.append(await self.episode_writer.add(UpdateOne(
+                    {"media_id": media_id, **episode_key},
+                    {"$setOnInsert": {"created_at": now}},
+                    upsert=True
+                )))
+        
+        # Enqueued only once its writes are queued, so enrichment cannot
+        # relink the media ahead of them
+        if provisional:
+            await enrichment_queue.enqueue(
+                media_id,
+                {"title": parsed["title"], "year": parsed["year"], "media_type": parsed["media_type"]},
+                priority=entry.get("message_id") or 0
+            )
+        self.seen_files.add(file_id)
+        if len(self.seen_files) == self.seen_files.capacity + 1:
+            logger.warning("Seen-file filter is over capacity, false positives will rise until it is reloaded")
+        return writes
+    
+    async def enrich_media(self, job: Dict[str, Any]):
+        """
+        Look up IMDb metadata for a provisional media document and merge it
+        in, or fold the document into the media that already has that IMDb ID
+        """
+        media_id = job["_id"]
+        media = await media_collection.find_one({"_id": media_id}, MEDIA_MATCH_PROJECTION)
+        if not media or not media.get("provisional"):
+            return
+        
+        # Raises on lookup errors so the job is retried
+        imdb_data = await search_imdb(job["title"], job.get("year"), job["media_type"], raise_errors=True)
+        if not imdb_data:
+            logger.warning(f"No IMDb data found for: {job['title']}")
+            await media_collection.update_one({"_id": media_id}, {"$unset": {"provisional": ""}})
+            return
         
-        # Update media in database
-        await media_collection.update_one(
-            {"_id": media_id},
-            {"$set": media_data},
-            upsert=True
+        existing = await media_collection.find_one({"imdb_id": imdb_data["imdb_id"]}, MEDIA_MATCH_PROJECTION)
+        if existing and existing["_id"] != media_id:
+            await self._relink_media(media, existing)
+        else:
+            await self._merge_metadata(media, imdb_data, job["title"])
+        query_cache.invalidate()
+    
+    async def _merge_metadata(self, media: Dict[str, Any], imdb_data: Dict[str, Any], parsed_title: str):
+        fields = {field: imdb_data[field] for field in IMDB_FIELDS}
+        for attempt in range(2):
+            try:
+                await media_collection.update_one(
+                    {"_id": media["_id"]},
+                    {"$set": {**fields, "updated_at": datetime.utcnow()}, "$unset": {"provisional": ""}}
+                )
+                break
+            except DuplicateKeyError as e:
+                # Another media has this slug; a duplicate IMDb ID means one
+                # was created meanwhile, and the retried job relinks to it
+                if attempt or "slug" not in (e.details or {}).get("keyPattern", {}):
+                    raise
+                fields["slug"] = f"{fields['slug']}-{media['_id'][-6:]}"
+        
+        media.update(fields)
+        media.pop("provisional", None)
+        # Names indexed while provisional get the IMDb year too
+        title_matcher.set_year(media["_id"], fields["release_year"])
+        title_matcher.add_media(media, parsed_title)
+        suggest_index.add(media, parsed_title)
+        logger.info(f"Enriched {parsed_title} as {fields['title']} ({fields['imdb_id']})")
+    
+    async def _relink_media(self, provisional: Dict[str, Any], target: Dict[str, Any]):
+        """Move a provisional media document's files and episodes onto existing media"""
+        old_id, new_id = provisional["_id"], target["_id"]
+        
+        # Held throughout, so no write for the provisional document can be
+        # queued between the flush below and the delete at the end
+        async with self._media_lock(old_id):
+            # Send new and in-flight files to the target first, then write out
+            # what was already queued for the provisional document
+            title_matcher.relink(old_id, new_id)
+            self._relinked[old_id] = new_id
+            suggest_index.remove(old_id)
+            await self.flush_writes()
+            
+            # Ingest writes a file row for either layout, so the rows are the
+            # complete list of the provisional document's files
+            rows = await files_collection.find({"media_id": old_id}, FILE_PROJECTION).sort("_id", 1).to_list(length=None)
+            await files_collection.update_many({"media_id": old_id}, {"$set": {"media_id": new_id}})
+            episodes = [
+                UpdateOne(
+                    {"media_id": new_id, "season": doc["season"], "episode": doc["episode"]},
+                    {"$setOnInsert": {"created_at": doc.get("created_at")}},
+                    upsert=True
+                )
+                async for doc in episodes_collection.find({"media_id": old_id})
+            ]
+            if episodes:
+                await episodes_collection.bulk_write(episodes, ordered=False)
+                await episodes_collection.delete_many({"media_id": old_id})
+            
+            # Embedded targets also get the files pushed onto their tree
+            embed = {"$set": {}, "$push": {}}
+            for row in rows:
+                if row.get("season") is None or row.get("episode") is None:
+                    embed["$push"].setdefault("files", {"$each": []})["$each"].append(row)
+                    continue
+                episode_path = f"seasons.{row['season']}.episodes.{row['episode']}"
+                embed["$set"][f"seasons.{row['season']}.season_number"] = row["season"]
+                embed["$set"][f"{episode_path}.episode_number"] = row["episode"]
+                embed["$push"].setdefault(f"{episode_path}.files", {"$each": []})["$each"].append(row)
+            if embed["$push"]:
+                embed = {operator: fields for operator, fields in embed.items() if fields}
+                await media_collection.update_one({"_id": new_id, "layout": {"$ne": NORMALIZED}}, embed)
+            qualities = sorted({row["quality"] for row in rows if row.get("quality")})
+            await media_collection.update_one(
+                {"_id": new_id},
+                {
+                    "$set": {"updated_at": datetime.utcnow()},
+                    "$addToSet": {"qualities": {"$each": qualities}}
+                }
+            )
+            await media_collection.delete_one({"_id": old_id})
+        logger.info(f"Relinked provisional media {provisional.get('title')} to {target.get('title')}")
+    
+    async def process_message(self, message: Message):
+        """Process a Telegram message and store media info"""
+        with stage_durations.time(stage="parse"):
+            entry = await self.parse_message(message)
+        if not entry:
+            return
+        
+        with stage_durations.time(stage="enrich"):
+            entry = await self.enrich_entry(entry)
+        with stage_durations.time(stage="persist"):
+            await self.persist_entry(entry)
+    
+    def build_pipeline(self) -> Pipeline:
+        """Build the staged ingest pipeline used for channel syncs"""
+        return (
+            Pipeline(
+                "sync", queue_size=SYNC_QUEUE_SIZE,
+                observe=lambda stage, seconds: stage_durations.observe(seconds, stage=stage)
+            )
+            .add_stage("parse", self.parse_message, workers=SYNC_PARSE_WORKERS)
+            .add_stage("enrich", self.enrich_entry, workers=SYNC_ENRICH_WORKERS)
+            .add_stage("persist", self.persist_entry, workers=SYNC_PERSIST_WORKERS)
+        )
+    
+    async def _run_pipeline(self, messages, tracker: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Feed messages through the ingest pipeline, recording their id range
+        and the ids of messages that failed. Raises if reading the messages
+        failed part way, after the messages already read have been stored.
+        """
+        async def source():
+            async for message in messages:
+                tracker["count"] += 1
+                tracker["min_id"] = min(tracker["min_id"] or message.id, message.id)
+                tracker["max_id"] = max(tracker["max_id"] or message.id, message.id)
+                yield message
+        
+        self.pipeline = self.build_pipeline()
+        try:
+            stats = await self.pipeline.run(source())
+        finally:
+            # Checkpoints only move past messages whose writes have landed
+            await self.flush_writes()
+            if self._pending_writes:
+                await asyncio.wait(self._pending_writes)
+        
+        if tracker["count"]:
+            tracker["failed"] = sorted(
+                message_id for message_id in self._failed_messages
+                if tracker["min_id"] <= message_id <= tracker["max_id"]
+            )
+            self._failed_messages.difference_update(tracker["failed"])
+        if tracker["failed"]:
+            logger.warning(f"{len(tracker['failed'])} messages failed during sync and were skipped")
+        
+        stats["writes"] = {
+            "media": self.media_writer.get_stats(),
+            "files": self.file_writer.get_stats(),
+            "episodes": self.episode_writer.get_stats()
+        }
+        stats["seen_filter"] = {**self.seen_stats, "size": len(self.seen_files)}
+        return stats
+    
+    async def sync_recent(self, limit: int = 100) -> Dict[str, Any]:
+        """Sync the latest messages from the channel, ignoring checkpoints"""
+        tracker = {"count": 0, "min_id": None, "max_id": None, "failed": []}
+        return await self._run_pipeline(
+            self.app.get_chat_history(CHANNEL_ID, limit=limit), tracker
         )
+    
+    async def sync_incremental(self) -> Dict[str, Any]:
+        """Sync messages posted since the last checkpoint"""
+        # One run at a time: channel syncs and the live listener both start them
+        if self._incremental_lock is None:
+            self._incremental_lock = asyncio.Lock()
+        async with self._incremental_lock:
+            return await self._sync_incremental()
+    
+    async def _sync_incremental(self) -> Dict[str, Any]:
+        state = await checkpoint_store.get(CHANNEL_ID)
+        last_id = state.get("last_message_id")
+        
+        if last_id is None:
+            # First run: anchor the checkpoint at the newest message and
+            # leave everything older to the backfill
+            async for message in self.app.get_chat_history(CHANNEL_ID, limit=1):
+                sync_head.set_max(message.id)
+                await checkpoint_store.set_last_message_id(CHANNEL_ID, message.id - 1)
+                await checkpoint_store.set_backfill_offset(CHANNEL_ID, message.id)
+                last_id = message.id - 1
+            if last_id is None:
+                logger.info("Channel is empty, nothing to sync")
+                return {"messages": 0}
+        
+        async def newer_messages():
+            async for message in self.app.get_chat_history(CHANNEL_ID):
+                if message.id <= last_id:
+                    break
+                yield message
         
-        # Store file info
-        await files_collection.insert_one(file_info)
+        # History is read newest first, so a read cut short raises here and
+        # the checkpoint stays put until a run gets back down to last_id
+        tracker = {"count": 0, "min_id": None, "max_id": None, "failed": []}
+        await self._run_pipeline(newer_messages(), tracker)
         
-        logger.info(f"Processed: {filename}")
+        checkpoint = tracker["max_id"] or last_id
+        if tracker["failed"]:
+            # The next run retries from the oldest failed message
+            checkpoint = tracker["failed"][0] - 1
+        if checkpoint > last_id:
+            await checkpoint_store.set_last_message_id(CHANNEL_ID, checkpoint)
+        
+        logger.info(f"Incremental sync processed {tracker['count']} messages")
+        return {"messages": tracker["count"], "last_message_id": checkpoint}
+    
+    async def sync_backfill(self, max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """Walk older channel history page by page, resuming from the checkpoint"""
+        state = await checkpoint_store.get(CHANNEL_ID)
+        if state.get("backfill_complete"):
+            return {"messages": 0, "complete": True}
+        
+        offset_id = state.get("backfill_offset_id", 0)
+        pages = 0
+        total = 0
+        
+        while max_pages is None or pages < max_pages:
+            tracker = {"count": 0, "min_id": None, "max_id": None, "failed": []}
+            await self._run_pipeline(
+                self.app.get_chat_history(
+                    CHANNEL_ID, limit=SYNC_PAGE_SIZE, offset_id=offset_id
+                ),
+                tracker
+            )
+            pages += 1
+            total += tracker["count"]
+            
+            # A failed page read has raised above, so an empty page really
+            # is the start of the channel
+            if not tracker["count"]:
+                await checkpoint_store.set_backfill_offset(CHANNEL_ID, offset_id, complete=True)
+                logger.info(f"Backfill complete after {total} messages")
+                return {"messages": total, "pages": pages, "complete": True}
+            
+            if tracker["failed"]:
+                # Stop below the newest failed message, so the next run
+                # reads the page again from there
+                offset_id = tracker["failed"][-1] + 1
+                await checkpoint_store.set_backfill_offset(CHANNEL_ID, offset_id)
+                logger.warning(f"Backfill page {pages} had failed messages, stopping at {offset_id}")
+                return {"messages": total, "pages": pages, "complete": False, "offset_id": offset_id}
+            
+            # Only advance once the whole page has been through the pipeline
+            offset_id = tracker["min_id"]
+            await checkpoint_store.set_backfill_offset(CHANNEL_ID, offset_id)
+            logger.info(f"Backfill page {pages}: {tracker['count']} messages, continuing below {offset_id}")
+        
+        return {"messages": total, "pages": pages, "complete": False, "offset_id": offset_id}
     
-    async def sync_channel(self, limit: int = 100):
-        """Sync messages from the channel"""
+    async def sync_channel(self, backfill: bool = SYNC_BACKFILL) -> Dict[str, Any]:
+        """Sync new messages, then continue the history backfill"""
+        if self.syncing:
+            return {"error": "A channel sync is already in progress"}
+        self.syncing = True
         try:
-            async for message in self.app.get_chat_history(CHANNEL_ID, limit=limit):
-                await self.process_message(message)
+            stats = {"incremental": await self.sync_incremental()}
+            if backfill:
+                stats["backfill"] = await self.sync_backfill()
+            return stats
         except Exception as e:
             logger.error(f"Error syncing channel: {e}")
+            return {"error": str(e)}
+        finally:
+            self.syncing = False
     
-    async def listen(self):
-        """Listen for new messages in the channel"""
-        @self.app.on_message(filters=lambda _, m: m.chat.id == CHANNEL_ID)
+    def start_listening(self, poll_interval: float = SYNC_POLL_INTERVAL):
+        """
+        Ingest new posts as they arrive: every post in the channel wakes an
+        incremental sync, and one also runs every poll_interval seconds in
+        case an update was missed. Live posts go through the same pipeline
+        and checkpoint as any other sync.
+        """
+        if self._listener is not None:
+            return
+        wakeup = asyncio.Event()
+        
         async def on_message(client, message):
-            await self.process_message(message)
+            wakeup.set()
         
-        # Start the client
-        await self.app.idle()
+        self.app.add_handler(MessageHandler(on_message, filters.chat(CHANNEL_ID)))
+        self._listener = asyncio.ensure_future(self._listen(wakeup, poll_interval))
+        logger.info("Listening for new channel posts")
+    
+    async def _listen(self, wakeup: asyncio.Event, poll_interval: float):
+        while True:
+            try:
+                await asyncio.wait_for(wakeup.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Posts arriving during the sync set it again for another run
+            wakeup.clear()
+            try:
+                await self.sync_incremental()
+            except Exception as e:
+                logger.error(f"Live sync failed: {e}")
 
 # Create singleton instance
 telegram_sync = TelegramSync()
@@ -207,11 +752,21 @@ telegram_sync = TelegramSync()
 async def initialize_sync():
     await telegram_sync.initialize()
 
-async def sync_channel(limit: int = 100):
-    await telegram_sync.sync_channel(limit)
+async def sync_channel(backfill: bool = SYNC_BACKFILL, profile: bool = False):
+    if profile:
+        return await request_profiler.profile(
+            "sync", "sync_channel", telegram_sync.sync_channel(backfill), backfill=backfill
+        )
+    return await telegram_sync.sync_channel(backfill)
+
+def sync_in_progress() -> bool:
+    return telegram_sync.syncing
+
+def start_enrichment():
+    enrichment_queue.start(telegram_sync.enrich_media)
 
-async def start_listening():
-    await telegram_sync.listen()
+def start_listening():
+    telegram_sync.start_listening()
 
 async def stop_sync():
     await telegram_sync.stop()
\ No newline at end of file
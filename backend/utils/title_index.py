@@ -0,0 +1,204 @@
+import csv
+import gzip
+import logging
+import os
+import sqlite3
+from typing import Dict, Any, Optional, Iterator, List
+from slugify import slugify
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+from utils.parser import normalize_title
+
+# IMDb dataset title types, mapped to the kind names Cinemagoer uses
+TITLE_KINDS = {
+    "movie": "movie",
+    "tvMovie": "tv movie",
+    "tvSeries": "tv series",
+    "tvMiniSeries": "tv mini series"
+}
+
+# Kinds acceptable for each of our media types, in order of preference
+MEDIA_TYPE_KINDS = {
+    "movie": ["movie", "tv movie"],
+    "series": ["tv series", "tv mini series"],
+    "anime": ["tv series", "tv mini series"]
+}
+
+SCHEMA = """
+CREATE TABLE titles (
+    tconst INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    year INTEGER,
+    genres TEXT
+);
+CREATE TABLE ratings (
+    tconst INTEGER PRIMARY KEY,
+    rating REAL,
+    votes INTEGER
+);
+CREATE TABLE names (
+    norm_title TEXT NOT NULL,
+    year INTEGER,
+    tconst INTEGER NOT NULL
+);
+"""
+
+def _open_tsv(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+def _read_tsv(path: str) -> Iterator[Dict[str, str]]:
+    with _open_tsv(path) as f:
+        # IMDb dumps are unquoted; quote characters appear inside titles
+        yield from csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+
+def _value(raw: str) -> Optional[str]:
+    return None if raw == "\\N" else raw
+
+def _tconst(raw: str) -> int:
+    return int(raw[2:])
+
+def build_index(basics_path: str, ratings_path: str, output_path: str, batch_size: int = 50000) -> Dict[str, int]:
+    """
+    Build a SQLite title index from title.basics.tsv(.gz) and
+    title.ratings.tsv(.gz). The index is written next to output_path and
+    moved into place once complete, so a running server never sees a
+    half-built file.
+    """
+    tmp_path = output_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA)
+    counts = {"titles": 0, "names": 0, "ratings": 0}
+
+    titles: List[tuple] = []
+    names: List[tuple] = []
+    for row in _read_tsv(basics_path):
+        kind = TITLE_KINDS.get(row["titleType"])
+        if not kind or row["isAdult"] == "1":
+            continue
+
+        tconst = _tconst(row["tconst"])
+        year = _value(row["startYear"])
+        year = int(year) if year else None
+        titles.append((tconst, row["primaryTitle"], kind, year, _value(row["genres"])))
+
+        for name in {normalize_title(row["primaryTitle"]), normalize_title(row["originalTitle"])}:
+            if name:
+                names.append((name, year, tconst))
+
+        if len(titles) >= batch_size:
+            conn.executemany("INSERT INTO titles VALUES (?, ?, ?, ?, ?)", titles)
+            conn.executemany("INSERT INTO names VALUES (?, ?, ?)", names)
+            counts["titles"] += len(titles)
+            counts["names"] += len(names)
+            titles, names = [], []
+
+    conn.executemany("INSERT INTO titles VALUES (?, ?, ?, ?, ?)", titles)
+    conn.executemany("INSERT INTO names VALUES (?, ?, ?)", names)
+    counts["titles"] += len(titles)
+    counts["names"] += len(names)
+
+    ratings: List[tuple] = []
+    for row in _read_tsv(ratings_path):
+        ratings.append((_tconst(row["tconst"]), float(row["averageRating"]), int(row["numVotes"])))
+        if len(ratings) >= batch_size:
+            conn.executemany("INSERT OR IGNORE INTO ratings VALUES (?, ?, ?)", ratings)
+            ratings = []
+    conn.executemany("INSERT OR IGNORE INTO ratings VALUES (?, ?, ?)", ratings)
+
+    # Ratings cover every title type; keep only the titles we index
+    conn.execute("DELETE FROM ratings WHERE tconst NOT IN (SELECT tconst FROM titles)")
+    counts["ratings"] = conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0]
+
+    conn.execute("CREATE INDEX names_lookup ON names (norm_title, year)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp_path, output_path)
+    return counts
+
+class TitleIndex:
+    """Read-only lookups against an index built by build_index()"""
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        # check_same_thread=False: lookups are read-only and may come from
+        # any thread; the connection itself serializes access
+        self.conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        self.stats = {"hits": 0, "misses": 0}
+
+    def lookup(self, title: str, year: Optional[int] = None, media_type: str = "movie") -> Optional[Dict[str, Any]]:
+        """
+        Find the best match for a title. Rows with the matching year and a
+        preferred kind win, ties are broken by number of votes.
+        """
+        name = normalize_title(title)
+        if not name:
+            return None
+
+        rows = self.conn.execute(
+            """
+            SELECT t.tconst, t.title, t.kind, t.year, t.genres, r.rating, r.votes
+            FROM names n
+            JOIN titles t ON t.tconst = n.tconst
+            LEFT JOIN ratings r ON r.tconst = n.tconst
+            WHERE n.norm_title = ?
+            """,
+            (name,)
+        ).fetchall()
+
+        if year:
+            rows = [row for row in rows if row[3] == year] or rows
+
+        kinds = MEDIA_TYPE_KINDS.get(media_type, [])
+        rows = [row for row in rows if row[2] in kinds] or rows
+
+        if not rows:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        tconst, title, kind, year, genres, rating, votes = max(
+            set(rows), key=lambda row: (row[6] or 0, -row[0])
+        )
+
+        # Same shape as utils.imdb.fetch_imdb; the dumps have no plot or poster
+        return {
+            "imdb_id": f"{tconst:07d}",
+            "title": title,
+            "slug": slugify(title),
+            "plot": "",
+            "rating": rating,
+            "genres": genres.split(",") if genres else [],
+            "release_year": year,
+            "poster": None,
+            "kind": kind
+        }
+
+    def close(self):
+        self.conn.close()
+
+def load_index(path: str) -> Optional[TitleIndex]:
+    """Open the index at path, or return None if it is missing or unusable"""
+    if not path:
+        return None
+    if not os.path.exists(path):
+        logger.warning(f"Offline title index not found: {path}")
+        return None
+    try:
+        index = TitleIndex(path)
+        logger.info(f"Loaded offline title index: {path}")
+        return index
+    except sqlite3.Error as e:
+        logger.error(f"Could not open offline title index {path}: {e}")
+        return None